@@ -0,0 +1,149 @@
+"""Sci-Dama AI players.
+
+Every strategy is registered under a difficulty name. A registered factory
+takes the game operation and a random generator and returns a player: a
+callable that receives a rules.GameState and returns the move to play for
+the side to move as (src, dst, captured), or None if it has no move.
+
+A player may also have a ponder(state, stop) attribute, called with the
+opponent to move. It works ahead on the opponent's likely replies until
+the threading.Event `stop` is set, and must run on the same thread as the
+player's moves.
+"""
+import random
+
+import opening_book
+import tablebase
+from bitboard import iter_bits, opponent
+from engine import SearchEngine, zobrist_hash
+from mcts import MonteCarloSearch
+
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    def decorator(factory):
+        STRATEGIES[name] = factory
+        return factory
+    return decorator
+
+
+def make_player(name, operation='+', rng=random, **options):
+    try:
+        factory = STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown AI strategy: {name}") from None
+    return factory(operation, rng, **options)
+
+
+def _own_pieces(state):
+    return list(iter_bits(state.position.bits(state.turn)))
+
+
+@register_strategy("Easy")
+def easy_player(operation, rng, **options):
+    # Random piece, random move
+    def play(state):
+        pieces = _own_pieces(state)
+        rng.shuffle(pieces)
+        for sq in pieces:
+            moves = state.moves_from(sq)
+            if moves:
+                return rng.choice(moves)
+        return None
+    return play
+
+
+@register_strategy("Medium")
+def medium_player(operation, rng, **options):
+    # Any capture first, otherwise a random move of the first movable piece
+    def play(state):
+        pieces = _own_pieces(state)
+        for sq in pieces:
+            jumps = [m for m in state.moves_from(sq) if m[2] >= 0]
+            if jumps:
+                return rng.choice(jumps)
+        for sq in pieces:
+            moves = state.moves_from(sq)
+            if moves:
+                return rng.choice(moves)
+        return None
+    return play
+
+
+def _score_diff(state):
+    return state.scores[state.turn] - state.scores[opponent(state.turn)]
+
+
+def _state_key(state):
+    return zobrist_hash(state.position), state.turn, _score_diff(state)
+
+
+@register_strategy("Hard")
+def hard_player(operation, rng, time_limit=0.25, use_book=True, use_tablebase=True,
+                ponder_limit=None, **options):
+    # The book and tablebase files are optional; without them it just searches
+    engine = SearchEngine(operation, time_limit,
+                          book=opening_book.load() if use_book else None,
+                          tablebase=tablebase.load() if use_tablebase else None)
+    # Longest search per reply while pondering
+    ponder_limit = time_limit * 4 if ponder_limit is None else ponder_limit
+    # Moves found while pondering: state key -> (move, seconds searched)
+    pondered = {}
+
+    def play(state):
+        hit = pondered.get(_state_key(state))
+        pondered.clear()
+        if hit is not None and hit[1] >= time_limit:
+            play.ponder_hits += 1
+            return hit[0]
+        play.ponder_misses += 1
+        return engine.search(state.position, state.turn, _score_diff(state))
+
+    def likely_replies(state, stop):
+        # The reply our own search expects first, then captures by points;
+        # a failed capture question is the least likely outcome of all
+        moves = state.legal_moves()
+        if not moves:
+            return []
+        expected = engine.search(state.position, state.turn, _score_diff(state), time_limit / 2, stop)
+        ordered = engine.order_moves(state.position, moves, expected, 0)
+        return [(move, True) for move in ordered] + [(move, False) for move in ordered if move[2] >= 0]
+
+    def ponder(state, stop):
+        pondered.clear()
+        replies = likely_replies(state, stop)
+        budget = time_limit
+        while budget <= ponder_limit:
+            for move, correct in replies:
+                if stop.is_set():
+                    return
+                child = state.copy()
+                child.apply_move(move, correct)
+                key = _state_key(child)
+                if child.winner() is not None or key in pondered and pondered[key][1] >= budget:
+                    continue
+                found = engine.search(child.position, child.turn, _score_diff(child), budget, stop)
+                # An interrupted search still leaves its work in the
+                # transposition table, but its move is not trusted
+                if stop.is_set():
+                    return
+                pondered[key] = (found, budget)
+            budget *= 2
+
+    play.engine = engine
+    play.ponder = ponder
+    play.ponder_hits = play.ponder_misses = 0
+    return play
+
+
+@register_strategy("Expert")
+def expert_player(operation, rng, time_limit=1.0, playouts=None, workers=None, policy="light", **options):
+    # Monte Carlo tree search over every core; see mcts.py
+    searcher = MonteCarloSearch(operation, time_limit, playouts, workers, policy,
+                                seed=rng.getrandbits(32))
+
+    def play(state):
+        return searcher.search(state)
+    play.searcher = searcher
+    return play
@@ -0,0 +1,211 @@
+"""Background image loading.
+
+Images are read, decoded and scaled on a worker thread so the first frame
+can be shown straight away. Requests are deduplicated by path and size,
+and files with identical contents share one decoded surface. The first
+get() on the main thread converts the surface to the display format, so
+full-screen blits don't pay a per-frame pixel format conversion.
+
+Decoded, scaled pixels are also written to an on-disk cache of raw
+buffers. Later runs memory-map those files instead of decoding and
+scaling again; a cache file is only used while the source file's mtime
+and size and the target resolution still match its header.
+"""
+import hashlib
+import io
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+import pygame
+
+CACHE_DIR = os.environ.get("MATH_RUSH_ASSET_CACHE", ".asset_cache")
+CACHE_MAGIC = b"MRPX"
+CACHE_VERSION = 1
+# magic, version, source mtime_ns, source size, width, height, pixel format,
+# sha1 of the source bytes
+CACHE_HEADER = struct.Struct("<4sHqqHH4s20s")
+
+
+class _Entry:
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.ready = threading.Event()
+        self.surface = None      # decoded and scaled, not yet converted
+        self.converted = None
+        self.timings = {}
+        self.error = None
+
+
+def _cache_path(path, size):
+    name = hashlib.sha1(f"{os.path.abspath(path)}|{size[0]}x{size[1]}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, name + ".px")
+
+
+def read_cached(path, size):
+    # Returns (surface, sha1 digest) from the pixel cache, or None on a miss
+    if not size:
+        return None
+    try:
+        st = os.stat(path)
+        with open(_cache_path(path, size), "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < CACHE_HEADER.size:
+        mm.close()
+        return None
+    magic, version, mtime_ns, src_size, width, height, fmt, digest = CACHE_HEADER.unpack_from(mm)
+    fmt = fmt.rstrip(b"\0").decode("ascii", "replace")
+    stride = 4 if fmt == "RGBA" else 3
+    if (magic != CACHE_MAGIC or version != CACHE_VERSION
+            or mtime_ns != st.st_mtime_ns or src_size != st.st_size
+            or (width, height) != tuple(size)
+            or len(mm) != CACHE_HEADER.size + width * height * stride):
+        mm.close()
+        return None
+    # The surface keeps the mapping alive; pixels are paged in on demand
+    surface = pygame.image.frombuffer(memoryview(mm)[CACHE_HEADER.size:], (width, height), fmt)
+    return surface, digest
+
+
+def write_cached(path, size, surface, digest):
+    try:
+        st = os.stat(path)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fmt = "RGBA" if surface.get_flags() & pygame.SRCALPHA else "RGB"
+        width, height = surface.get_size()
+        header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, st.st_mtime_ns, st.st_size,
+                                   width, height, fmt.encode("ascii"), digest)
+        target = _cache_path(path, size)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(pygame.image.tobytes(surface, fmt))
+        os.replace(tmp, target)
+    except (OSError, pygame.error) as e:
+        print(f"Could not cache image {path}:", e)
+
+
+class AssetManager:
+    def __init__(self):
+        self.entries = {}
+        self.by_content = {}
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.thread = None
+
+    def _key(self, path, size):
+        return (os.path.normcase(os.path.abspath(path)), tuple(size) if size else None)
+
+    def preload(self, paths, size=None):
+        for path in paths:
+            self._request(path, size)
+
+    def _request(self, path, size):
+        key = self._key(path, size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = _Entry(path, size)
+                self.jobs.put(entry)
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._worker, name="asset-loader", daemon=True)
+                    self.thread.start()
+        return entry
+
+    def get(self, path, size=None, wait=False):
+        # Returns the display-ready surface, or None if it is still loading
+        # (unless wait=True) or failed to load
+        entry = self._request(path, size)
+        if entry.converted is not None:
+            return entry.converted
+        if not entry.ready.is_set():
+            if not wait:
+                return None
+            start = time.perf_counter()
+            entry.ready.wait()
+            entry.timings["wait"] = time.perf_counter() - start
+        if entry.surface is None:
+            return None
+        start = time.perf_counter()
+        entry.converted = self._convert(entry.surface)
+        entry.timings["convert"] = time.perf_counter() - start
+        return entry.converted
+
+    def wait_all(self):
+        for entry in list(self.entries.values()):
+            entry.ready.wait()
+
+    def timings(self):
+        return {entry.path: dict(entry.timings, error=entry.error)
+                for entry in self.entries.values()}
+
+    def _convert(self, surface):
+        if pygame.display.get_surface() is None:
+            return surface
+        if surface.get_flags() & pygame.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def _worker(self):
+        while True:
+            entry = self.jobs.get()
+            try:
+                self._load(entry)
+            except (pygame.error, OSError) as e:
+                print(f"Could not load image {entry.path}:", e)
+                entry.error = str(e)
+            finally:
+                entry.ready.set()
+
+    def _load(self, entry):
+        timings = entry.timings
+        start = time.perf_counter()
+        cached = read_cached(entry.path, entry.size)
+        if cached is not None:
+            surface, digest = cached
+            timings["cache"] = time.perf_counter() - start
+            content_key = (digest, entry.size)
+            with self.lock:
+                shared = self.by_content.setdefault(content_key, entry)
+            entry.surface = surface if shared is entry else shared.surface
+            return
+
+        start = time.perf_counter()
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        timings["read"] = time.perf_counter() - start
+
+        digest = hashlib.sha1(data).digest()
+        content_key = (digest, entry.size)
+        with self.lock:
+            shared = self.by_content.get(content_key)
+        if shared is not None:
+            # Same bytes already loaded under another name
+            shared.ready.wait()
+            entry.surface = shared.surface
+            timings["shared_with"] = shared.path
+            return
+
+        with self.lock:
+            self.by_content[content_key] = entry
+        start = time.perf_counter()
+        surface = pygame.image.load(io.BytesIO(data), os.path.basename(entry.path))
+        timings["decode"] = time.perf_counter() - start
+        if entry.size and surface.get_size() != entry.size:
+            start = time.perf_counter()
+            surface = pygame.transform.scale(surface, entry.size)
+            timings["scale"] = time.perf_counter() - start
+        entry.surface = surface
+        if entry.size:
+            start = time.perf_counter()
+            write_cached(entry.path, entry.size, surface, digest)
+            timings["cache_write"] = time.perf_counter() - start
+
+
+assets = AssetManager()
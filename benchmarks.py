@@ -0,0 +1,378 @@
+"""Headless benchmarks for rendering, move generation, the AI and questions.
+
+Runs with SDL's dummy video and audio drivers, so it works on machines
+without a display. Every metric is stored with its unit and whether
+higher or lower is better; --baseline compares against a saved run and
+exits with status 1 if anything regressed by more than --threshold.
+Examples:
+
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --baseline baseline.json --threshold 0.15
+    python benchmarks.py --only movegen,ai --ai-positions 10
+"""
+import os
+
+# Must be set before pygame is imported anywhere
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Benchmark runs are not games; keep them out of the event log, scores
+# and game records
+os.environ.setdefault("MATH_RUSH_EVENT_LOG", "")
+os.environ.setdefault("MATH_RUSH_SCORES", ":memory:")
+os.environ.setdefault("MATH_RUSH_RECORDS", "")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from ai import STRATEGIES, make_player
+from bitboard import iter_bits, row_col
+from question_bank import LEVELS, QuestionBank
+from rules import GameState, MoveCache, OPERATIONS
+
+now = time.perf_counter
+
+SUITES = ("screens", "movegen", "ai", "questions", "startup")
+
+
+def metric(value, unit, better="higher", noise=0.0):
+    # Changes no bigger than `noise` (in the metric's unit) are never flagged
+    return {"value": value, "unit": unit, "better": better, "noise": noise}
+
+
+def make_corpus(count, seed, difficulty="Medium"):
+    # Positions from seeded random games, cycling through the operations
+    rng = random.Random(seed)
+    corpus = []
+    game = 0
+    while len(corpus) < count:
+        operation = OPERATIONS[game % len(OPERATIONS)]
+        game += 1
+        state = GameState.new(difficulty, operation, rng)
+        while state.winner() is None and len(corpus) < count:
+            corpus.append(state.copy())
+            moves = state.legal_moves()
+            state.apply_move(rng.choice(moves), rng.random() < 0.7)
+    return corpus
+
+
+# --- Screens ---
+def _frames_per_second(frames, step):
+    import pygame
+    start = now()
+    for i in range(frames):
+        pygame.event.pump()
+        dirty = step(i)
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+    return frames / (now() - start)
+
+
+def bench_screens(frames, seed):
+    import pygame
+    import main
+    from assets import assets
+    from scenes import SceneManager
+    from sci_dama import DamaBoardScene, SciDamaGame
+
+    screen = main.screen
+    assets.wait_all()
+    manager = SceneManager(screen)
+    results = {}
+
+    menu = main.MainMenuScene()
+    manager.push(menu)
+    x = main.WIDTH // 2
+
+    def menu_step(i):
+        # Redraw every frame, as if the pointer kept crossing the buttons
+        menu.handle_event(pygame.event.Event(pygame.MOUSEMOTION, pos=(x, 245 + 60 * (i % 4)),
+                                             rel=(0, 0), buttons=(0, 0, 0)))
+        return menu.draw(screen)
+
+    results["screen.main_menu.fps"] = metric(_frames_per_second(frames, menu_step), "fps")
+
+    game_scene = main.MathRushScene("Medium", 30)
+    manager.push(game_scene)
+    keys = [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_1, unicode="1"),
+            pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="\b")]
+
+    def quiz_step(i):
+        # Typing and deleting, but never submitting, so no game is recorded
+        if i % 5 == 0:
+            game_scene.handle_event(keys[(i // 5) % 2])
+        game_scene.update()
+        return game_scene.draw(screen)
+
+    results["screen.math_rush_game.fps"] = metric(_frames_per_second(frames, quiz_step), "fps")
+    manager.pop()
+
+    rng = random.Random(seed)
+    game = SciDamaGame(screen, main.WIDTH, main.HEIGHT)
+    game.start()
+    board = DamaBoardScene(game)
+    manager.push(board)
+
+    def board_step(i):
+        # A move every fourth frame, selection changes in between
+        state = game.state
+        if state.winner() is not None:
+            game.start()
+        elif i % 4 == 0:
+            game.selected = None
+            game.valid_moves = []
+            state.apply_move(rng.choice(state.legal_moves()), rng.random() < 0.7)
+        elif i % 4 == 2:
+            src = rng.choice(state.legal_moves())[0]
+            game.selected = row_col(src)
+            game.valid_moves = game.get_valid_moves(*game.selected)
+        return board.draw(screen)
+
+    results["screen.sci_dama.fps"] = metric(_frames_per_second(frames, board_step), "fps")
+    return results
+
+
+# --- Move generation ---
+def bench_movegen(corpus, repeat=3):
+    from sci_dama import SciDamaGame
+
+    class _Game:
+        # Just enough of SciDamaGame for its move queries
+        get_valid_moves = SciDamaGame.get_valid_moves
+        has_any_moves = SciDamaGame.has_any_moves
+
+    game = _Game()
+    pieces = [[row_col(sq) for sq in iter_bits(state.position.bits(state.turn))] for state in corpus]
+    results = {}
+
+    calls = 0
+    start = now()
+    for _ in range(repeat):
+        for state, own in zip(corpus, pieces):
+            game.state = state
+            for row, col in own:
+                game.get_valid_moves(row, col)
+            calls += len(own)
+    results["movegen.get_valid_moves.per_s"] = metric(calls / (now() - start), "calls/s")
+
+    calls = 0
+    start = now()
+    for _ in range(repeat):
+        for state in corpus:
+            game.state = state
+            game.has_any_moves(1)
+            game.has_any_moves(2)
+            calls += 2
+    results["movegen.has_any_moves.per_s"] = metric(calls / (now() - start), "calls/s")
+
+    calls = 0
+    start = now()
+    for _ in range(repeat):
+        for state in corpus:
+            pos = state.position
+            for sq in iter_bits(pos.occupied):
+                pos.moves_from(sq)
+                calls += 1
+    results["movegen.position_moves_from.per_s"] = metric(calls / (now() - start), "calls/s")
+
+    start = now()
+    for _ in range(repeat):
+        for state in corpus:
+            MoveCache(state.position)
+    results["movegen.cache_build.per_s"] = metric(repeat * len(corpus) / (now() - start), "positions/s")
+    return results
+
+
+# --- AI ---
+def bench_ai(corpus, positions, time_limit, seed):
+    results = {}
+    sample = corpus[::max(1, len(corpus) // positions)][:positions]
+    for name in STRATEGIES:
+        players = {op: make_player(name, op, random.Random(seed), time_limit=time_limit) for op in OPERATIONS}
+        times = []
+        depths = []
+        rates = []
+        for state in sample:
+            player = players[state.operation]
+            state = state.copy()
+            start = now()
+            player(state)
+            times.append((now() - start) * 1000)
+            engine = getattr(player, "engine", None)
+            if engine is not None:
+                depths.append(engine.depth_reached)
+            searcher = getattr(player, "searcher", None)
+            if searcher is not None:
+                rates.append(searcher.playouts_per_second)
+        times.sort()
+        key = f"ai.{name.lower()}"
+        if depths:
+            results[key + ".mean_depth"] = metric(statistics.mean(depths), "plies")
+        if rates:
+            results[key + ".playouts_per_s"] = metric(statistics.mean(rates), "playouts/s")
+        results[key + ".p50_ms"] = metric(statistics.median(times), "ms", "lower", noise=1.0)
+        results[key + ".p95_ms"] = metric(times[min(len(times) - 1, int(0.95 * len(times)))], "ms", "lower", noise=1.0)
+        results[key + ".max_ms"] = metric(times[-1], "ms", "lower", noise=1.0)
+    return results
+
+
+# --- Questions ---
+def bench_questions(count, seed):
+    results = {}
+    bank = QuestionBank(seed)
+    for level in LEVELS:
+        start = now()
+        for _ in range(count):
+            bank.next(level)
+        results[f"questions.level{level}.per_s"] = metric(count / (now() - start), "questions/s")
+    return results
+
+
+# --- Startup ---
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+from assets import assets
+from scenes import SceneManager
+import pygame
+imported = time.perf_counter()
+assets.wait_all()
+scene = main.MainMenuScene()
+SceneManager(main.screen).push(scene)
+scene.draw(main.screen)
+pygame.display.flip()
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def bench_startup(runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    imports, first_frames, totals = [], [], []
+    for _ in range(runs):
+        start = now()
+        out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=here, env=os.environ.copy(),
+                             capture_output=True, text=True, check=True).stdout
+        totals.append(now() - start)
+        imported, first_frame = map(float, out.split()[-2:])
+        imports.append(imported)
+        first_frames.append(first_frame)
+    return {
+        "startup.import_main_s": metric(statistics.median(imports), "s", "lower"),
+        "startup.first_menu_frame_s": metric(statistics.median(first_frames), "s", "lower"),
+        "startup.process_s": metric(statistics.median(totals), "s", "lower"),
+    }
+
+
+# --- Reporting ---
+def compare(current, baseline, threshold):
+    # Returns [(name, base, current, change, regressed)] for shared metrics
+    rows = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        if cur["better"] == "higher":
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        if abs(cur["value"] - base["value"]) <= cur.get("noise", 0.0):
+            regressed = False
+        rows.append((name, base["value"], cur["value"], change, regressed))
+    return rows
+
+
+def print_results(results):
+    width = max(len(name) for name in results)
+    for name, m in results.items():
+        print(f"{name:<{width}}  {m['value']:>14.3f} {m['unit']}")
+
+
+def print_comparison(rows, threshold):
+    width = max(len(row[0]) for row in rows)
+    print(f"\n{'metric':<{width}}  {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, base, cur, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<{width}}  {base:>12.3f} {cur:>12.3f} {change:>+8.1%}{flag}")
+    regressions = sum(row[4] for row in rows)
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Math Rush / Sci-Dama benchmarks")
+    parser.add_argument("--only", default=",".join(SUITES),
+                        help="comma-separated suites, from: " + ", ".join(SUITES))
+    parser.add_argument("--frames", type=int, default=600, help="frames rendered per screen")
+    parser.add_argument("--positions", type=int, default=500, help="positions in the move generation corpus")
+    parser.add_argument("--ai-positions", type=int, default=20, help="positions timed per AI difficulty")
+    parser.add_argument("--time-limit", type=float, default=0.25, help="seconds per move for the Hard AI")
+    parser.add_argument("--questions", type=int, default=200000, help="questions drawn per level")
+    parser.add_argument("--startup-runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--results", help="compare this saved JSON file instead of running the suites")
+    parser.add_argument("--baseline", help="saved JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as f:
+            report = json.load(f)
+    else:
+        suites = [name.strip() for name in args.only.split(",") if name.strip()]
+        for name in suites:
+            if name not in SUITES:
+                parser.error(f"unknown suite {name!r}")
+        import pygame
+        report = {
+            "meta": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "pygame": pygame.version.ver,
+                "platform": platform.platform(),
+                "seed": args.seed,
+            },
+            "results": {},
+        }
+        results = report["results"]
+        corpus = make_corpus(args.positions, args.seed) if {"movegen", "ai"} & set(suites) else None
+        for name in suites:
+            start = now()
+            if name == "screens":
+                results.update(bench_screens(args.frames, args.seed))
+            elif name == "movegen":
+                results.update(bench_movegen(corpus))
+            elif name == "ai":
+                results.update(bench_ai(corpus, args.ai_positions, args.time_limit, args.seed))
+            elif name == "questions":
+                results.update(bench_questions(args.questions, args.seed))
+            elif name == "startup":
+                results.update(bench_startup(args.startup_runs))
+            print(f"[{name}] {now() - start:.1f}s", file=sys.stderr)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+
+    print_results(report["results"])
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report["results"], baseline["results"], args.threshold)
+        if rows:
+            print_comparison(rows, args.threshold)
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
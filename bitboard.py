@@ -0,0 +1,233 @@
+"""Bitboard position for Sci-Dama.
+
+Squares are numbered row * 8 + col, so bit 0 is the top-left corner and
+bit 63 the bottom-right. Red (1) starts at the top and moves down, Blue (2)
+starts at the bottom and moves up. Piece numbers live in a flat 64-entry
+array indexed by square.
+"""
+from array import array
+
+ROWS, COLS = 8, 8
+EMPTY, RED, BLUE = 0, 1, 2
+
+FULL = (1 << 64) - 1
+COL_0 = 0x0101010101010101
+COL_7 = COL_0 << 7
+NOT_COL_0 = FULL ^ COL_0
+NOT_COL_7 = FULL ^ COL_7
+
+# Same direction order as the original list-of-lists move generator
+KING_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+MAN_DIRECTIONS = {
+    RED: ((1, -1), (1, 1)),
+    BLUE: ((-1, -1), (-1, 1)),
+}
+PROMOTION_ROW = {RED: ROWS - 1, BLUE: 0}
+
+
+def square(row, col):
+    return row * COLS + col
+
+
+def _diagonals(sq):
+    row, col = divmod(sq, COLS)
+    mask = 0
+    for r in range(ROWS):
+        for c in range(COLS):
+            if r - c == row - col or r + c == row + col:
+                mask |= 1 << (r * COLS + c)
+    return mask
+
+
+# DIAGONALS[sq] covers both diagonals through sq, sq included. A piece's
+# moves only depend on the squares along its own diagonals.
+DIAGONALS = [_diagonals(sq) for sq in range(ROWS * COLS)]
+
+
+def row_col(sq):
+    return divmod(sq, COLS)
+
+
+def shift(bb, dr, dc):
+    # Move every bit one step in (dr, dc), dropping bits that leave the board
+    delta = dr * COLS + dc
+    if delta > 0:
+        bb = (bb << delta) & FULL
+    else:
+        bb >>= -delta
+    if dc > 0:
+        return bb & NOT_COL_0
+    if dc < 0:
+        return bb & NOT_COL_7
+    return bb
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def opponent(color):
+    return BLUE if color == RED else RED
+
+
+class Position:
+    __slots__ = ("red", "blue", "kings", "numbers")
+
+    def __init__(self, red=0, blue=0, kings=0, numbers=None):
+        self.red = red
+        self.blue = blue
+        self.kings = kings
+        self.numbers = numbers if numbers is not None else array("B", bytes(ROWS * COLS))
+
+    @classmethod
+    def initial(cls, num_min, num_max, rng):
+        pos = cls()
+        for row in range(ROWS):
+            if 3 <= row < 5:
+                continue
+            color = RED if row < 3 else BLUE
+            for col in range(COLS):
+                if (row + col) % 2 == 1:
+                    pos.place(square(row, col), color, rng.randint(num_min, num_max))
+        return pos
+
+    def copy(self):
+        return Position(self.red, self.blue, self.kings, array("B", self.numbers))
+
+    # --- Queries ---
+    @property
+    def occupied(self):
+        return self.red | self.blue
+
+    @property
+    def empty(self):
+        return FULL ^ (self.red | self.blue)
+
+    def bits(self, color):
+        return self.red if color == RED else self.blue
+
+    def color_at(self, sq):
+        bit = 1 << sq
+        if self.red & bit:
+            return RED
+        if self.blue & bit:
+            return BLUE
+        return EMPTY
+
+    def piece_at(self, row, col):
+        return self.color_at(square(row, col))
+
+    def number_at(self, row, col):
+        return self.numbers[square(row, col)]
+
+    def is_king(self, row, col):
+        return bool(self.kings & (1 << square(row, col)))
+
+    def count(self, color):
+        return self.bits(color).bit_count()
+
+    # --- Move generation ---
+    def moves_from(self, sq):
+        # Returns (dest, captured) pairs; captured is -1 for a plain move
+        bit = 1 << sq
+        if self.red & bit:
+            own, enemy, color = self.red, self.blue, RED
+        elif self.blue & bit:
+            own, enemy, color = self.blue, self.red, BLUE
+        else:
+            return []
+        empty = FULL ^ (own | enemy)
+        moves = []
+        if self.kings & bit:
+            for dr, dc in KING_DIRECTIONS:
+                # King can move/capture any distance
+                step = shift(bit, dr, dc)
+                while step & empty:
+                    moves.append((step.bit_length() - 1, -1))
+                    step = shift(step, dr, dc)
+                if step & enemy:
+                    captured = step.bit_length() - 1
+                    land = shift(step, dr, dc)
+                    while land & empty:
+                        moves.append((land.bit_length() - 1, captured))
+                        land = shift(land, dr, dc)
+        else:
+            for dr, dc in MAN_DIRECTIONS[color]:
+                step = shift(bit, dr, dc)
+                if step & empty:
+                    moves.append((step.bit_length() - 1, -1))
+                elif step & enemy:
+                    land = shift(step, dr, dc)
+                    if land & empty:
+                        moves.append((land.bit_length() - 1, step.bit_length() - 1))
+        return moves
+
+    def movable(self, color):
+        # Bitboard of the pieces of `color` that have at least one legal move.
+        # A king's first step decides its mobility exactly like a man's does,
+        # so the whole side is resolved with a handful of shifts.
+        if color == RED:
+            own, enemy = self.red, self.blue
+        else:
+            own, enemy = self.blue, self.red
+        empty = FULL ^ (own | enemy)
+        kings = own & self.kings
+        men = own ^ kings
+        result = 0
+        for dr, dc in KING_DIRECTIONS:
+            pieces = kings
+            if (dr, dc) in MAN_DIRECTIONS[color]:
+                pieces |= men
+            if not pieces:
+                continue
+            # Targets are walked back to the origin square with the opposite shift
+            quiet = shift(pieces, dr, dc) & empty
+            jumps = shift(shift(pieces, dr, dc) & enemy, dr, dc) & empty
+            result |= shift(quiet, -dr, -dc) | shift(shift(jumps, -dr, -dc), -dr, -dc)
+        return result
+
+    def has_moves(self, color):
+        return self.movable(color) != 0
+
+    # --- Updates ---
+    def place(self, sq, color, number, king=False):
+        bit = 1 << sq
+        if color == RED:
+            self.red |= bit
+        else:
+            self.blue |= bit
+        if king:
+            self.kings |= bit
+        self.numbers[sq] = number
+
+    def remove(self, sq):
+        mask = FULL ^ (1 << sq)
+        self.red &= mask
+        self.blue &= mask
+        self.kings &= mask
+        self.numbers[sq] = 0
+
+    def move(self, src, dst):
+        # Move the piece on src to dst, promoting it on the far row.
+        # Returns True if this move crowned the piece.
+        src_bit, dst_bit = 1 << src, 1 << dst
+        both = src_bit | dst_bit
+        if self.red & src_bit:
+            self.red ^= both
+            color = RED
+        else:
+            self.blue ^= both
+            color = BLUE
+        if self.kings & src_bit:
+            self.kings ^= both
+            promoted = False
+        else:
+            promoted = dst // COLS == PROMOTION_ROW[color]
+            if promoted:
+                self.kings |= dst_bit
+        self.numbers[dst] = self.numbers[src]
+        self.numbers[src] = 0
+        return promoted
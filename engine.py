@@ -0,0 +1,343 @@
+"""Alpha-beta search for the Sci-Dama "Hard" AI.
+
+Negamax with iterative deepening, a capture-only quiescence search, move
+ordering (transposition-table move, captures by points, killers, history)
+and a Zobrist-hashed transposition table of fixed size. The search stops
+when its time budget runs out and returns the best move of the last
+completed depth.
+
+Given an opening book (opening_book.py) the search plays its move
+straight away while the game is still in the book, and given an endgame
+tablebase (tablebase.py) it scores one-against-one positions exactly
+instead of searching them.
+"""
+import random
+import time
+
+from bitboard import RED, BLUE, iter_bits, opponent
+from rules import calculate_score, result
+
+WIN_SCORE = 100000
+MATE_BOUND = WIN_SCORE - 1000
+# Tablebase wins rank below a win on the board but above MATE_BOUND
+TABLEBASE_WIN = WIN_SCORE - 500
+EXACT, LOWER, UPPER = 0, 1, 2
+
+MASK64 = (1 << 64) - 1
+MAX_NUMBER = 64
+
+_zobrist = random.Random(20240601)
+# PIECE_KEYS[color][king][square], NUMBER_KEYS[square][number]
+PIECE_KEYS = [[[_zobrist.getrandbits(64) for _ in range(64)] for _ in range(2)] for _ in range(3)]
+NUMBER_KEYS = [[_zobrist.getrandbits(64) for _ in range(MAX_NUMBER)] for _ in range(64)]
+SIDE_KEY = _zobrist.getrandbits(64)
+del _zobrist
+
+
+def zobrist_hash(position):
+    h = 0
+    for color in (RED, BLUE):
+        for sq in iter_bits(position.bits(color)):
+            h ^= PIECE_KEYS[color][position.kings >> sq & 1][sq]
+            h ^= NUMBER_KEYS[sq][position.numbers[sq] % MAX_NUMBER]
+    return h
+
+
+def _score_key(diff):
+    # The running score difference decides who wins at the end, so it is
+    # part of the table key
+    return (diff * 0x9E3779B97F4A7C15) & MASK64
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchEngine:
+    def __init__(self, operation='+', time_limit=0.25, max_depth=64, tt_bits=18,
+                 book=None, tablebase=None):
+        self.operation = operation
+        self.book = book
+        self.tablebase = tablebase
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.tt_size = 1 << tt_bits
+        self.tt_mask = self.tt_size - 1
+        self.table = [None] * self.tt_size
+        self.generation = 0
+        self.nodes = 0
+        self.depth_reached = 0
+        self.deadline = 0.0
+        self.stop = None
+        self.killers = []
+        self.history = {}
+
+    # --- Public API ---
+    def search(self, position, color, score_diff=0, time_limit=None, stop=None):
+        """Return the best move for `color` as (src, dst, captured) or None.
+
+        `score_diff` is color's score minus the opponent's score so far.
+        Setting the threading.Event `stop` ends the search early, like
+        running out of time.
+        """
+        pos = position.copy()
+        limit = self.time_limit if time_limit is None else time_limit
+        self.deadline = time.perf_counter() + limit
+        self.stop = stop
+        self.generation = (self.generation + 1) & 0xFF
+        self.nodes = 0
+        self.depth_reached = 0
+        self.killers = [[None, None] for _ in range(self.max_depth + 1)]
+        self.history = {}
+        self.hash = zobrist_hash(pos)
+        if color == BLUE:
+            self.hash ^= SIDE_KEY
+
+        moves = self.generate_moves(pos, color)
+        if not moves:
+            return None
+        if self.book is not None:
+            move = self.book.probe(pos, color, self.operation)
+            if move in moves:
+                return move
+        best_move = self.order_moves(pos, moves, None, 0)[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value, move = self._root(pos, color, score_diff, depth)
+            except SearchTimeout:
+                break
+            if move is not None:
+                best_move = move
+            self.depth_reached = depth
+            if abs(value) >= MATE_BOUND:
+                break
+        return best_move
+
+    def clear(self):
+        self.table = [None] * self.tt_size
+
+    # --- Move generation and ordering ---
+    def generate_moves(self, pos, color):
+        moves = []
+        for sq in iter_bits(pos.bits(color)):
+            for dst, cap in pos.moves_from(sq):
+                moves.append((sq, dst, cap))
+        return moves
+
+    def capture_gain(self, pos, move):
+        src, _, cap = move
+        return calculate_score(self.operation, pos.numbers[src], pos.numbers[cap])
+
+    def order_moves(self, pos, moves, tt_move, ply):
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        history = self.history
+
+        def key(move):
+            if move == tt_move:
+                return 1 << 40
+            if move[2] >= 0:
+                return (1 << 30) + self.capture_gain(pos, move)
+            if move == killers[0] or move == killers[1]:
+                return 1 << 20
+            return history.get(move, 0)
+
+        return sorted(moves, key=key, reverse=True)
+
+    # --- Make / unmake ---
+    def make(self, pos, move):
+        src, dst, cap = move
+        saved = (self.hash, pos.red, pos.blue, pos.kings)
+        if cap >= 0:
+            cap_color = pos.color_at(cap)
+            self.hash ^= PIECE_KEYS[cap_color][pos.kings >> cap & 1][cap]
+            self.hash ^= NUMBER_KEYS[cap][pos.numbers[cap] % MAX_NUMBER]
+            cap_num = pos.numbers[cap]
+            pos.remove(cap)
+        else:
+            cap_num = 0
+        color = pos.color_at(src)
+        num = pos.numbers[src] % MAX_NUMBER
+        self.hash ^= PIECE_KEYS[color][pos.kings >> src & 1][src] ^ NUMBER_KEYS[src][num]
+        pos.move(src, dst)
+        self.hash ^= PIECE_KEYS[color][pos.kings >> dst & 1][dst] ^ NUMBER_KEYS[dst][num]
+        self.hash ^= SIDE_KEY
+        return saved, cap_num
+
+    def unmake(self, pos, move, undo):
+        src, dst, cap = move
+        (self.hash, pos.red, pos.blue, pos.kings), cap_num = undo
+        pos.numbers[src] = pos.numbers[dst]
+        pos.numbers[dst] = 0
+        if cap >= 0:
+            pos.numbers[cap] = cap_num
+
+    # --- Evaluation ---
+    def terminal_value(self, pos, color, diff):
+        # Returns None while play goes on
+        red, blue = (diff, 0) if color == RED else (0, diff)
+        winner = result(pos, red, blue)
+        if winner is None:
+            return None
+        value = WIN_SCORE + abs(diff)
+        return value if winner == color else -value
+
+    def potential(self, pos, own, enemy):
+        # Points the pieces in `own` can still expect to earn against the
+        # average piece in `enemy`. Captures are optional, so a piece that
+        # would only lose points (e.g. small minus big) counts as zero.
+        enemy_count = enemy.bit_count()
+        if not enemy_count:
+            return 0
+        numbers = pos.numbers
+        target = sum(numbers[sq] for sq in iter_bits(enemy)) / enemy_count
+        op = self.operation
+        total = 0.0
+        for sq in iter_bits(own):
+            n = numbers[sq]
+            if op == '+':
+                gain = n + target
+            elif op == '-':
+                gain = n - target
+            elif op == '*':
+                gain = n * target
+            elif op == '/':
+                gain = n / target if target else n
+            else:
+                gain = n + target
+            if gain > 0:
+                total += gain * 1.5 if pos.kings >> sq & 1 else gain
+        return total
+
+    def evaluate(self, pos, color, diff):
+        own = pos.bits(color)
+        enemy = pos.bits(opponent(color))
+        # Only the opponent's pieces that are left to capture matter, and
+        # each side is unlikely to realise all of its potential
+        value = self.potential(pos, own, enemy) - self.potential(pos, enemy, own)
+        return diff + int(value * 0.5)
+
+    # --- Search ---
+    def _check_time(self):
+        self.nodes += 1
+        if not self.nodes & 255 and (time.perf_counter() > self.deadline
+                                     or self.stop is not None and self.stop.is_set()):
+            raise SearchTimeout
+
+    def _root(self, pos, color, diff, depth):
+        alpha, beta = -WIN_SCORE * 2, WIN_SCORE * 2
+        key = self.hash ^ _score_key(diff)
+        entry = self.table[key & self.tt_mask]
+        tt_move = entry[4] if entry is not None and entry[0] == key else None
+        moves = self.order_moves(pos, self.generate_moves(pos, color), tt_move, 0)
+        best_move = None
+        opp = opponent(color)
+        for move in moves:
+            gain = self.capture_gain(pos, move) if move[2] >= 0 else 0
+            undo = self.make(pos, move)
+            try:
+                value = -self._negamax(pos, opp, -(diff + gain), depth - 1, -beta, -alpha, 1)
+            finally:
+                self.unmake(pos, move, undo)
+            if value > alpha:
+                alpha = value
+                best_move = move
+        self._store(key, depth, EXACT, alpha, best_move)
+        return alpha, best_move
+
+    def _negamax(self, pos, color, diff, depth, alpha, beta, ply):
+        self._check_time()
+        terminal = self.terminal_value(pos, color, diff)
+        if terminal is not None:
+            return terminal - ply if terminal > 0 else terminal + ply
+        if self.tablebase is not None:
+            known = self.tablebase.probe(pos, color, self.operation, diff if color == RED else -diff)
+            if known is not None:
+                winner, plies = known
+                value = TABLEBASE_WIN - plies - ply
+                return value if winner == color else -value
+        if depth <= 0 or ply >= self.max_depth:
+            return self._quiesce(pos, color, diff, alpha, beta, ply)
+
+        key = self.hash ^ _score_key(diff)
+        entry = self.table[key & self.tt_mask]
+        tt_move = None
+        if entry is not None and entry[0] == key:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                flag, value = entry[2], entry[3]
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+
+        alpha_orig = alpha
+        best_value = -WIN_SCORE * 2
+        best_move = None
+        opp = opponent(color)
+        for move in self.order_moves(pos, self.generate_moves(pos, color), tt_move, ply):
+            gain = self.capture_gain(pos, move) if move[2] >= 0 else 0
+            undo = self.make(pos, move)
+            try:
+                value = -self._negamax(pos, opp, -(diff + gain), depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                self.unmake(pos, move, undo)
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                if move[2] < 0:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, depth, flag, best_value, best_move)
+        return best_value
+
+    def _quiesce(self, pos, color, diff, alpha, beta, ply):
+        self._check_time()
+        # Captures are never forced, so the side to move may stand pat
+        stand_pat = self.evaluate(pos, color, diff)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        opp = opponent(color)
+        captures = [m for m in self.generate_moves(pos, color) if m[2] >= 0]
+        captures.sort(key=lambda m: self.capture_gain(pos, m), reverse=True)
+        for move in captures:
+            gain = self.capture_gain(pos, move)
+            undo = self.make(pos, move)
+            try:
+                terminal = self.terminal_value(pos, opp, -(diff + gain))
+                if terminal is not None:
+                    value = -(terminal - ply - 1 if terminal > 0 else terminal + ply + 1)
+                else:
+                    value = -self._quiesce(pos, opp, -(diff + gain), -beta, -alpha, ply + 1)
+            finally:
+                self.unmake(pos, move, undo)
+            if value >= beta:
+                return value
+            if value > alpha:
+                alpha = value
+        return alpha
+
+    def _store(self, key, depth, flag, value, move):
+        # Depth-preferred replacement; entries left over from an earlier
+        # search are always overwritten
+        index = key & self.tt_mask
+        entry = self.table[index]
+        if entry is None or entry[5] != self.generation or depth >= entry[1]:
+            self.table[index] = (key, depth, flag, value, move, self.generation)
@@ -0,0 +1,137 @@
+"""Append-only log of what happens in each game session.
+
+log_event() only checks the fields and puts the record on a queue; a
+background thread writes the queue out in batches, so the frame loop never
+waits on the disk. Records are JSON lines with a fixed schema:
+
+    {"v": 1, "ts": <unix time>, "session": <id>, "player": <name>,
+     "seq": <n>, "event": <type>, <the fields listed in SCHEMA for it>}
+
+The file is rotated once it passes max_bytes (events.jsonl.1 is the most
+recent old file). Set MATH_RUSH_EVENT_LOG to change the path, or to an
+empty string to turn logging off.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+from scores import current_player
+
+LOG_PATH = os.environ.get("MATH_RUSH_EVENT_LOG", os.path.join("logs", "events.jsonl"))
+SCHEMA_VERSION = 1
+
+SCHEMA = {
+    "game_start": ("mode", "difficulty", "variant"),
+    "question": ("mode", "level", "question", "answer"),
+    "answer": ("mode", "question", "given", "correct", "elapsed_ms"),
+    "timeout": ("mode", "question", "answer"),
+    "level_change": ("mode", "old", "new"),
+    "move": ("mode", "color", "src", "dst", "jumped", "captured", "points", "promoted", "failed"),
+    "game_end": ("mode", "difficulty", "score", "opponent_score", "won"),
+}
+
+
+class EventLog:
+    def __init__(self, path=LOG_PATH, max_bytes=5 << 20, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.session = uuid.uuid4().hex[:12]
+        self.player = current_player()
+        self.seq = 0
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def log(self, event, **fields):
+        keys = SCHEMA.get(event)
+        if keys is None or len(fields) != len(keys) or any(k not in fields for k in keys):
+            raise ValueError(f"Event {event!r} needs fields {keys}, got {tuple(fields)}")
+        if not self.path:
+            return
+        self.seq += 1
+        self.queue.put((time.time(), self.seq, event, fields))
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._writer, name="event-log", daemon=True)
+                    self.thread.start()
+
+    def close(self, timeout=2.0):
+        # Writes out everything still queued
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _record(self, ts, seq, event, fields):
+        record = {"v": SCHEMA_VERSION, "ts": round(ts, 3), "session": self.session,
+                  "player": self.player, "seq": seq, "event": event}
+        for key in SCHEMA[event]:
+            record[key] = fields[key]
+        return json.dumps(record, separators=(",", ":"))
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(self.path, "a", encoding="utf-8", newline="\n")
+
+    def _rotate(self, f):
+        f.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        return self._open()
+
+    def _writer(self):
+        f = None
+        size = 0
+        done = False
+        while not done:
+            # Block for the first record, then take whatever else is queued
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                done = True
+                batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+            try:
+                if f is None:
+                    f = self._open()
+                    size = f.tell()
+                for item in batch:
+                    # json.dumps escapes non-ASCII, so characters are bytes
+                    line = self._record(*item) + "\n"
+                    f.write(line)
+                    size += len(line)
+                    if size >= self.max_bytes:
+                        f = self._rotate(f)
+                        size = 0
+                f.flush()
+            except OSError as e:
+                print("Could not write event log:", e)
+                if f is not None:
+                    f.close()
+                    f = None
+        if f is not None:
+            f.close()
+
+
+event_log = EventLog()
+atexit.register(event_log.close)
+
+
+def log_event(event, **fields):
+    event_log.log(event, **fields)
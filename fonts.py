@@ -0,0 +1,36 @@
+"""Process-wide font registry.
+
+pygame.font.SysFont searches the system font list on every call, so each
+(family, size, bold) is resolved once here and the Font object shared by
+everyone who asks for it afterwards.
+"""
+import pygame
+
+# Every font the game uses; prewarm() loads them up front
+GAME_FONTS = (
+    ("Arial", 36, False),   # Math Rush FONT
+    ("Arial", 24, False),   # Math Rush SMALL_FONT
+    ("Arial", 32, False),   # Sci-Dama FONT
+    ("Arial", 20, False),   # Sci-Dama SMALL_FONT
+    ("Arial", 20, True),    # Sci-Dama PIECE_FONT
+    ("Arial", 18, True),    # Sci-Dama KING_FONT
+    ("Arial", 22, False),   # Sci-Dama Button
+)
+
+_fonts = {}
+
+
+def get_font(family, size, bold=False):
+    key = (family.lower(), size, bool(bold))
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.SysFont(family, size, bold=bold)
+        _fonts[key] = font
+    return font
+
+
+def prewarm(specs=GAME_FONTS):
+    for family, size, bold in specs:
+        get_font(family, size, bold)
@@ -0,0 +1,134 @@
+"""Input-to-feedback latency instrumentation for the quiz loops.
+
+Everything is stamped with time.perf_counter, a monotonic high-resolution
+clock. The quiz loops call:
+
+    key(stamp)        when a keystroke is handled
+    submit(stamp)     when an answer is submitted (Enter or the Submit button)
+    answered(seconds) with the time the player took to answer
+    rendered()        right after the frame is pushed to the display
+    polled()          whenever the event queue is read
+
+rendered() closes every pending keystroke and submit, so the histograms
+hold how long the player waited to see the result of their input.
+polled() records the gap between event polls, an upper bound on how long
+an event sat in the queue before the game looked at it.
+"""
+import bisect
+import os
+import time
+
+now = time.perf_counter
+
+# Upper bucket bounds in milliseconds; the last bucket is open ended
+BUCKETS_MS = (1, 2, 4, 8, 12, 16, 20, 33, 50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile
+        if not self.count:
+            return None
+        target = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count,
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+        }
+
+    def buckets(self):
+        labels = [f"<={b}ms" for b in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return dict(zip(labels, self.counts))
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.histograms = {}
+        self.pending = []
+        self.last_poll = None
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        return hist
+
+    def key(self, stamp=None):
+        self.pending.append(("key_to_echo", now() if stamp is None else stamp))
+
+    def submit(self, stamp=None):
+        self.pending.append(("input_to_feedback", now() if stamp is None else stamp))
+
+    def answered(self, seconds):
+        self.histogram("answer_time").add(seconds * 1000)
+
+    def polled(self):
+        stamp = now()
+        if self.last_poll is not None:
+            self.histogram("poll_gap").add((stamp - self.last_poll) * 1000)
+        self.last_poll = stamp
+        return stamp
+
+    def rendered(self):
+        if not self.pending:
+            return
+        stamp = now()
+        for name, start in self.pending:
+            self.histogram(name).add((stamp - start) * 1000)
+        self.pending.clear()
+
+    def reset_poll(self):
+        # Call when a loop starts so the wait before it doesn't count as a gap
+        self.last_poll = None
+
+    def report(self):
+        return {name: dict(hist.summary(), buckets=hist.buckets())
+                for name, hist in sorted(self.histograms.items())}
+
+    def format_report(self):
+        lines = ["Latency (ms)        count    mean     p50     p90     p99     max"]
+        for name, hist in sorted(self.histograms.items()):
+            s = hist.summary()
+            if not s["count"]:
+                continue
+            lines.append(f"{name:<18}{s['count']:>7}{s['mean_ms']:>8.1f}{s['p50_ms']:>8.0f}"
+                         f"{s['p90_ms']:>8.0f}{s['p99_ms']:>8.0f}{s['max_ms']:>8.0f}")
+        return "\n".join(lines)
+
+
+recorder = LatencyRecorder()
+
+
+def print_report_if_enabled():
+    # Set MATH_RUSH_LATENCY=1 to print the histograms after each game
+    if os.environ.get("MATH_RUSH_LATENCY"):
+        print(recorder.format_report())
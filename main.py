@@ -1,38 +1,42 @@
+import multiprocessing
+import os
+
+# Worker processes of the Expert AI (mcts.py) import this script again on
+# platforms that spawn them; they only run searches, so keep them headless
+if multiprocessing.parent_process() is not None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
 import pygame
-import random
-import time
 import sys
-import os
+import fonts
+import latency
+import records
+from assets import assets
+from event_log import log_event
 from sci_dama import SciDamaGame
+from scenes import MenuScene, Scene, SceneManager
+from scores import score_store
+from sounds import sound_bank, play_sound
+from question_bank import QuestionBank, update_level
+from text_cache import render_text
 
 # --- High Score Utilities ---
 def get_high_score(difficulty):
-    filename = f"highscore_{difficulty.lower()}.txt"
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r") as f:
-                return int(f.read())
-        except:
-            return 0
-    else:
-        return 0
+    return score_store.high_score("math_rush", difficulty)
 
-def save_high_score(difficulty, score):
-    filename = f"highscore_{difficulty.lower()}.txt"
-    try:
-        with open(filename, "w") as f:
-            f.write(str(score))
-    except Exception as e:
-        print(f"Error saving high score: {e}")
+def save_score(difficulty, score):
+    score_store.record("math_rush", difficulty, score)
+    score_store.flush()
 
-pygame.mixer.pre_init(44100, -16, 2, 512)  # Optional: better sound quality settings
-pygame.mixer.init()
+sound_bank.init()  # Mixer setup lives in the shared sound bank
 
 # --- Pygame Setup ---
 pygame.init()
 WIDTH, HEIGHT = 800, 600
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Math Rush & Sci-Dama")
+fonts.prewarm()
 
 try:
     pygame.mixer.music.load("little town - orchestral.ogg")
@@ -41,46 +45,20 @@ try:
 except pygame.error as e:
     print("Could not load music file:", e)
 
-try:
-    menu_background = pygame.image.load("select_menu_background.jpg")
-    menu_background = pygame.transform.scale(menu_background, (WIDTH, HEIGHT))
-except:
-    menu_background = None
-
-try:
-    select_menu_background = pygame.image.load("select_menu_background.jpg")
-    select_menu_background = pygame.transform.scale(select_menu_background, (WIDTH, HEIGHT))
-except:
-    select_menu_background = None
+# Backgrounds are decoded on a worker thread; screens fall back to a plain
+# fill until theirs is ready
+MENU_BACKGROUND = "select_menu_background.jpg"
+SELECT_MENU_BACKGROUND = "select_menu_background.jpg"
+SETTINGS_BACKGROUND = "settings.png"
+GAME_BACKGROUND = "background.jpg"
+assets.preload([MENU_BACKGROUND, SELECT_MENU_BACKGROUND, SETTINGS_BACKGROUND, GAME_BACKGROUND], (WIDTH, HEIGHT))
 
-try:
-    settings_menu_background = pygame.image.load("settings.png")
-    settings_menu_background = pygame.transform.scale(settings_menu_background, (WIDTH, HEIGHT))
-except:
-    settings_menu_background = None
 
-try:
-    background = pygame.image.load("background.jpg")
-    background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-except:
-    background = None
+def get_background(path):
+    return assets.get(path, (WIDTH, HEIGHT))
 
-try:
-    correct_sound = pygame.mixer.Sound("correct.wav")
-    correct_sound.set_volume(0.7)  # Adjust as needed
-except pygame.error as e:
-    print("Could not load correct sound:", e)
-    correct_sound = None    
-
-try:
-    wrong_sound = pygame.mixer.Sound("wrong.mp3")
-    wrong_sound.set_volume(0.7)  # Adjust as needed
-except pygame.error as e:
-    print("Could not load correct sound:", e)
-    wrong_sound = None 
-
-FONT = pygame.font.SysFont("Arial", 36)
-SMALL_FONT = pygame.font.SysFont("Arial", 24)
+FONT = fonts.get_font("Arial", 36)
+SMALL_FONT = fonts.get_font("Arial", 24)
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GREEN = (0, 200, 0)
@@ -92,16 +70,32 @@ MENU_COLOR = (100, 100, 200)
 # Default timer value (can be changed in settings)
 selected_timer = 10
 
+# Longest answer the input box takes, sign included, so a typed answer
+# always fits a game record's 32-bit field
+MAX_ANSWER_LENGTH = 9
+
+# Set MATH_RUSH_SEED to replay the same question stream
+question_bank = QuestionBank(int(os.environ["MATH_RUSH_SEED"]) if os.environ.get("MATH_RUSH_SEED") else None)
+
+# First frame, shown while the backgrounds load
+screen.fill(MENU_COLOR)
+loading_text = render_text(SMALL_FONT, "Loading...", True, WHITE)
+screen.blit(loading_text, loading_text.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+pygame.display.flip()
+
 class Button:
     def __init__(self, x, y, w, h, text, color, text_color=WHITE):
         self.rect = pygame.Rect(x, y, w, h)
         self.text = text
         self.color = color
         self.text_color = text_color
+        self.hovered = False
 
     def draw(self, surface):
         pygame.draw.rect(surface, self.color, self.rect, border_radius=8)
-        txt = FONT.render(self.text, True, self.text_color)
+        if self.hovered:
+            pygame.draw.rect(surface, WHITE, self.rect, 3, border_radius=8)
+        txt = render_text(FONT, self.text, True, self.text_color)
         txt_rect = txt.get_rect(center=self.rect.center)
         surface.blit(txt, txt_rect)
 
@@ -109,382 +103,359 @@ class Button:
         return self.rect.collidepoint(pos)
 
 def generate_question(level):
-    if level == 1:
-        a = random.randint(1, 10)
-        b = random.randint(1, 10)
-        op = random.choice(['+', '-'])
-    elif level == 2:
-        a = random.randint(10, 50)
-        b = random.randint(1, 20)
-        op = random.choice(['+', '-', '*'])
+    # Questions come pre-generated from the session's question bank and
+    # don't repeat until the level's whole pool has been used
+    return question_bank.next(level)
+
+def blit_background(surface, path, fallback=(100, 100, 200)):
+    # Returns False while the background is still loading
+    background = get_background(path)
+    if background:
+        surface.blit(background, (0, 0))
     else:
-        a = random.randint(10, 99)
-        b = random.randint(10, 99)
-        op = random.choice(['+', '-', '*', '/'])
-        if op == '/':
-            a = a * b  # Ensure integer division
-
-    if op == '+':
-        answer = a + b
-    elif op == '-':
-        answer = a - b
-    elif op == '*':
-        answer = a * b
-    elif op == '/':
-        answer = a // b
-
-    question = f"{a} {op} {b} = ?"
-    return question, answer
+        surface.fill(fallback)
+    return background is not None
+
+class MainMenuScene(MenuScene):
+    name = "main_menu"
+
+    def __init__(self):
+        super().__init__()
+        self.math_button = Button(WIDTH//2 - 100, 220, 200, 50, "Math Rush", BLACK)
+        self.sci_button = Button(WIDTH//2 - 100, 280, 200, 50, "Sci-Dama", BLUE)
+        self.settings_button = Button(WIDTH//2 - 100, 340, 200, 50, "Settings", GREEN)
+        self.quit_button = Button(WIDTH//2 - 100, 400, 200, 50, "Quit", RED)
+        self.buttons = [self.math_button, self.sci_button, self.settings_button, self.quit_button]
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.math_button.is_clicked(event.pos):
+                self.manager.push(DifficultySelectScene())
+            elif self.sci_button.is_clicked(event.pos):
+                game = SciDamaGame(screen, WIDTH, HEIGHT)
+                self.manager.push(game.scene())
+            elif self.settings_button.is_clicked(event.pos):
+                self.manager.push(SettingsScene())
+            elif self.quit_button.is_clicked(event.pos):
+                self.manager.quit()
 
-def main_menu():
-    menu = True
-    clock = pygame.time.Clock()
+    def draw(self, surface):
+        self.loading = not blit_background(surface, MENU_BACKGROUND)
+        title = render_text(FONT, "MAIN MENU", True, BLACK)
+        surface.blit(title, (WIDTH//2 - title.get_width()//2, 30))
+        self.math_button.draw(surface)
+        self.sci_button.draw(surface)
+        self.settings_button.draw(surface)
+        self.quit_button.draw(surface)
+
+class DifficultySelectScene(MenuScene):
+    name = "difficulty_select_menu"
+
+    def __init__(self):
+        super().__init__()
+        self.normal_button = Button(WIDTH//2 - 100, 220, 200, 50, "Easy", GREEN)
+        self.medium_button = Button(WIDTH//2 - 100, 300, 200, 50, "Medium", BLUE)
+        self.hard_button = Button(WIDTH//2 - 100, 380, 200, 50, "Hard", RED)
+        self.back_button = Button(20, 20, 100, 40, "Back", BLUE)
+        self.buttons = [self.normal_button, self.medium_button, self.hard_button, self.back_button]
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.normal_button.is_clicked(event.pos):
+                self.manager.push(MathRushScene("Easy", selected_timer))
+            elif self.medium_button.is_clicked(event.pos):
+                self.manager.push(MathRushScene("Medium", selected_timer))
+            elif self.hard_button.is_clicked(event.pos):
+                self.manager.push(MathRushScene("Hard", selected_timer))
+            elif self.back_button.is_clicked(event.pos):
+                self.manager.pop()
 
-    math_button = Button(WIDTH//2 - 100, 220, 200, 50, "Math Rush", BLACK)
-    sci_button = Button(WIDTH//2 - 100, 280, 200, 50, "Sci-Dama", BLUE)
-    settings_button = Button(WIDTH//2 - 100, 340, 200, 50, "Settings", GREEN)
-    quit_button = Button(WIDTH//2 - 100, 400, 200, 50, "Quit", RED)
+    def draw(self, surface):
+        self.loading = not blit_background(surface, SELECT_MENU_BACKGROUND)
+        title = render_text(FONT, "Select Difficulty", True, BLACK)
+        surface.blit(title, (WIDTH//2 - title.get_width()//2, 30))
+        self.normal_button.draw(surface)
+        self.medium_button.draw(surface)
+        self.hard_button.draw(surface)
+        self.back_button.draw(surface)
+
+class SettingsScene(MenuScene):
+    name = "settings_menu"
+
+    def __init__(self):
+        super().__init__()
+        self.timer_buttons = [
+            Button(WIDTH//2 - 220, 220, 120, 60, "5 Sec", BLUE),
+            Button(WIDTH//2 - 80, 220, 120, 60, "10 Sec", BLUE),
+            Button(WIDTH//2 + 60, 220, 120, 60, "15 Sec", BLUE),
+            Button(WIDTH//2 - 220, 320, 120, 60, "20 Sec", BLUE),
+            Button(WIDTH//2 - 80, 320, 120, 60, "25 Sec", BLUE),
+            Button(WIDTH//2 + 60, 320, 120, 60, "30 Sec", BLUE),
+        ]
+        self.back_button = Button(20, 20, 100, 40, "Back", BLUE)
+        self.buttons = self.timer_buttons + [self.back_button]
+
+    def handle_event(self, event):
+        global selected_timer
+        super().handle_event(event)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for idx, btn in enumerate(self.timer_buttons):
+                if btn.is_clicked(event.pos):
+                    selected_timer = 5 + idx * 5
+                    self.manager.pop()  # Go back to main menu immediately
+                    return
+            if self.back_button.is_clicked(event.pos):
+                self.manager.pop()
 
-    while menu:
-        if menu_background:
-            screen.blit(menu_background, (0, 0))
-        else:
-            screen.fill((100, 100, 200))
-
-        title = FONT.render("MAIN MENU", True, BLACK)
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, 30))
-        math_button.draw(screen)
-        sci_button.draw(screen)
-        settings_button.draw(screen)
-        quit_button.draw(screen)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if math_button.is_clicked(pos):
-                    difficulty_select_menu()
-                elif sci_button.is_clicked(pos):
-                    game = SciDamaGame(screen, WIDTH, HEIGHT)
-                    game.run()
-                elif settings_button.is_clicked(pos):
-                    settings_menu()
-                elif quit_button.is_clicked(pos):
-                    pygame.quit()
-                    sys.exit()
-
-        pygame.display.flip()
-        clock.tick(60)
-
-def difficulty_select_menu():
-    menu = True
-    clock = pygame.time.Clock()
-
-    normal_button = Button(WIDTH//2 - 100, 220, 200, 50, "Easy", GREEN)
-    medium_button = Button(WIDTH//2 - 100, 300, 200, 50, "Medium", BLUE)
-    hard_button = Button(WIDTH//2 - 100, 380, 200, 50, "Hard", RED)
-    back_button = Button(20, 20, 100, 40, "Back", BLUE)
-
-    while menu:
-        if select_menu_background:
-            screen.blit(select_menu_background, (0, 0))
-        else:
-            screen.fill((100, 100, 200))
-
-        title = FONT.render("Select Difficulty", True, BLACK)
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, 30))
-        normal_button.draw(screen)
-        medium_button.draw(screen)
-        hard_button.draw(screen)
-        back_button.draw(screen)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if normal_button.is_clicked(pos):
-                    math_rush_game("Easy", selected_timer)
-                elif medium_button.is_clicked(pos):
-                    math_rush_game("Medium", selected_timer)
-                elif hard_button.is_clicked(pos):
-                    math_rush_game("Hard", selected_timer)
-                elif back_button.is_clicked(pos):
-                    menu = False
-
-        pygame.display.flip()
-        clock.tick(60)
-
-def settings_menu():
-    global selected_timer
-    menu = True
-    clock = pygame.time.Clock()
-
-    timer_buttons = [
-        Button(WIDTH//2 - 220, 220, 120, 60, "5 Sec", BLUE),
-        Button(WIDTH//2 - 80, 220, 120, 60, "10 Sec", BLUE),
-        Button(WIDTH//2 + 60, 220, 120, 60, "15 Sec", BLUE),
-        Button(WIDTH//2 - 220, 320, 120, 60, "20 Sec", BLUE),
-        Button(WIDTH//2 - 80, 320, 120, 60, "25 Sec", BLUE),
-        Button(WIDTH//2 + 60, 320, 120, 60, "30 Sec", BLUE),
-    ]
-    back_button = Button(20, 20, 100, 40, "Back", BLUE)
-
-    while menu:
-        if settings_menu_background:
-            screen.blit(settings_menu_background, (0, 0))
-        else:
-            screen.fill((100, 100, 200))
-
-        for btn in timer_buttons:
-            btn.draw(screen)
-
-        back_button.draw(screen)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                for idx, btn in enumerate(timer_buttons):
-                    if btn.is_clicked(pos):
-                        selected_timer = 5 + idx * 5
-                        menu = False
-                        return  # Go back to main menu immediately
-                if back_button.is_clicked(pos):
-                    menu = False
-
-        pygame.display.flip()
-        clock.tick(60)
-
-def math_rush_game(difficulty_level, question_timeout):
-    high_score = get_high_score(difficulty_level)
-    clock = pygame.time.Clock()
-    input_text = ''
-    score = 0
-    streak = 0
-    round_num = 1
+    def draw(self, surface):
+        self.loading = not blit_background(surface, SETTINGS_BACKGROUND)
+        for btn in self.timer_buttons:
+            btn.draw(surface)
+        self.back_button.draw(surface)
+
+class MathRushScene(Scene):
+    name = "math_rush_game"
+    records_latency = True
     max_rounds = 10
-    feedback = ''
-    feedback_color = GREEN
-
     level_map = {"Easy": 1, "Medium": 2, "Hard": 3}
-    level = level_map.get(difficulty_level, 1)
-
-    question, answer = generate_question(level)
-    question_start_time = time.time()
-
-    submit_button = Button(WIDTH//2 - 60, HEIGHT - 100, 120, 50, "Submit", BLUE)
-    back_button = Button(WIDTH - 120, HEIGHT - 60, 100, 40, "Back", RED)
 
-    running = True
-    while running:
-        if background:
-            screen.blit(background, (0, 0))
+    def __init__(self, difficulty_level, question_timeout):
+        super().__init__()
+        self.difficulty_level = difficulty_level
+        self.question_timeout = question_timeout
+        self.submit_button = Button(WIDTH//2 - 60, HEIGHT - 100, 120, 50, "Submit", BLUE)
+        self.back_button = Button(WIDTH - 120, HEIGHT - 60, 100, 40, "Back", RED)
+
+    def enter(self):
+        self.high_score = get_high_score(self.difficulty_level)
+        self.score = 0
+        self.streak = 0
+        self.round_num = 1
+        self.feedback = ''
+        self.feedback_color = GREEN
+        self.level = self.level_map.get(self.difficulty_level, 1)
+        self.record = records.RushRecorder(question_bank.seed, self.difficulty_level, self.question_timeout)
+        log_event("game_start", mode="math_rush", difficulty=self.difficulty_level, variant=str(self.question_timeout))
+        self.next_question()
+        latency.recorder.reset_poll()
+
+    def next_question(self):
+        self.question, self.answer = generate_question(self.level)
+        log_event("question", mode="math_rush", level=self.level, question=self.question, answer=self.answer)
+        # Question timing uses the monotonic clock the latency recorder uses
+        self.question_start_time = latency.now()
+        self.input_text = ''
+
+    def next_round(self):
+        self.round_num += 1
+        if self.round_num > self.max_rounds:
+            self.finish()
+        else:
+            self.next_question()
+
+    def finish(self):
+        latency.print_report_if_enabled()
+        # Every game is saved, so each player has a history and a leaderboard
+        save_score(self.difficulty_level, self.score)
+        log_event("game_end", mode="math_rush", difficulty=self.difficulty_level, score=self.score,
+                  opponent_score=None, won=None)
+        self.manager.replace(GameOverScene(self.difficulty_level, self.score, self.max_rounds, self.high_score))
+
+    def exit(self):
+        # Finished or abandoned, the game is kept as a record once a
+        # question has been answered
+        if self.record.rounds:
+            records.save(self.record.finish(self.score))
+
+    def submit(self, event_time):
+        if self.input_text.strip() == '':
+            return
+        recorder = latency.recorder
+        recorder.submit(event_time)
+        try:
+            user_answer = int(self.input_text)
+        except ValueError:
+            self.feedback = "Please enter a valid number!"
+            self.feedback_color = RED
+            self.input_text = ''
+            return
+        # Judge the answer at the moment its event is handled rather than
+        # at the start of the frame
+        elapsed_time = event_time - self.question_start_time
+        recorder.answered(elapsed_time)
+        correct = user_answer == self.answer and elapsed_time <= self.question_timeout
+        log_event("answer", mode="math_rush", question=self.question, given=user_answer, correct=correct,
+                  elapsed_ms=round(elapsed_time * 1000, 1))
+        self.record.add(self.level, self.question, self.answer, user_answer, elapsed_time, correct)
+
+        old_level = self.level
+        self.level, self.streak = update_level(self.level, self.streak, correct)
+        if correct:
+            play_sound("correct")
+            self.feedback = "Correct!"
+            self.feedback_color = GREEN
+            self.score += 1
+            if self.level > old_level:
+                self.feedback += " Level up!"
         else:
-            screen.fill((255, 255, 255))
+            play_sound("wrong")
+            self.feedback = f"Wrong or too slow! Answer was {self.answer}."
+            self.feedback_color = RED
+            if self.level < old_level:
+                self.feedback += " Level down!"
+        if self.level != old_level:
+            log_event("level_change", mode="math_rush", old=old_level, new=self.level)
+        self.next_round()
+
+    def handle_event(self, event):
+        event_time = latency.now()
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.back_button.is_clicked(event.pos):
+                self.manager.pop()  # Go back to difficulty menu
+            elif self.submit_button.is_clicked(event.pos):
+                self.submit(event_time)
+
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                self.input_text = self.input_text[:-1]
+                latency.recorder.key(event_time)
+            elif event.key == pygame.K_RETURN:
+                self.submit(event_time)
+            elif len(self.input_text) < MAX_ANSWER_LENGTH and (
+                    event.unicode.isdigit() or (event.unicode == '-' and len(self.input_text) == 0)):
+                self.input_text += event.unicode
+                latency.recorder.key(event_time)
+
+    def remaining_time(self):
+        return max(0, self.question_timeout - (latency.now() - self.question_start_time))
+
+    def update(self):
+        if self.remaining_time() <= 0:
+            log_event("timeout", mode="math_rush", question=self.question, answer=self.answer)
+            self.record.add(self.level, self.question, self.answer, None, self.question_timeout, False)
+            self.feedback = f"Time's up! The correct answer was {self.answer}."
+            self.feedback_color = RED
+            self.streak = 0
+            self.next_round()
+
+    def draw(self, surface):
+        blit_background(surface, GAME_BACKGROUND, (255, 255, 255))
 
         # Display high score at top left
-        high_score_text = SMALL_FONT.render(f"High Score: {high_score}", True, BLACK)
-        screen.blit(high_score_text, (20, 10))
-
-        # Draw back button
-        back_button.draw(screen)
-
-        current_time = time.time()
-        elapsed_time = current_time - question_start_time
-        remaining_time = max(0, question_timeout - elapsed_time)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back_button.is_clicked(event.pos):
-                    return  # Go back to difficulty menu
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_BACKSPACE:
-                    input_text = input_text[:-1]
-                elif event.key == pygame.K_RETURN:
-                    if input_text.strip() != '':
-                        try:
-                            user_answer = int(input_text)
-                        except ValueError:
-                            feedback = "Please enter a valid number!"
-                            feedback_color = RED
-                            input_text = ''
-                            continue
-
-                        if user_answer == answer and elapsed_time <= question_timeout:
-                            if correct_sound:
-                                correct_sound.play()
-                            feedback = "Correct!"
-                            feedback_color = GREEN
-                            score += 1
-                            streak += 1
-                            if streak >= 3 and level < 3:
-                                level += 1
-                                feedback += " Level up!"
-                                streak = 0
-                        else:
-                            if wrong_sound:
-                                wrong_sound.play()
-                            feedback = f"Wrong or too slow! Answer was {answer}."
-                            feedback_color = RED
-                            streak = 0
-                            if level > 1:
-                                level -= 1
-                                feedback += " Level down!"
-
-                        round_num += 1
-                        if round_num > max_rounds:
-                            running = False
-                        else:
-                            question, answer = generate_question(level)
-                            question_start_time = time.time()
-                            input_text = ''
-                            remaining_time = question_timeout
-
-                else:
-                    if event.unicode.isdigit() or (event.unicode == '-' and len(input_text) == 0):
-                        input_text += event.unicode
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if submit_button.is_clicked(event.pos):
-                    if input_text.strip() != '':
-                        try:
-                            user_answer = int(input_text)
-                        except ValueError:
-                            feedback = "Please enter a valid number!"
-                            feedback_color = RED
-                            input_text = ''
-                            continue
-
-                        if user_answer == answer and elapsed_time <= question_timeout:
-                            feedback = "Correct!"
-                            feedback_color = GREEN
-                            score += 1
-                            streak += 1
-                            if streak >= 3 and level < 3:
-                                level += 1
-                                feedback += " Level up!"
-                                streak = 0
-                        else:
-                            feedback = f"Wrong or too slow! Answer was {answer}."
-                            feedback_color = RED
-                            streak = 0
-                            if level > 1:
-                                level -= 1
-                                feedback += " Level down!"
-
-                        round_num += 1
-                        if round_num > max_rounds:
-                            running = False
-                        else:
-                            question, answer = generate_question(level)
-                            question_start_time = time.time()
-                            input_text = ''
-                            remaining_time = question_timeout
-
-        if remaining_time <= 0:
-            feedback = f"Time's up! The correct answer was {answer}."
-            feedback_color = RED
-            streak = 0
-
-            round_num += 1
-            if round_num > max_rounds:
-                running = False
-            else:
-                question, answer = generate_question(level)
-                question_start_time = time.time()
-                input_text = ''
-                remaining_time = question_timeout
+        high_score_text = render_text(SMALL_FONT, f"High Score: {self.high_score}", True, BLACK)
+        surface.blit(high_score_text, (20, 10))
+
+        self.back_button.draw(surface)
 
         # --- Centered Drawing ---
 
         # Round info centered at top (below high score)
-        round_text = FONT.render(f"Round {round_num} of {max_rounds}", True, BLACK)
+        round_text = render_text(FONT, f"Round {self.round_num} of {self.max_rounds}", True, BLACK)
         round_rect = round_text.get_rect(center=(WIDTH // 2, 65))
-        screen.blit(round_text, round_rect)
+        surface.blit(round_text, round_rect)
 
         # Question centered horizontally
-        question_text = FONT.render(question, True, BLACK)
+        question_text = render_text(FONT, self.question, True, BLACK)
         question_rect = question_text.get_rect(center=(WIDTH // 2, 158))
-        screen.blit(question_text, question_rect)
+        surface.blit(question_text, question_rect)
 
         # Input box centered horizontally
         input_box_width, input_box_height = 300, 60
         input_box_x = (WIDTH - input_box_width) // 2
         input_box_y = 180
         input_box = pygame.Rect(input_box_x, input_box_y, input_box_width, input_box_height)
-        pygame.draw.rect(screen, GRAY, input_box, border_radius=8)
+        pygame.draw.rect(surface, GRAY, input_box, border_radius=8)
 
         # User input text inside input box with padding
-        input_surface = FONT.render(input_text, True, BLACK)
+        input_surface = render_text(FONT, self.input_text, True, BLACK)
         input_text_x = input_box.x + 15
         input_text_y = input_box.y + (input_box.height - input_surface.get_height()) // 2
-        screen.blit(input_surface, (input_text_x, input_text_y))
+        surface.blit(input_surface, (input_text_x, input_text_y))
 
         # Feedback message below input box
-        feedback_surface = SMALL_FONT.render(feedback, True, feedback_color)
+        feedback_surface = render_text(SMALL_FONT, self.feedback, True, self.feedback_color)
         feedback_rect = feedback_surface.get_rect(center=(WIDTH // 2, input_box_y + input_box_height + 217))
-        screen.blit(feedback_surface, feedback_rect)
+        surface.blit(feedback_surface, feedback_rect)
 
         # Score and difficulty info top-right
-        score_surface = SMALL_FONT.render(f"Score: {score}", True, BLACK)
-        screen.blit(score_surface, (WIDTH - 150, 20))
+        score_surface = render_text(SMALL_FONT, f"Score: {self.score}", True, BLACK)
+        surface.blit(score_surface, (WIDTH - 150, 20))
 
-        level_surface = SMALL_FONT.render(f"Difficulty: {difficulty_level}", True, BLACK)
-        screen.blit(level_surface, (WIDTH - 200, 60))
+        level_surface = render_text(SMALL_FONT, f"Difficulty: {self.difficulty_level}", True, BLACK)
+        surface.blit(level_surface, (WIDTH - 200, 60))
 
         # Timer bottom-left
-        timer_text = FONT.render(f"Time: {int(remaining_time)}", True, BLACK)
-        screen.blit(timer_text, (20, HEIGHT - 50))
+        timer_text = render_text(FONT, f"Time: {int(self.remaining_time())}", True, BLACK)
+        surface.blit(timer_text, (20, HEIGHT - 50))
 
         # Submit button centered horizontally near bottom
-        submit_button.rect.centerx = WIDTH // 2
-        submit_button.rect.y = HEIGHT - 100
-        submit_button.draw(screen)
+        self.submit_button.rect.centerx = WIDTH // 2
+        self.submit_button.rect.y = HEIGHT - 100
+        self.submit_button.draw(surface)
+
+class GameOverScene(Scene):
+    # Shown for a few seconds, or until a click or key press, then back to
+    # the difficulty menu
+    name = "game_over"
+
+    def __init__(self, difficulty_level, score, max_rounds, high_score, duration=5.0):
+        super().__init__()
+        self.duration = duration
+        self.game_over_text = render_text(FONT, "Game Over!", True, BLACK)
+        self.score_text = render_text(FONT, f"Your Score: {score} / {max_rounds}", True, BLACK)
+        self.high_score_text = render_text(FONT, f"High Score: {max(score, high_score)}", True, GREEN if score > high_score else BLACK)
+
+        if score >= 8:
+            message = "Excellent work! You're a math star!"
+        elif score >= 5:
+            message = "Good job! Keep practicing!"
+        else:
+            message = "Don't give up! Try again to improve!"
 
-        pygame.display.flip()
-        clock.tick(60)
+        self.message_text = render_text(SMALL_FONT, message, True, BLACK)
 
-    # After game ends, save new high score if beaten
-    if score > high_score:
-        save_high_score(difficulty_level, score)
+        self.leaderboard_texts = []
+        leaders = score_store.leaderboard("math_rush", difficulty_level, limit=5)
+        if leaders:
+            self.leaderboard_texts.append(render_text(SMALL_FONT, f"Top players ({difficulty_level})", True, BLACK))
+        for rank, (player, best, games) in enumerate(leaders, 1):
+            color = BLUE if player == score_store.player else BLACK
+            self.leaderboard_texts.append(render_text(SMALL_FONT, f"{rank}. {player}  {best}", True, color))
 
-    # Game over screen
-    screen.fill(WHITE)
-    if background:
-        screen.blit(background, (0, 0))
+    def enter(self):
+        self.end_time = latency.now() + self.duration
 
-    game_over_text = FONT.render("Game Over!", True, BLACK)
-    score_text = FONT.render(f"Your Score: {score} / {max_rounds}", True, BLACK)
-    high_score_text = FONT.render(f"High Score: {max(score, high_score)}", True, GREEN if score > high_score else BLACK)
+    def handle_event(self, event):
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+            self.manager.pop()
 
-    if score >= 8:
-        message = "Excellent work! You're a math star!"
-    elif score >= 5:
-        message = "Good job! Keep practicing!"
-    else:
-        message = "Don't give up! Try again to improve!"
-
-    message_text = SMALL_FONT.render(message, True, BLACK)
+    def update(self):
+        if latency.now() >= self.end_time:
+            self.manager.pop()
 
-    screen.blit(game_over_text, (WIDTH//2 - game_over_text.get_width()//2, HEIGHT//10))
-    screen.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//7 + 35))
-    screen.blit(high_score_text, (WIDTH//2 - high_score_text.get_width()//2, HEIGHT//6 + 60))
-    screen.blit(message_text, (WIDTH//2 - message_text.get_width()//2, HEIGHT//2 + 145))
+    def draw(self, surface):
+        surface.fill(WHITE)
+        background = get_background(GAME_BACKGROUND)
+        if background:
+            surface.blit(background, (0, 0))
+        surface.blit(self.game_over_text, (WIDTH//2 - self.game_over_text.get_width()//2, HEIGHT//10))
+        surface.blit(self.score_text, (WIDTH//2 - self.score_text.get_width()//2, HEIGHT//7 + 35))
+        surface.blit(self.high_score_text, (WIDTH//2 - self.high_score_text.get_width()//2, HEIGHT//6 + 60))
+        surface.blit(self.message_text, (WIDTH//2 - self.message_text.get_width()//2, HEIGHT//2 + 145))
+        y = HEIGHT//6 + 110
+        for text in self.leaderboard_texts:
+            surface.blit(text, (WIDTH//2 - text.get_width()//2, y))
+            y += 28
 
-    pygame.display.flip()
-    pygame.time.wait(5000)
-    difficulty_select_menu()
+def main_menu():
+    # Every screen runs as a scene on one flat stack, driven by one loop
+    manager = SceneManager(screen)
+    manager.push(MainMenuScene())
+    manager.run()
+    pygame.quit()
+    sys.exit()
 
 if __name__ == "__main__":
     main_menu()
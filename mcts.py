@@ -0,0 +1,233 @@
+"""Monte Carlo tree search for the Sci-Dama "Expert" AI.
+
+UCT selection over the rules in rules.py, with random or light-policy
+rollouts: the light policy takes the best-scoring capture when one gains
+points and otherwise moves at random. A rollout that runs past max_plies
+goes to whoever has the higher score.
+
+The search is root-parallel: every worker process grows its own tree
+from the current position with its own random seed, and the visit counts
+at the root are summed before the most visited move is played. Workers
+come from a process pool shared by all searches with the same worker
+count. Inside a daemonic process (e.g. a tournament.py worker) the search
+runs in-process, since those cannot start children.
+
+Check throughput on a machine with:
+
+    python mcts.py --workers 1,2,4 --time-limit 1.0
+"""
+import argparse
+import atexit
+import math
+import multiprocessing
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import RED, BLUE, Position
+from rules import GameState, OPERATIONS
+
+now = time.perf_counter
+
+EXPLORATION = 1.4
+POLICIES = ("light", "random")
+
+
+class Node:
+    __slots__ = ("move", "parent", "color", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, parent, color, untried):
+        self.move = move
+        self.parent = parent
+        self.color = color      # the side that played `move`
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+
+def rollout(state, rng, policy, max_plies):
+    # Plays `state` out and returns the winner, or None for a tie on points
+    end = state.ply + max_plies
+    winner = state.winner()
+    while winner is None and state.ply < end:
+        moves = state.legal_moves()
+        move = None
+        if policy == "light":
+            captures = [m for m in moves if m[2] >= 0]
+            if captures:
+                best = max(captures, key=state.capture_points)
+                if state.capture_points(best) > 0:
+                    move = best
+        state.apply_move(move or rng.choice(moves))
+        winner = state.winner()
+    if winner is None:
+        red, blue = state.scores[RED], state.scores[BLUE]
+        return RED if red > blue else BLUE if blue > red else None
+    return winner
+
+
+def grow_tree(state, playouts, time_limit, rng, policy="light", max_plies=40, exploration=EXPLORATION):
+    """Run UCT from `state` until `playouts` or `time_limit` runs out,
+    whichever comes first (None for no limit).
+
+    Returns ({move: (visits, wins)} for the root moves, playouts done).
+    """
+    deadline = None if time_limit is None else now() + time_limit
+    root = Node(None, None, BLUE if state.turn == RED else RED, state.legal_moves())
+    done = 0
+    while (playouts is None or done < playouts) and (deadline is None or now() < deadline):
+        node = root
+        sim = state.copy()
+        while not node.untried and node.children:
+            node = node.select(exploration)
+            sim.apply_move(node.move)
+        if node.untried:
+            move = node.untried.pop(rng.randrange(len(node.untried)))
+            color = sim.turn
+            sim.apply_move(move)
+            child = Node(move, node, color, sim.legal_moves() if sim.winner() is None else [])
+            node.children.append(child)
+            node = child
+        winner = rollout(sim, rng, policy, max_plies)
+        while node is not None:
+            node.visits += 1
+            if winner == node.color:
+                node.wins += 1.0
+            elif winner is None:
+                node.wins += 0.5
+            node = node.parent
+        done += 1
+    return {child.move: (child.visits, child.wins) for child in root.children}, done
+
+
+def search_job(job):
+    # Runs in a worker process; the state travels as plain values
+    red, blue, kings, numbers, turn, scores, operation, playouts, time_limit, seed, policy, max_plies = job
+    position = Position(red, blue, kings, array("B", numbers))
+    state = GameState(position, operation, turn=turn)
+    state.scores = {RED: scores[0], BLUE: scores[1]}
+    return grow_tree(state, playouts, time_limit, random.Random(seed), policy, max_plies)
+
+
+_pools = {}
+
+
+def get_pool(workers):
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(workers)
+    return pool
+
+
+@atexit.register
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+
+class MonteCarloSearch:
+    def __init__(self, operation='+', time_limit=1.0, playouts=None, workers=None,
+                 policy="light", max_plies=40, seed=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown rollout policy: {policy}")
+        if time_limit is None and playouts is None:
+            raise ValueError("Set a time limit, a playout count or both")
+        self.operation = operation
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.policy = policy
+        self.max_plies = max_plies
+        self.rng = random.Random(seed)
+        self.last_playouts = 0
+        self.last_elapsed = 0.0
+
+    @property
+    def playouts_per_second(self):
+        return self.last_playouts / self.last_elapsed if self.last_elapsed else 0.0
+
+    def search(self, state):
+        """Return the most visited move for the side to move, or None."""
+        self.last_playouts = 0
+        self.last_elapsed = 0.0
+        moves = state.legal_moves()
+        if not moves:
+            return None
+        start = now()
+        workers = self.workers
+        if multiprocessing.current_process().daemon:
+            workers = 1
+        playouts = None if self.playouts is None else -(-self.playouts // workers)
+        if len(moves) == 1:
+            return moves[0]
+        if workers == 1:
+            results = [grow_tree(state, playouts, self.time_limit, self.rng, self.policy, self.max_plies)]
+        else:
+            pos = state.position
+            base = (pos.red, pos.blue, pos.kings, bytes(pos.numbers), state.turn,
+                    (state.scores[RED], state.scores[BLUE]), self.operation, playouts, self.time_limit)
+            jobs = [base + (self.rng.getrandbits(32), self.policy, self.max_plies) for _ in range(workers)]
+            results = list(get_pool(workers).map(search_job, jobs))
+        totals = {}
+        for stats, _ in results:
+            for move, (visits, wins) in stats.items():
+                seen = totals.get(move, (0, 0.0))
+                totals[move] = (seen[0] + visits, seen[1] + wins)
+        self.last_playouts = sum(done for _, done in results)
+        self.last_elapsed = now() - start
+        if not totals:
+            return self.rng.choice(moves)
+        return max(totals, key=lambda move: totals[move])
+
+
+def sample_states(count, seed, difficulty="Medium"):
+    # Positions from seeded random games, cycling through the operations
+    rng = random.Random(seed)
+    states = []
+    while len(states) < count:
+        state = GameState.new(difficulty, OPERATIONS[len(states) % len(OPERATIONS)], rng)
+        for _ in range(rng.randrange(4, 30)):
+            if state.winner() is not None:
+                break
+            state.apply_move(rng.choice(state.legal_moves()))
+        if state.winner() is None:
+            states.append(state)
+    return states
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Sci-Dama MCTS playouts per second")
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1),
+                        help="comma-separated worker counts to try")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--positions", type=int, default=8)
+    parser.add_argument("--policy", default="light", choices=POLICIES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    corpus = sample_states(args.positions, args.seed)
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        searchers = {op: MonteCarloSearch(op, args.time_limit, workers=workers, policy=args.policy,
+                                          seed=args.seed) for op in OPERATIONS}
+        # The first search also starts the pool, so it is not counted
+        searchers[corpus[0].operation].search(corpus[0])
+        playouts = elapsed = 0
+        for state in corpus:
+            searcher = searchers[state.operation]
+            searcher.search(state)
+            playouts += searcher.last_playouts
+            elapsed += searcher.last_elapsed
+        print(f"{workers:>3} workers: {playouts / elapsed:>9.0f} playouts/s")
+
+
+if __name__ == "__main__":
+    main()
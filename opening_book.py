@@ -0,0 +1,209 @@
+"""Opening book for the Sci-Dama "Hard" AI, built from self-play.
+
+The generator plays games from the starting position with a long search
+per move and records, for every position of the opening, which move the
+search chose. The piece numbers are random in every game, so positions
+are keyed by structure only: where the pieces stand, which are kings,
+the side to move and the operation. Whether a capture is possible only
+depends on the structure, and the book stops at the first one, so every
+book position is a quiet one where the numbers matter least.
+
+The file is an open-addressing hash table of fixed-size entries behind a
+small header. The AI memory-maps it and a probe reads one or two entries;
+nothing is parsed when it is loaded. Build it with:
+
+    python opening_book.py --games 400 --time-limit 1.0
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+
+from bitboard import RED, BLUE, iter_bits, opponent
+from engine import PIECE_KEYS, SIDE_KEY, SearchEngine
+from rules import GameState, NUMBER_RANGES, OPERATIONS
+
+BOOK_PATH = os.environ.get("MATH_RUSH_BOOK", os.path.join("data", "opening_book.bin"))
+BOOK_MAGIC = b"SDBK"
+BOOK_VERSION = 1
+# magic, version, slot count (a power of two)
+BOOK_HEADER = struct.Struct("<4sHxxI")
+# structure key (0 marks an empty slot), src, dst, captured square or -1,
+# times the move was chosen, times the position was searched
+BOOK_ENTRY = struct.Struct("<QBBbxHH")
+
+_keys = random.Random(20240602)
+OPERATION_KEYS = {op: _keys.getrandbits(64) for op in OPERATIONS}
+del _keys
+
+
+def structure_key(pos, color, operation):
+    h = OPERATION_KEYS.get(operation, 0)
+    for side in (RED, BLUE):
+        for sq in iter_bits(pos.bits(side)):
+            h ^= PIECE_KEYS[side][pos.kings >> sq & 1][sq]
+    if color == BLUE:
+        h ^= SIDE_KEY
+    return h or 1
+
+
+class OpeningBook:
+    def __init__(self, data, slots, offset=0):
+        self.data = data
+        self.mask = slots - 1
+        self.offset = offset
+
+    @classmethod
+    def open(cls, path=BOOK_PATH):
+        # Returns None if there is no usable file
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) < BOOK_HEADER.size:
+            mm.close()
+            return None
+        magic, version, slots = BOOK_HEADER.unpack_from(mm)
+        if (magic != BOOK_MAGIC or version != BOOK_VERSION or slots & (slots - 1)
+                or len(mm) != BOOK_HEADER.size + slots * BOOK_ENTRY.size):
+            mm.close()
+            return None
+        return cls(mm, slots, BOOK_HEADER.size)
+
+    def probe(self, pos, color, operation):
+        """Return the book move as (src, dst, captured), or None."""
+        key = structure_key(pos, color, operation)
+        slot = key & self.mask
+        # The table is at most half full, so a miss ends at an empty slot soon
+        for _ in range(self.mask + 1):
+            entry_key, src, dst, cap, _, _ = BOOK_ENTRY.unpack_from(
+                self.data, self.offset + slot * BOOK_ENTRY.size)
+            if entry_key == key:
+                return src, dst, cap
+            if not entry_key:
+                return None
+            slot = (slot + 1) & self.mask
+        return None
+
+
+_loaded = {}
+
+
+def load(path=BOOK_PATH):
+    # One shared mapping per file; None if it hasn't been built
+    if path not in _loaded:
+        _loaded[path] = OpeningBook.open(path)
+    return _loaded[path]
+
+
+# --- Generation ---
+def play_opening(job):
+    # Runs in a worker process. Returns [(key, move)] for the quiet
+    # positions of one game's opening.
+    difficulty, operation, seed, plies, time_limit, explore = job
+    rng = random.Random(seed)
+    state = GameState.new(difficulty, operation, rng, turn=BLUE)
+    engine = SearchEngine(operation, time_limit)
+    choices = []
+    while state.ply < plies and state.winner() is None:
+        color = state.turn
+        moves = state.legal_moves()
+        if not moves or any(move[2] >= 0 for move in moves):
+            break
+        diff = state.scores[color] - state.scores[opponent(color)]
+        move = engine.search(state.position, color, diff)
+        choices.append((structure_key(state.position, color, operation), move))
+        # An occasional other move spreads the games over more openings
+        if rng.random() < explore:
+            move = rng.choice(moves)
+        state.apply_move(move)
+    return choices
+
+
+def make_jobs(games, difficulties, operations, seed, plies, time_limit, explore):
+    jobs = []
+    for index in range(games):
+        difficulty = difficulties[index % len(difficulties)]
+        operation = operations[index // len(difficulties) % len(operations)]
+        jobs.append((difficulty, operation, seed + index, plies, time_limit, explore))
+    return jobs
+
+
+def build_table(choices, min_games=2):
+    # Keeps the most chosen move of every position searched in at least
+    # min_games games. Returns the table as bytes and the entry count.
+    counts = defaultdict(Counter)
+    for key, move in choices:
+        counts[key][move] += 1
+    entries = []
+    for key, moves in counts.items():
+        total = sum(moves.values())
+        if total < min_games:
+            continue
+        move, chosen = moves.most_common(1)[0]
+        entries.append((key, move, chosen, total))
+    slots = 1
+    while slots < 2 * len(entries):
+        slots <<= 1
+    table = bytearray(slots * BOOK_ENTRY.size)
+    mask = slots - 1
+    for key, (src, dst, cap), chosen, total in entries:
+        slot = key & mask
+        while BOOK_ENTRY.unpack_from(table, slot * BOOK_ENTRY.size)[0]:
+            slot = (slot + 1) & mask
+        BOOK_ENTRY.pack_into(table, slot * BOOK_ENTRY.size, key, src, dst, cap,
+                             min(chosen, 0xFFFF), min(total, 0xFFFF))
+    return bytes(table), slots, len(entries)
+
+
+def write_book(path, table, slots):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, slots))
+        f.write(table)
+    os.replace(tmp, path)
+    _loaded.pop(path, None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Sci-Dama opening book from self-play")
+    parser.add_argument("--games", type=int, default=400)
+    parser.add_argument("--plies", type=int, default=8, help="opening length in plies")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="seconds of search per move")
+    parser.add_argument("--explore", type=float, default=0.15,
+                        help="chance of playing a random move instead of the searched one")
+    parser.add_argument("--min-games", type=int, default=2,
+                        help="games a position needs before it goes in the book")
+    parser.add_argument("--difficulties", default=",".join(NUMBER_RANGES))
+    parser.add_argument("--operations", default="".join(OPERATIONS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=BOOK_PATH)
+    args = parser.parse_args(argv)
+
+    difficulties = [d.strip() for d in args.difficulties.split(",") if d.strip() in NUMBER_RANGES]
+    operations = [op for op in args.operations if op in OPERATIONS]
+    if not difficulties or not operations:
+        parser.error("no valid difficulties or operations given")
+
+    jobs = make_jobs(args.games, difficulties, operations, args.seed,
+                     args.plies, args.time_limit, args.explore)
+    start = time.perf_counter()
+    with Pool(args.workers) as pool:
+        choices = [c for game in pool.imap_unordered(play_opening, jobs) for c in game]
+    table, slots, count = build_table(choices, args.min_games)
+    write_book(args.output, table, slots)
+    print(f"{count} positions from {len(jobs)} games ({len(choices)} searches) "
+          f"written to {args.output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
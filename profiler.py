@@ -0,0 +1,181 @@
+"""Frame-time profiler for every game loop.
+
+The scene loop brackets each frame with start_frame(name) ... end_frame()
+and calls mark(phase) at the end of each phase ("events", "logic", "draw",
+"flip"); a phase lasts from the previous mark. The clock.tick wait is
+left outside the frame, so frame times show the work done against the
+16.7 ms budget of 60 FPS.
+
+Keys, handled by handle_event() on every screen:
+    F3  toggle the on-screen overlay (FPS, frame-time percentiles, phases)
+    F4  export the recorded frames to profiles/ as CSV and Chrome trace JSON
+Set MATH_RUSH_PROFILE=1 to start with the overlay shown.
+"""
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+from fonts import get_font
+from text_cache import render_text
+
+now = time.perf_counter
+
+EXPORT_DIR = "profiles"
+FRAME_BUDGET_MS = 1000 / 60
+
+
+class FrameProfiler:
+    def __init__(self, history=10000):
+        self.frames = deque(maxlen=history)
+        self.overlay = bool(os.environ.get("MATH_RUSH_PROFILE"))
+        self.origin = now()
+        self.screen = None
+        self.frame_start = None
+        self.last = None
+        self.phases = []
+        self.frame_index = 0
+        self.overlay_rect = None
+
+    # --- Recording ---
+    def start_frame(self, screen):
+        self.screen = screen
+        self.frame_start = self.last = now()
+        self.phases = []
+
+    def mark(self, phase):
+        if self.frame_start is None:
+            return
+        stamp = now()
+        self.phases.append((phase, self.last, stamp))
+        self.last = stamp
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        end = now()
+        self.frames.append((self.screen, self.frame_index, self.frame_start, end, self.phases))
+        self.frame_index += 1
+        self.frame_start = None
+
+    def discard_frame(self):
+        self.frame_start = None
+
+    # --- Statistics ---
+    def recent(self, screen=None, count=240):
+        return [f for f in list(self.frames)[-count:] if screen is None or f[0] == screen]
+
+    def stats(self, screen=None, count=240):
+        frames = self.recent(screen, count)
+        if not frames:
+            return None
+        times = sorted((end - start) * 1000 for _, _, start, end, _ in frames)
+
+        def pct(p):
+            return times[min(len(times) - 1, int(p / 100 * len(times)))]
+
+        span = frames[-1][3] - frames[0][2]
+        phases = {}
+        for name, start, end in frames[-1][4]:
+            phases[name] = phases.get(name, 0.0) + (end - start) * 1000
+        return {
+            "frames": len(frames),
+            # Wall-clock rate, including the time spent waiting in clock.tick
+            "fps": (len(frames) - 1) / span if span > 0 and len(frames) > 1 else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": times[-1],
+            "over_budget": sum(1 for t in times if t > FRAME_BUDGET_MS),
+            "last_phases_ms": phases,
+        }
+
+    # --- Overlay ---
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == pygame.K_F3:
+            self.overlay = not self.overlay
+            self.overlay_rect = None
+            return True
+        if event.key == pygame.K_F4:
+            paths = self.export()
+            print("Profile written to", ", ".join(paths))
+            return True
+        return False
+
+    def draw_overlay(self, surface):
+        # Returns the rect drawn, or None when the overlay is off
+        if not self.overlay:
+            return None
+        stats = self.stats(self.screen)
+        font = get_font("Arial", 14)
+        lines = [f"{self.screen}"]
+        if stats:
+            lines.append(f"FPS {stats['fps']:.1f}  over {FRAME_BUDGET_MS:.1f}ms: {stats['over_budget']}/{stats['frames']}")
+            lines.append(f"p50 {stats['p50_ms']:.2f}  p95 {stats['p95_ms']:.2f}  "
+                         f"p99 {stats['p99_ms']:.2f}  max {stats['max_ms']:.2f} ms")
+            lines.append("  ".join(f"{name} {ms:.2f}" for name, ms in stats["last_phases_ms"].items()))
+        surfaces = [render_text(font, line, True, (255, 255, 255)) for line in lines]
+        width = max(s.get_width() for s in surfaces) + 12
+        height = sum(s.get_height() for s in surfaces) + 8
+        if self.overlay_rect is not None:
+            # Never shrink, so screens that only repaint dirty rects are
+            # not left with stale edges of a wider box
+            width = max(width, self.overlay_rect.width)
+            height = max(height, self.overlay_rect.height)
+        rect = pygame.Rect(4, surface.get_height() - height - 4, width, height)
+        surface.fill((0, 0, 0), rect)
+        y = rect.y + 4
+        for s in surfaces:
+            surface.blit(s, (rect.x + 6, y))
+            y += s.get_height()
+        self.overlay_rect = rect
+        return rect
+
+    # --- Export ---
+    def export(self, directory=EXPORT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, time.strftime("frames-%Y%m%d-%H%M%S"))
+        return [self.export_csv(stem + ".csv"), self.export_chrome_trace(stem + ".json")]
+
+    def export_csv(self, path):
+        frames = list(self.frames)
+        names = []
+        for frame in frames:
+            for name, _, _ in frame[4]:
+                if name not in names:
+                    names.append(name)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["screen", "frame", "start_ms", "total_ms"] + [f"{n}_ms" for n in names])
+            for screen, index, start, end, phases in frames:
+                totals = dict.fromkeys(names, 0.0)
+                for name, p_start, p_end in phases:
+                    totals[name] += (p_end - p_start) * 1000
+                writer.writerow([screen, index, f"{(start - self.origin) * 1000:.3f}",
+                                 f"{(end - start) * 1000:.3f}"]
+                                + [f"{totals[n]:.3f}" for n in names])
+        return path
+
+    def export_chrome_trace(self, path):
+        # Load in chrome://tracing or https://ui.perfetto.dev
+        def us(t):
+            return round((t - self.origin) * 1e6, 1)
+
+        events = []
+        for screen, index, start, end, phases in self.frames:
+            events.append({"name": screen, "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": us(start), "dur": us(end) - us(start), "args": {"frame": index}})
+            for name, p_start, p_end in phases:
+                events.append({"name": name, "cat": screen, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": us(p_start), "dur": us(p_end) - us(p_start)})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+profiler = FrameProfiler()
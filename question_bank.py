@@ -0,0 +1,137 @@
+"""Pre-generated Math Rush questions.
+
+Each level has a fixed space of distinct questions (every operand pair for
+every operator it allows). The bank walks a seeded random permutation of
+that space, decoding and formatting it a batch at a time with NumPy, and
+hands questions out of the formatted batch in order. A question can only
+come back after every other question of its level has been asked, and the
+same seed always gives the same stream.
+"""
+import random
+
+try:
+    import numpy as np
+except ImportError:  # Fall back to the random module (seeded, but a different stream)
+    np = None
+
+# level: (a_min, a_max, b_min, b_max, operators)
+LEVELS = {
+    1: (1, 10, 1, 10, ('+', '-')),
+    2: (10, 50, 1, 20, ('+', '-', '*')),
+    3: (10, 99, 10, 99, ('+', '-', '*', '/')),
+}
+
+
+def update_level(level, streak, correct):
+    # Returns (level, streak) after an answer: three right in a row move up
+    # a level, a wrong one moves down a level
+    if correct:
+        streak += 1
+        if streak >= 3 and level < max(LEVELS):
+            return level + 1, 0
+        return level, streak
+    return max(min(LEVELS), level - 1), 0
+
+
+class _LevelPool:
+    def __init__(self, level, rng, batch_size):
+        a_min, a_max, b_min, b_max, ops = LEVELS[level]
+        self.a_min, self.b_min = a_min, b_min
+        self.a_count = a_max - a_min + 1
+        self.b_count = b_max - b_min + 1
+        self.ops = ops
+        self.size = self.a_count * self.b_count * len(ops)
+        self.rng = rng
+        self.batch_size = batch_size
+        self.order = None
+        self.cursor = 0
+        self.batch = []
+        self.index = 0
+        self.epoch = 0
+
+    def _next_indices(self):
+        if self.order is None or self.cursor >= self.size:
+            # Every question of the level has been handed out; start a new pass
+            if np is not None:
+                self.order = self.rng.permutation(self.size)
+            else:
+                self.order = list(range(self.size))
+                self.rng.shuffle(self.order)
+            self.cursor = 0
+            self.epoch += 1
+        indices = self.order[self.cursor:self.cursor + self.batch_size]
+        self.cursor += len(indices)
+        return indices
+
+    def _fill(self):
+        indices = self._next_indices()
+        per_op = self.a_count * self.b_count
+        if np is not None:
+            op_idx, rest = np.divmod(indices, per_op)
+            a = rest // self.b_count + self.a_min
+            b = rest % self.b_count + self.b_min
+            answers = np.empty_like(a)
+            shown_a = a.copy()
+            for i, op in enumerate(self.ops):
+                mask = op_idx == i
+                if op == '+':
+                    answers[mask] = a[mask] + b[mask]
+                elif op == '-':
+                    answers[mask] = a[mask] - b[mask]
+                elif op == '*':
+                    answers[mask] = a[mask] * b[mask]
+                else:
+                    # Exact division: show a * b / b, answer a
+                    shown_a[mask] = a[mask] * b[mask]
+                    answers[mask] = a[mask]
+            rows = zip(shown_a.tolist(), op_idx.tolist(), b.tolist(), answers.tolist())
+        else:
+            rows = []
+            for idx in indices:
+                op_i, rest = divmod(idx, per_op)
+                a = rest // self.b_count + self.a_min
+                b = rest % self.b_count + self.b_min
+                op = self.ops[op_i]
+                if op == '+':
+                    rows.append((a, op_i, b, a + b))
+                elif op == '-':
+                    rows.append((a, op_i, b, a - b))
+                elif op == '*':
+                    rows.append((a, op_i, b, a * b))
+                else:
+                    rows.append((a * b, op_i, b, a))
+        ops = self.ops
+        self.batch = [(f"{a} {ops[op]} {b} = ?", answer) for a, op, b, answer in rows]
+        self.index = 0
+
+    def next(self):
+        if self.index >= len(self.batch):
+            self._fill()
+        question = self.batch[self.index]
+        self.index += 1
+        return question
+
+
+class QuestionBank:
+    def __init__(self, seed=None, batch_size=256):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.pools = {}
+        for level in LEVELS:
+            # One independent stream per level, all derived from the seed
+            if np is not None:
+                rng = np.random.default_rng([seed, level])
+            else:
+                rng = random.Random(f"{seed}:{level}")
+            self.pools[level] = _LevelPool(level, rng, batch_size)
+            self.pools[level]._fill()
+
+    def next(self, level):
+        # Returns (question, answer), e.g. ("12 + 7 = ?", 19)
+        pool = self.pools.get(level) or self.pools[3]
+        return pool.next()
+
+    def pool_size(self, level):
+        return self.pools[level].size
@@ -0,0 +1,395 @@
+"""Compact binary game records and deterministic replay.
+
+A Sci-Dama record (.sdr) is a fixed header (seed, difficulty, operation,
+who moves first, the starting bitboards, final scores and winner), one
+number byte per starting piece in square order, then one byte per move:
+the move's index in GameState.legal_moves(). A 0xFF byte before an index
+marks a capture whose question was answered wrongly. A whole game is
+usually well under 100 bytes.
+
+A Math Rush record (.mrr) is a header (question bank seed, difficulty,
+timeout, final score) and one entry per round: the level, the question
+and its answer, what was answered and how long it took.
+
+Finished games are written to records/ (set MATH_RUSH_RECORDS to change
+the directory, or to an empty string to turn recording off). Replays run
+headless at full speed, or on screen at any speed for Sci-Dama:
+
+    python records.py replay records/sci_dama-20240601-120000-5f3c9a0e1b2d4c68.sdr
+    python records.py replay --visual --speed 4 records/sci_dama-....sdr
+    python records.py generate --games 5000 --output corpus
+    python records.py check corpus
+"""
+import argparse
+import glob
+import math
+import os
+import random
+import struct
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+
+from bitboard import RED, BLUE, Position, iter_bits
+from question_bank import update_level
+from rules import GameState, OPERATIONS, NUMBER_RANGES
+
+RECORDS_DIR = os.environ.get("MATH_RUSH_RECORDS", "records")
+RECORD_VERSION = 1
+DIFFICULTIES = ("Easy", "Medium", "Hard", "Expert")
+FAILED = 0xFF
+
+DAMA_MAGIC = b"SDGR"
+# magic, version, difficulty, operation, first turn, winner (0 if none),
+# seed, red and blue bitboards, move bytes, red and blue final scores
+DAMA_HEADER = struct.Struct("<4sBBBBBxQQQHii")
+
+RUSH_MAGIC = b"MRGR"
+# magic, version, difficulty, seconds per question, question bank seed,
+# rounds, final score
+RUSH_HEADER = struct.Struct("<4sBBHQHi")
+# level, flags, answer, answer given, milliseconds taken, question length
+RUSH_ROUND = struct.Struct("<BBiiIB")
+CORRECT, TIMED_OUT = 1, 2
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+DamaRecord = namedtuple("DamaRecord", "seed difficulty operation turn red blue numbers moves scores winner")
+RushRound = namedtuple("RushRound", "level question answer given elapsed_ms correct timed_out")
+RushRecord = namedtuple("RushRecord", "seed difficulty timeout rounds score")
+
+
+def new_seed():
+    # MATH_RUSH_SEED fixes the seed, to reproduce a game
+    if os.environ.get("MATH_RUSH_SEED"):
+        return int(os.environ["MATH_RUSH_SEED"])
+    return random.SystemRandom().getrandbits(63)
+
+
+# --- Sci-Dama ---
+class DamaRecorder:
+    def __init__(self, seed, state):
+        pos = state.position
+        self.seed = seed
+        self.difficulty = state.difficulty
+        self.operation = state.operation
+        self.turn = state.turn
+        self.red = pos.red
+        self.blue = pos.blue
+        self.numbers = bytes(pos.numbers[sq] for sq in iter_bits(pos.red | pos.blue))
+        self.moves = bytearray()
+
+    def add(self, state, move, correct=True):
+        # Call before the move is applied to `state`
+        if move[2] >= 0 and not correct:
+            self.moves.append(FAILED)
+        self.moves.append(state.legal_moves().index(move))
+
+    def finish(self, state):
+        winner = state.winner()
+        return DamaRecord(self.seed, self.difficulty, self.operation, self.turn, self.red, self.blue,
+                          self.numbers, bytes(self.moves), (state.scores[RED], state.scores[BLUE]), winner)
+
+
+def dama_to_bytes(record):
+    header = DAMA_HEADER.pack(DAMA_MAGIC, RECORD_VERSION, DIFFICULTIES.index(record.difficulty),
+                              OPERATIONS.index(record.operation), record.turn, record.winner or 0,
+                              record.seed, record.red, record.blue, len(record.moves), *record.scores)
+    return header + record.numbers + record.moves
+
+
+def dama_from_bytes(data):
+    (magic, version, difficulty, operation, turn, winner, seed, red, blue,
+     move_count, red_score, blue_score) = DAMA_HEADER.unpack_from(data)
+    if magic != DAMA_MAGIC or version != RECORD_VERSION:
+        raise ValueError("Not a Sci-Dama record")
+    pieces = (red | blue).bit_count()
+    start = DAMA_HEADER.size
+    if len(data) != start + pieces + move_count:
+        raise ValueError("Truncated Sci-Dama record")
+    numbers = bytes(data[start:start + pieces])
+    moves = bytes(data[start + pieces:])
+    return DamaRecord(seed, DIFFICULTIES[difficulty], OPERATIONS[operation], turn, red, blue,
+                      numbers, moves, (red_score, blue_score), winner or None)
+
+
+def initial_state(record):
+    pos = Position()
+    for sq, number in zip(iter_bits(record.red | record.blue), record.numbers):
+        pos.place(sq, RED if record.red >> sq & 1 else BLUE, number)
+    return GameState(pos, record.operation, record.difficulty, record.turn)
+
+
+def replay_dama(record, state=None):
+    """Yield (state, MoveResult) after each move of the record, playing
+    them on `state` (a fresh initial_state() by default)."""
+    state = initial_state(record) if state is None else state
+    moves = record.moves
+    i = 0
+    while i < len(moves):
+        correct = moves[i] != FAILED
+        if not correct:
+            i += 1
+        move = state.legal_moves()[moves[i]]
+        i += 1
+        yield state, state.apply_move(move, correct)
+
+
+def check_dama(record):
+    # Returns a description of the first difference, or None
+    state = initial_state(record)
+    try:
+        for state, _ in replay_dama(record):
+            pass
+    except IndexError:
+        return "move index out of range"
+    scores = (state.scores[RED], state.scores[BLUE])
+    if scores != record.scores:
+        return f"scores {scores}, recorded {record.scores}"
+    if state.winner() != record.winner:
+        return f"winner {state.winner()}, recorded {record.winner}"
+    return None
+
+
+# --- Math Rush ---
+class RushRecorder:
+    def __init__(self, seed, difficulty, timeout):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.timeout = timeout
+        self.rounds = []
+
+    def add(self, level, question, answer, given, elapsed, correct):
+        # `given` is None for a question that timed out
+        # An answer too wide for its 32-bit field is clamped; it can't be
+        # the right answer, so it still replays as wrong
+        if given is not None:
+            given = max(INT32_MIN, min(given, INT32_MAX))
+        # Rounded up, so a late answer never replays as in time
+        self.rounds.append(RushRound(level, question, answer, given, math.ceil(elapsed * 1000),
+                                     correct, given is None))
+
+    def finish(self, score):
+        return RushRecord(self.seed, self.difficulty, self.timeout, list(self.rounds), score)
+
+
+def rush_to_bytes(record):
+    parts = [RUSH_HEADER.pack(RUSH_MAGIC, RECORD_VERSION, DIFFICULTIES.index(record.difficulty),
+                              record.timeout, record.seed, len(record.rounds), record.score)]
+    for r in record.rounds:
+        text = r.question.encode("utf-8")
+        flags = (CORRECT if r.correct else 0) | (TIMED_OUT if r.timed_out else 0)
+        parts.append(RUSH_ROUND.pack(r.level, flags, r.answer, r.given or 0, r.elapsed_ms, len(text)))
+        parts.append(text)
+    return b"".join(parts)
+
+
+def rush_from_bytes(data):
+    magic, version, difficulty, timeout, seed, count, score = RUSH_HEADER.unpack_from(data)
+    if magic != RUSH_MAGIC or version != RECORD_VERSION:
+        raise ValueError("Not a Math Rush record")
+    offset = RUSH_HEADER.size
+    rounds = []
+    for _ in range(count):
+        level, flags, answer, given, elapsed_ms, length = RUSH_ROUND.unpack_from(data, offset)
+        offset += RUSH_ROUND.size
+        question = bytes(data[offset:offset + length]).decode("utf-8")
+        offset += length
+        timed_out = bool(flags & TIMED_OUT)
+        rounds.append(RushRound(level, question, answer, None if timed_out else given, elapsed_ms,
+                                bool(flags & CORRECT), timed_out))
+    if offset != len(data):
+        raise ValueError("Truncated Math Rush record")
+    return RushRecord(seed, DIFFICULTIES[difficulty], timeout, rounds, score)
+
+
+def replay_rush(record):
+    """Yield (round, level, streak, score) after each round, re-judged by
+    the game's rules."""
+    level = record.rounds[0].level if record.rounds else 1
+    streak = score = 0
+    for r in record.rounds:
+        if r.timed_out:
+            streak = 0
+        else:
+            correct = r.given == r.answer and r.elapsed_ms <= record.timeout * 1000
+            score += correct
+            level, streak = update_level(level, streak, correct)
+        yield r, level, streak, score
+
+
+def check_rush(record):
+    level = record.rounds[0].level if record.rounds else 1
+    score = 0
+    for i, (r, next_level, _, score) in enumerate(replay_rush(record)):
+        if r.level != level:
+            return f"round {i + 1} asked at level {r.level}, replay is at level {level}"
+        level = next_level
+    if score != record.score:
+        return f"score {score}, recorded {record.score}"
+    return None
+
+
+# --- Files ---
+def save(record, directory=RECORDS_DIR):
+    # Returns the path written, or None when recording is off or failed
+    if not directory:
+        return None
+    if isinstance(record, DamaRecord):
+        mode, ext, to_bytes = "sci_dama", "sdr", dama_to_bytes
+    else:
+        mode, ext, to_bytes = "math_rush", "mrr", rush_to_bytes
+    path = os.path.join(directory, f"{mode}-{time.strftime('%Y%m%d-%H%M%S')}-{record.seed:016x}.{ext}")
+    try:
+        data = to_bytes(record)
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    except (OSError, struct.error) as e:
+        print("Could not save game record:", e)
+        return None
+    return path
+
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] == DAMA_MAGIC:
+        return dama_from_bytes(data)
+    if data[:4] == RUSH_MAGIC:
+        return rush_from_bytes(data)
+    raise ValueError(f"{path} is not a game record")
+
+
+def check(record):
+    if isinstance(record, DamaRecord):
+        return check_dama(record)
+    return check_rush(record)
+
+
+# --- Command line ---
+def play_game(job):
+    # Self-play for a regression corpus; runs in a worker process
+    from ai import make_player
+
+    seed, difficulty, operation, players, fail_rate, max_plies = job
+    rng = random.Random(seed)
+    state = GameState.new(difficulty, operation, rng)
+    recorder = DamaRecorder(seed, state)
+    sides = {RED: make_player(players[0], operation, rng), BLUE: make_player(players[1], operation, rng)}
+    while state.winner() is None and state.ply < max_plies:
+        move = sides[state.turn](state)
+        # Only the human side answers capture questions, and sometimes wrongly
+        correct = state.turn == RED or move[2] < 0 or rng.random() >= fail_rate
+        recorder.add(state, move, correct)
+        state.apply_move(move, correct)
+    return dama_to_bytes(recorder.finish(state))
+
+
+def record_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.sdr")) + glob.glob(os.path.join(path, "*.mrr")))
+        else:
+            yield path
+
+
+def replay_visual(record, speed):
+    import pygame
+    from fonts import prewarm
+    from sci_dama import DamaReplayScene, SciDamaGame
+    from scenes import SceneManager
+
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    pygame.display.set_caption("Sci-Dama replay")
+    prewarm()
+    manager = SceneManager(screen)
+    manager.push(DamaReplayScene(SciDamaGame(screen, 800, 600), record, speed))
+    manager.run()
+    pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay, check and generate game records")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="replay one record")
+    replay.add_argument("path")
+    replay.add_argument("--visual", action="store_true", help="show a Sci-Dama replay on screen")
+    replay.add_argument("--speed", type=float, default=2.0, help="moves per second when visual")
+    checker = commands.add_parser("check", help="replay records and compare the results")
+    checker.add_argument("paths", nargs="+", help="record files or directories")
+    generate = commands.add_parser("generate", help="write a corpus of self-play records")
+    generate.add_argument("--games", type=int, default=1000)
+    generate.add_argument("--players", default="Medium,Easy", help="Red and Blue strategies")
+    generate.add_argument("--difficulty", default="Easy", choices=list(NUMBER_RANGES))
+    generate.add_argument("--fail-rate", type=float, default=0.2,
+                          help="chance that Blue answers a capture question wrongly")
+    generate.add_argument("--max-plies", type=int, default=300)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    generate.add_argument("--output", default="corpus")
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        record = load(args.path)
+        if args.visual:
+            if not isinstance(record, DamaRecord):
+                parser.error("only Sci-Dama records can be replayed on screen")
+            replay_visual(record, args.speed)
+        elif isinstance(record, DamaRecord):
+            state = initial_state(record)
+            for state, result in replay_dama(record):
+                print(f"{state.ply:>4} {'Red ' if result.color == RED else 'Blue'} "
+                      f"{result.move[0]:>2} -> {result.move[1]:>2}"
+                      + (f"  x{result.move[2]} {'failed' if result.failed else f'{result.points:+d}'}"
+                         if result.move[2] >= 0 else ""))
+            print(f"Scores Red {state.scores[RED]} Blue {state.scores[BLUE]}, winner {state.winner()}")
+        else:
+            for r, level, _, score in replay_rush(record):
+                given = "timed out" if r.timed_out else r.given
+                print(f"L{r.level} {r.question} {r.answer:>6}  given {given} in {r.elapsed_ms} ms -> score {score}")
+        problem = check(record)
+        if problem:
+            print("Replay differs from the record:", problem)
+            sys.exit(1)
+
+    elif args.command == "check":
+        start = time.perf_counter()
+        count = failures = 0
+        for path in record_paths(args.paths):
+            try:
+                problem = check(load(path))
+            except (OSError, ValueError, struct.error) as e:
+                problem = str(e)
+            count += 1
+            if problem:
+                failures += 1
+                print(f"{path}: {problem}")
+        elapsed = time.perf_counter() - start
+        print(f"{count} records replayed in {elapsed:.2f} s ({count / elapsed if elapsed else 0:.0f}/s), "
+              f"{failures} differ")
+        if failures:
+            sys.exit(1)
+
+    else:
+        players = [name.strip() for name in args.players.split(",")]
+        if len(players) != 2:
+            parser.error("--players needs exactly two strategies")
+        os.makedirs(args.output, exist_ok=True)
+        jobs = [(args.seed + i, args.difficulty, OPERATIONS[i % len(OPERATIONS)], players,
+                 args.fail_rate, args.max_plies) for i in range(args.games)]
+        start = time.perf_counter()
+        size = 0
+        with Pool(args.workers) as pool:
+            for (seed, *_), data in zip(jobs, pool.imap(play_game, jobs, 16)):
+                with open(os.path.join(args.output, f"game-{seed:06d}.sdr"), "wb") as f:
+                    f.write(data)
+                size += len(data)
+        elapsed = time.perf_counter() - start
+        print(f"{len(jobs)} games written to {args.output} in {elapsed:.1f} s, "
+              f"{size / max(1, len(jobs)):.0f} bytes per game")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Retained-mode renderer for the Sci-Dama board.
+
+The checkerboard is drawn once into an off-screen surface and every piece
+look (colour, number, king) is rendered once into a cached sprite. Each
+frame only the squares whose contents or highlights changed, plus the side
+panel when its text changed, are redrawn, and render() returns just those
+rectangles for pygame.display.update.
+"""
+import pygame
+
+from bitboard import RED, ROWS, COLS, square
+from text_cache import render_text
+
+
+class BoardRenderer:
+    def __init__(self, game):
+        self.game = game
+        self.size = game.SQUARE_SIZE
+        self.board_surface = self._render_board()
+        self.sprites = {}
+        self.drawn = [None] * (ROWS * COLS)
+        self.board_key = None
+        self.panel_key = None
+        self.full_redraw = True
+
+    def invalidate(self):
+        # Something else drew over the screen; repaint everything next frame
+        self.full_redraw = True
+
+    def _render_board(self):
+        g = self.game
+        surface = pygame.Surface((COLS * self.size, ROWS * self.size)).convert()
+        for row in range(ROWS):
+            for col in range(COLS):
+                color = g.BOARD_WHITE if (row + col) % 2 == 1 else g.BOARD_BLACK
+                surface.fill(color, (col * self.size, row * self.size, self.size, self.size))
+        return surface
+
+    def sprite(self, color, number, king):
+        key = (color, number, king)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            g = self.game
+            sprite = pygame.Surface((self.size, self.size), pygame.SRCALPHA).convert_alpha()
+            center = (self.size // 2, self.size // 2)
+            pygame.draw.circle(sprite, g.RED if color == RED else g.BLUE, center, g.PIECE_RADIUS)
+            num_surf = render_text(g.PIECE_FONT, str(number), True, g.WHITE)
+            sprite.blit(num_surf, num_surf.get_rect(center=center))
+            if king:
+                pygame.draw.circle(sprite, g.GOLD, center, g.PIECE_RADIUS // 2, 3)
+                king_surf = render_text(g.KING_FONT, "K", True, g.GOLD)
+                sprite.blit(king_surf, king_surf.get_rect(center=(center[0], center[1] + 16)))
+            self.sprites[key] = sprite
+        return sprite
+
+    def square_rect(self, sq):
+        row, col = divmod(sq, COLS)
+        return pygame.Rect(col * self.size, row * self.size, self.size, self.size)
+
+    def draw_square(self, surface, sq, key):
+        piece, selected, target = key
+        rect = self.square_rect(sq)
+        surface.blit(self.board_surface, rect, rect)
+        if piece is not None:
+            surface.blit(self.sprite(*piece), rect)
+        g = self.game
+        if selected:
+            pygame.draw.rect(surface, g.GREEN, rect, 4)
+        if target:
+            pygame.draw.circle(surface, g.GREEN, rect.center, g.PIECE_RADIUS // 2, 3)
+        return rect
+
+    def _targets(self):
+        g = self.game
+        targets = set()
+        if g.selected:
+            for move in g.valid_moves:
+                if isinstance(move, tuple) and isinstance(move[0], tuple):
+                    targets.add(square(*move[0]))
+                else:
+                    targets.add(square(*move))
+        return targets
+
+    def render(self, panel_key, draw_panel):
+        # Redraw what changed since the last call and return the dirty rects
+        g = self.game
+        surface = g.screen
+        dirty = []
+        full = self.full_redraw
+        if full:
+            surface.fill(g.BOARD_BLACK)
+            self.drawn = [None] * (ROWS * COLS)
+            self.board_key = None
+            self.panel_key = None
+            self.full_redraw = False
+
+        selected = square(*g.selected) if g.selected else -1
+        targets = self._targets()
+        board_key = (id(g.state), g.state.ply, selected, frozenset(targets))
+        if board_key != self.board_key:
+            self.board_key = board_key
+            pos = g.position
+            for sq in range(ROWS * COLS):
+                color = pos.color_at(sq)
+                piece = (color, pos.numbers[sq], bool(pos.kings >> sq & 1)) if color else None
+                key = (piece, sq == selected, sq in targets)
+                if key != self.drawn[sq]:
+                    self.drawn[sq] = key
+                    dirty.append(self.draw_square(surface, sq, key))
+
+        if panel_key != self.panel_key:
+            self.panel_key = panel_key
+            panel = pygame.Rect(g.BOARD_WIDTH, 0, g.INFO_WIDTH, g.HEIGHT)
+            surface.fill(g.BOARD_BLACK, panel)
+            draw_panel()
+            dirty.append(panel)
+
+        if full:
+            return [surface.get_rect()]
+        return dirty
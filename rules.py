@@ -0,0 +1,203 @@
+"""Sci-Dama rules, free of pygame.
+
+Everything needed to set up, play and score a game lives here so that
+games can be simulated headless. SciDamaGame in sci_dama.py is a pygame
+front end over GameState.
+"""
+import random
+from collections import namedtuple
+
+from bitboard import RED, BLUE, FULL, DIAGONALS, Position, iter_bits, opponent
+
+NUMBER_RANGES = {
+    "Easy": (1, 6),
+    "Medium": (4, 12),
+    "Hard": (8, 20),
+}
+OPERATIONS = ('+', '-', '*', '/')
+
+# Outcome of GameState.apply_move. `captured` is the captured piece's number
+# (0 for a plain move) and `points` what the mover scored for it.
+MoveResult = namedtuple("MoveResult", "color move captured points promoted failed")
+
+
+def calculate_score(operation, num1, num2):
+    if operation == '+':
+        return num1 + num2
+    elif operation == '-':
+        return num1 - num2
+    elif operation == '*':
+        return num1 * num2
+    elif operation == '/':
+        return num1 // (num2 if num2 != 0 else 1)
+    else:
+        return num1 + num2
+
+
+def make_question(operation, num1, num2):
+    if operation == '-':
+        return f"{num1} - {num2} = ?", num1 - num2
+    elif operation == '*':
+        return f"{num1} * {num2} = ?", num1 * num2
+    elif operation == '/':
+        if num2 == 0:
+            num2 = 1
+        return f"{num1} / {num2} = ?", num1 // num2
+    else:
+        return f"{num1} + {num2} = ?", num1 + num2
+
+
+def create_position(difficulty, rng=random):
+    num_min, num_max = NUMBER_RANGES.get(difficulty, NUMBER_RANGES["Hard"])
+    return Position.initial(num_min, num_max, rng)
+
+
+def result(position, red_score, blue_score, movable=None):
+    # The game ends once either side has no pieces or no moves; Red is
+    # checked first and the side that can still move wins ties.
+    # Returns the winning colour, or None while play goes on.
+    movable = movable or position.movable
+    scores = {RED: red_score, BLUE: blue_score}
+    for side in (RED, BLUE):
+        if not position.bits(side) or not movable(side):
+            other = opponent(side)
+            return other if scores[other] >= scores[side] else side
+    return None
+
+
+class MoveCache:
+    # Legal moves per square, kept up to date as the position changes.
+    # After a move only the pieces on the diagonals through the changed
+    # squares are regenerated. The cached lists are shared; don't modify them.
+    def __init__(self, position):
+        self.position = position
+        self.moves = [()] * 64
+        self.movable_bits = {RED: 0, BLUE: 0}
+        self.refresh(FULL)
+
+    def copy(self, position):
+        cache = MoveCache.__new__(MoveCache)
+        cache.position = position
+        cache.moves = list(self.moves)
+        cache.movable_bits = dict(self.movable_bits)
+        return cache
+
+    def refresh(self, squares):
+        pos = self.position
+        movable = self.movable_bits
+        for sq in iter_bits(squares):
+            bit = 1 << sq
+            movable[RED] &= ~bit
+            movable[BLUE] &= ~bit
+            color = pos.color_at(sq)
+            if color:
+                moves = [(sq, dst, cap) for dst, cap in pos.moves_from(sq)]
+                if moves:
+                    movable[color] |= bit
+                self.moves[sq] = moves
+            else:
+                self.moves[sq] = ()
+
+    def update(self, changed):
+        # `changed` lists the squares whose contents just changed
+        affected = 0
+        changed_bits = 0
+        for sq in changed:
+            affected |= DIAGONALS[sq]
+            changed_bits |= 1 << sq
+        self.refresh(affected & self.position.occupied | changed_bits)
+
+    def movable(self, color):
+        return self.movable_bits[color]
+
+
+class GameState:
+    def __init__(self, position, operation='+', difficulty="Easy", turn=BLUE):
+        self.position = position
+        self.operation = operation
+        self.difficulty = difficulty
+        self.turn = turn
+        self.scores = {RED: 0, BLUE: 0}
+        self.ply = 0
+        self.cache = MoveCache(position)
+        self._winner = None
+        self._winner_known = False
+
+    @classmethod
+    def new(cls, difficulty="Easy", operation='+', rng=random, turn=BLUE):
+        return cls(create_position(difficulty, rng), operation, difficulty, turn)
+
+    def copy(self):
+        state = GameState(self.position.copy(), self.operation, self.difficulty, self.turn)
+        state.scores = dict(self.scores)
+        state.ply = self.ply
+        state.cache = self.cache.copy(state.position)
+        return state
+
+    def invalidate(self):
+        # Call after editing self.position directly
+        self.cache = MoveCache(self.position)
+        self._winner_known = False
+
+    # --- Queries ---
+    def pieces(self, color):
+        return self.position.count(color)
+
+    def moves_from(self, sq):
+        # Moves as (src, dst, captured) triples; captured is -1 for a plain move
+        return self.cache.moves[sq]
+
+    def legal_moves(self, color=None):
+        color = self.turn if color is None else color
+        moves = []
+        for sq in iter_bits(self.cache.movable(color)):
+            moves.extend(self.cache.moves[sq])
+        return moves
+
+    def has_moves(self, color):
+        return self.cache.movable(color) != 0
+
+    def capture_points(self, move):
+        src, _, cap = move
+        numbers = self.position.numbers
+        return calculate_score(self.operation, numbers[src], numbers[cap])
+
+    def question_for(self, move):
+        src, _, cap = move
+        numbers = self.position.numbers
+        return make_question(self.operation, numbers[src], numbers[cap])
+
+    def winner(self):
+        # Only changes when a move is played, so it is worked out once per move
+        if not self._winner_known:
+            self._winner = result(self.position, self.scores[RED], self.scores[BLUE],
+                                  self.cache.movable)
+            self._winner_known = True
+        return self._winner
+
+    # --- Updates ---
+    def apply_move(self, move, correct=True):
+        # Play `move` for the side to move and pass the turn. For a capture,
+        # `correct` says whether the capture question was answered; a wrong
+        # answer costs the mover its piece number and leaves the board as is.
+        src, dst, cap = move
+        pos = self.position
+        color = pos.color_at(src)
+        num_piece = pos.numbers[src]
+        captured = points = 0
+        promoted = failed = False
+        if cap >= 0 and not correct:
+            self.scores[color] -= num_piece
+            failed = True
+        else:
+            if cap >= 0:
+                captured = pos.numbers[cap]
+                points = calculate_score(self.operation, num_piece, captured)
+                self.scores[color] += points
+                pos.remove(cap)
+            promoted = pos.move(src, dst)
+            self.cache.update((src, dst, cap) if cap >= 0 else (src, dst))
+        self.turn = opponent(color)
+        self.ply += 1
+        self._winner_known = False
+        return MoveResult(color, move, captured, points, promoted, failed)
@@ -0,0 +1,181 @@
+"""Scene stack that drives every screen from one loop.
+
+Each screen is a Scene. The SceneManager keeps a stack of them and runs
+the only frame loop in the program: every frame the scene on top gets
+the events, one update and one draw. Opening a screen pushes it, going
+back pops it and moving on replaces it, so the stack only ever holds the
+screens that are actually open, however many rounds are played.
+
+Timed screens run at a fixed frame rate. Scenes with frame_rate = None
+(the menus) render on demand: the loop sleeps in pygame.event.wait until
+input arrives or idle_timeout passes, and only draws when the scene has
+been marked dirty, so an idle menu costs next to no CPU.
+"""
+import pygame
+
+import latency
+from profiler import profiler
+
+
+class Scene:
+    name = "scene"
+    # Scenes whose input latency is recorded (see latency.py)
+    records_latency = False
+    # Frames per second, or None to only redraw after mark_dirty()
+    frame_rate = 60
+
+    def __init__(self):
+        self.manager = None
+        self.dirty = True
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def enter(self):
+        pass
+
+    def resume(self):
+        # The scene above this one was popped
+        pass
+
+    def exit(self):
+        pass
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self, surface):
+        # Return None to flip the whole display, or the list of dirty rects
+        return None
+
+    def invalidate(self):
+        # Something was drawn over the scene; repaint all of it next frame
+        pass
+
+
+class MenuScene(Scene):
+    # A screen of buttons: redrawn on input, on hover changes and while its
+    # background is still loading
+    frame_rate = None
+
+    def __init__(self):
+        super().__init__()
+        self.buttons = []
+        self.loading = False
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            for button in self.buttons:
+                hovered = button.rect.collidepoint(event.pos)
+                if hovered != button.hovered:
+                    button.hovered = hovered
+                    self.mark_dirty()
+
+    def resume(self):
+        # The pointer may have moved while another screen was on top
+        pos = pygame.mouse.get_pos()
+        for button in self.buttons:
+            button.hovered = button.rect.collidepoint(pos)
+
+    def update(self):
+        if self.loading:
+            self.mark_dirty()
+
+
+class SceneManager:
+    def __init__(self, screen, fps=60, idle_timeout=0.1):
+        self.screen = screen
+        self.fps = fps
+        # Longest an on-demand scene sleeps without an event, in seconds
+        self.idle_timeout = idle_timeout
+        self.stack = []
+        self.running = False
+
+    @property
+    def top(self):
+        return self.stack[-1] if self.stack else None
+
+    def push(self, scene):
+        scene.manager = self
+        self.stack.append(scene)
+        scene.enter()
+
+    def pop(self):
+        scene = self.stack.pop()
+        scene.exit()
+        if self.stack:
+            self.stack[-1].mark_dirty()
+            self.stack[-1].resume()
+        return scene
+
+    def replace(self, scene):
+        self.stack.pop().exit()
+        self.push(scene)
+
+    def quit(self):
+        self.running = False
+
+    def run(self):
+        clock = pygame.time.Clock()
+        recorder = latency.recorder
+        self.running = True
+        while self.running and self.stack:
+            events = []
+            if self.top.frame_rate is None and not self.top.dirty:
+                # Nothing to show: sleep until input arrives or the timeout
+                event = pygame.event.wait(int(self.idle_timeout * 1000))
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+            profiler.start_frame(self.top.name)
+            if self.top.records_latency:
+                recorder.polled()
+            events += pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.quit()
+                    break
+                if profiler.handle_event(event):
+                    self.top.invalidate()
+                    self.top.mark_dirty()
+                    continue
+                if event.type != pygame.MOUSEMOTION:
+                    self.top.mark_dirty()
+                # Events after a scene change go to the new scene
+                self.top.handle_event(event)
+                if not self.stack:
+                    break
+            profiler.mark("events")
+            if not self.running or not self.stack:
+                break
+
+            self.top.update()
+            profiler.mark("logic")
+            if not self.stack:
+                break
+
+            scene = self.top
+            if scene.frame_rate is None and not scene.dirty:
+                # Idle wake-up; not a frame
+                profiler.discard_frame()
+                continue
+            scene.dirty = False
+            dirty = scene.draw(self.screen)
+            overlay = profiler.draw_overlay(self.screen)
+            profiler.mark("draw")
+            if dirty is None:
+                pygame.display.flip()
+            else:
+                if overlay:
+                    dirty.append(overlay)
+                if dirty:
+                    pygame.display.update(dirty)
+            recorder.rendered()
+            profiler.mark("flip")
+            profiler.end_frame()
+            clock.tick(scene.frame_rate or self.fps)
+
+        while self.stack:
+            self.pop()
@@ -1,39 +1,30 @@
 import pygame
-import sys
 import random
-import time
-
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.mixer.init()
-
-
-# Load menu background once for use in menus
-try:
-    menu_background = pygame.image.load("bg.png")
-    menu_background = pygame.transform.scale(menu_background, (800, 600))  # Or use your WIDTH, HEIGHT if defined
-except:
-    menu_background = None
-
-try:
-    correct_sound = pygame.mixer.Sound("correct.wav")
-    correct_sound.set_volume(0.7)  # Adjust as needed
-except pygame.error as e:
-    print("Could not load correct sound:", e)
-    correct_sound = None
-
-try:
-    wrong_sound = pygame.mixer.Sound("wrong.mp3")
-    wrong_sound.set_volume(0.7)  # Adjust as needed
-except pygame.error as e:
-    print("Could not load correct sound:", e)
-    wrong_sound = None
-
-try:
-    move_sound = pygame.mixer.Sound("move.mp3")
-    move_sound.set_volume(0.7)  # Adjust as needed
-except pygame.error as e:
-    print("Could not load correct sound:", e)
-    move_sound = None
+import latency
+import math
+import records
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bitboard import square, row_col
+from ai import make_player
+from assets import assets
+from event_log import log_event
+from fonts import get_font, prewarm
+from renderer import BoardRenderer
+from rules import GameState, calculate_score, create_position, make_question
+from scenes import MenuScene, Scene, SceneManager
+from scores import score_store
+from sounds import sound_bank, play_sound
+from text_cache import render_text
+
+# Sounds are decoded once and shared with main.py
+sound_bank.load_defaults()
+
+
+# Load menu background once for use in menus (decoded in the background)
+MENU_BACKGROUND = "bg.png"
+MENU_SIZE = (800, 600)  # Or use your WIDTH, HEIGHT if defined
+assets.preload([MENU_BACKGROUND], MENU_SIZE)
 
 class SciDamaGame:
     def __init__(self, screen, width, height):
@@ -45,14 +36,6 @@ class SciDamaGame:
         self.ROWS, self.COLS = 8, 8
         self.SQUARE_SIZE = min(self.BOARD_WIDTH, self.HEIGHT) // self.COLS
         self.PIECE_RADIUS = self.SQUARE_SIZE // 2 - 10
-        self.correct_sound = pygame.mixer.Sound("correct.wav")
-        self.correct_sound.set_volume(0.7)  # Adjust as needed
-        self.wrong_sound = pygame.mixer.Sound("wrong.mp3")
-        self.wrong_sound.set_volume(0.7)
-        self.move_sound = pygame.mixer.Sound("move.mp3")  # Use your sound file name
-        self.move_sound.set_volume(0.5)  # Adjust volume as needed
-
-
 
         # Colors
         self.WHITE = (255, 255, 255)
@@ -66,508 +49,569 @@ class SciDamaGame:
         self.GOLD = (255, 215, 0)
 
         # Fonts
-        self.FONT = pygame.font.SysFont("Arial", 32)
-        self.SMALL_FONT = pygame.font.SysFont("Arial", 20)
-        self.PIECE_FONT = pygame.font.SysFont("Arial", 20, bold=True)
-        self.KING_FONT = pygame.font.SysFont("Arial", 18, bold=True)
+        self.FONT = get_font("Arial", 32)
+        self.SMALL_FONT = get_font("Arial", 20)
+        self.PIECE_FONT = get_font("Arial", 20, bold=True)
+        self.KING_FONT = get_font("Arial", 18, bold=True)
 
         # Game state
         self.difficulty = "Easy"
         self.question_timer = 15
         self.operation = '+'
-        self.board, self.numbers, self.kings = self.create_board()
+        self.ai_time_limit = 0.25  # Seconds the Hard AI may think per move
+        self.ai_move_delay = 0.5   # Pause after the player's move before the AI replies
+        self.ai_ponder = True      # Let the AI think on the player's time
+        # Everything random in a game comes from one seeded generator
+        self.seed = records.new_seed()
+        self.rng = random.Random(self.seed)
+        self.record = None
+        self.ai_player = self.new_ai_player()
+        self.ai_executor = None
+        self.ai_future = None
+        self.ponder_stop = None
+        self.ai_due = 0.0
         self.selected = None
         self.valid_moves = []
         self.player_color = 2  # Always Blue at bottom
         self.ai_color = 1      # Always Red at top
-        self.turn = self.player_color
-        self.red_pieces = 12
-        self.blue_pieces = 12
-        self.player_score = 0
-        self.ai_score = 0
+        self.state = self.new_state()
+        self.renderer = BoardRenderer(self)
+        self.back_button = None
+
+    # The rules live in rules.GameState; these read through to it
+    @property
+    def position(self):
+        return self.state.position
+
+    @property
+    def turn(self):
+        return self.state.turn
+
+    @property
+    def player_score(self):
+        return self.state.scores[self.player_color]
+
+    @property
+    def ai_score(self):
+        return self.state.scores[self.ai_color]
+
+    @property
+    def red_pieces(self):
+        return self.state.pieces(1)
+
+    @property
+    def blue_pieces(self):
+        return self.state.pieces(2)
 
     def create_board(self):
-        board = [[0 for _ in range(self.COLS)] for _ in range(self.ROWS)]
-        numbers = [[0 for _ in range(self.COLS)] for _ in range(self.ROWS)]
-        kings = [[False for _ in range(self.COLS)] for _ in range(self.ROWS)]
-        if self.difficulty == "Easy":
-            num_min, num_max = 1, 6
-        elif self.difficulty == "Medium":
-            num_min, num_max = 4, 12
-        else:
-            num_min, num_max = 8, 20
-        for row in range(3):
-            for col in range(self.COLS):
-                if (row + col) % 2 == 1:
-                    board[row][col] = 1
-                    numbers[row][col] = random.randint(num_min, num_max)
-        for row in range(5, 8):
-            for col in range(self.COLS):
-                if (row + col) % 2 == 1:
-                    board[row][col] = 2
-                    numbers[row][col] = random.randint(num_min, num_max)
-        return board, numbers, kings
-
-    def draw_board(self):
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                color = self.BOARD_WHITE if (row + col) % 2 == 1 else self.BOARD_BLACK
-                pygame.draw.rect(self.screen, color,
-                                 (col * self.SQUARE_SIZE, row * self.SQUARE_SIZE,
-                                  self.SQUARE_SIZE, self.SQUARE_SIZE))
-
-    def draw_pieces(self):
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                piece = self.board[row][col]
-                if piece != 0:
-                    piece_color = self.RED if piece == 1 else self.BLUE
-                    center = (col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
-                              row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2)
-                    pygame.draw.circle(self.screen, piece_color, center, self.PIECE_RADIUS)
-                    # Draw piece number
-                    num = self.numbers[row][col]
-                    num_surf = self.PIECE_FONT.render(str(num), True, self.WHITE)
-                    num_rect = num_surf.get_rect(center=center)
-                    self.screen.blit(num_surf, num_rect)
-                    # Draw king marker
-                    if self.kings[row][col]:
-                        pygame.draw.circle(self.screen, self.GOLD, center, self.PIECE_RADIUS // 2, 3)
-                        king_surf = self.KING_FONT.render("K", True, self.GOLD)
-                        king_rect = king_surf.get_rect(center=(center[0], center[1]+16))
-                        self.screen.blit(king_surf, king_rect)
-        # Highlight selected piece
-        if self.selected:
-            row, col = self.selected
-            pygame.draw.rect(self.screen, self.GREEN,
-                             (col * self.SQUARE_SIZE, row * self.SQUARE_SIZE,
-                              self.SQUARE_SIZE, self.SQUARE_SIZE), 4)
-        # Highlight valid moves
-        if self.selected:
-            for move in self.valid_moves:
-                if isinstance(move, tuple) and isinstance(move[0], tuple):
-                    dest_row, dest_col = move[0]
-                else:
-                    dest_row, dest_col = move
-                center = (dest_col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
-                          dest_row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2)
-                pygame.draw.circle(self.screen, self.GREEN, center, self.PIECE_RADIUS // 2, 3)
+        return create_position(self.difficulty, self.rng)
+
+    def new_ai_player(self):
+        return make_player(self.difficulty, self.operation, self.rng, time_limit=self.ai_time_limit)
+
+    def new_state(self):
+        # Player always starts
+        return GameState(self.create_board(), self.operation, self.difficulty, self.player_color)
 
     def draw_scores(self):
         pygame.draw.rect(self.screen, self.GRAY, 
                          (self.BOARD_WIDTH, 0, self.INFO_WIDTH, self.HEIGHT), border_radius=16)
 
         y = 30
-        self.screen.blit(self.SMALL_FONT.render("🟦 PLAYER", True, self.BLUE), (self.BOARD_WIDTH + 10, y))
+        self.screen.blit(render_text(self.SMALL_FONT, "🟦 PLAYER", True, self.BLUE), (self.BOARD_WIDTH + 10, y))
         y += 22
-        self.screen.blit(self.SMALL_FONT.render(f"Score: {self.player_score}", True, self.BLUE), (self.BOARD_WIDTH + 10, y))
+        self.screen.blit(render_text(self.SMALL_FONT, f"Score: {self.player_score}", True, self.BLUE), (self.BOARD_WIDTH + 10, y))
         y += 24
-        self.screen.blit(self.SMALL_FONT.render("🟥 AI", True, self.RED), (self.BOARD_WIDTH + 10, y))
+        self.screen.blit(render_text(self.SMALL_FONT, "🟥 AI", True, self.RED), (self.BOARD_WIDTH + 10, y))
         y += 22
-        self.screen.blit(self.SMALL_FONT.render(f"Score: {self.ai_score}", True, self.RED), (self.BOARD_WIDTH + 10, y))
+        self.screen.blit(render_text(self.SMALL_FONT, f"Score: {self.ai_score}", True, self.RED), (self.BOARD_WIDTH + 10, y))
         y += 24
-        self.screen.blit(self.SMALL_FONT.render(f"Operation: {self.operation}", True, self.BLACK), (self.BOARD_WIDTH + 10, y))
+        self.screen.blit(render_text(self.SMALL_FONT, f"Operation: {self.operation}", True, self.BLACK), (self.BOARD_WIDTH + 10, y))
         y += 24
-        self.screen.blit(self.SMALL_FONT.render(f"Turn: {'Player' if self.turn == self.player_color else 'AI'}", True, self.BLACK), (self.BOARD_WIDTH + 10, y))
+        self.screen.blit(render_text(self.SMALL_FONT, f"Turn: {'Player' if self.turn == self.player_color else 'AI'}", True, self.BLACK), (self.BOARD_WIDTH + 10, y))
         y += 24
-        self.screen.blit(self.SMALL_FONT.render(f"Difficulty: {self.difficulty}", True, self.BLACK), (self.BOARD_WIDTH + 10, y))
-
-    def select_difficulty_menu(self):
-        clock = pygame.time.Clock()
-        easy_btn = Button((self.WIDTH // 2) - 210, self.HEIGHT // 2, 120, 50, "Easy", self.GREEN)
-        medium_btn = Button((self.WIDTH // 2) - 70, self.HEIGHT // 2, 120, 50, "Medium", self.BLUE)
-        hard_btn = Button((self.WIDTH // 2) + 70, self.HEIGHT // 2, 120, 50, "Hard", self.RED)
-        selecting = True
-        while selecting:
-            clock.tick(60)
-            if menu_background:
-                self.screen.blit(menu_background, (0, 0))
-            else:
-                self.screen.fill(self.GRAY)
-
-            title = self.FONT.render("Select Difficulty", True, self.BLACK)
-            self.screen.blit(title, title.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 15)))
-            easy_btn.draw(self.screen)
-            medium_btn.draw(self.screen)
-            hard_btn.draw(self.screen)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    if easy_btn.is_clicked(pos):
-                        self.difficulty = "Easy"
-                        self.question_timer = 15
-                        selecting = False
-                    elif medium_btn.is_clicked(pos):
-                        self.difficulty = "Medium"
-                        self.question_timer = 12
-                        selecting = False
-                    elif hard_btn.is_clicked(pos):
-                        self.difficulty = "Hard"
-                        self.question_timer = 10
-                        selecting = False
-            pygame.display.flip()
-
-    def select_operation_menu(self):
-        clock = pygame.time.Clock()
-        add_btn = Button((self.WIDTH // 2) - 210, self.HEIGHT // 2, 100, 50, "Add", self.GREEN)
-        sub_btn = Button((self.WIDTH // 2) - 70, self.HEIGHT // 2, 100, 50, "Subtract", self.BLUE)
-        mul_btn = Button((self.WIDTH // 2) + 70, self.HEIGHT // 2, 100, 50, "Multiply", self.RED)
-        div_btn = Button((self.WIDTH // 2) + 210, self.HEIGHT // 2, 100, 50, "Divide", self.GRAY)
-        back_button = Button((self.WIDTH // 2) - 60, self.HEIGHT // 2 + 80, 120, 40, "Back", self.BLACK)
-        selecting = True
-        while selecting:
-            clock.tick(60)
-            if menu_background:
-                self.screen.blit(menu_background, (0, 0))
-            else:
-                self.screen.fill(self.GRAY)
-            
-            title = self.FONT.render("Choose Arithmetic Operation", True, self.BLACK)
-            self.screen.blit(title, title.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 15)))
-            add_btn.draw(self.screen)
-            sub_btn.draw(self.screen)
-            mul_btn.draw(self.screen)
-            div_btn.draw(self.screen)
-            back_button.draw(self.screen)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    if add_btn.is_clicked(pos):
-                        self.operation = '+'
-                        selecting = False
-                    elif sub_btn.is_clicked(pos):
-                        self.operation = '-'
-                        selecting = False
-                    elif mul_btn.is_clicked(pos):
-                        self.operation = '*'
-                        selecting = False
-                    elif div_btn.is_clicked(pos):
-                        self.operation = '/'
-                        selecting = False
-                    elif back_button.is_clicked(pos):
-                        self.select_difficulty_menu()
-            pygame.display.flip()
+        self.screen.blit(render_text(self.SMALL_FONT, f"Difficulty: {self.difficulty}", True, self.BLACK), (self.BOARD_WIDTH + 10, y))
+
+    def scene(self):
+        # First screen of a Sci-Dama session; push it on a SceneManager
+        return DamaDifficultyScene(self)
+
+    def start(self):
+        self.seed = records.new_seed()
+        self.rng = random.Random(self.seed)
+        self.state = self.new_state()
+        self.record = records.DamaRecorder(self.seed, self.state)
+        self.ai_player = self.new_ai_player()
+        self.selected = None
+        self.valid_moves = []
+        self.back_button = Button(self.BOARD_WIDTH + 40, self.HEIGHT - 60, 120, 40, "Back", self.BLACK)
+        self.renderer.invalidate()
+        log_event("game_start", mode="sci_dama", difficulty=self.difficulty, variant=self.operation)
 
     def get_valid_moves(self, row, col):
         moves = []
-        piece = self.board[row][col]
-        is_king = self.kings[row][col]
-        if piece == 0:
-            return moves
-        directions = []
-        if is_king:
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        else:
-            direction = 1 if piece == 1 else -1
-            directions = [(direction, -1), (direction, 1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            if is_king:
-                # King can move/capture any distance
-                while 0 <= r < self.ROWS and 0 <= c < self.COLS:
-                    if self.board[r][c] == 0:
-                        moves.append((r, c))
-                    elif self.board[r][c] != piece:
-                        jump_r, jump_c = r + dr, c + dc
-                        while 0 <= jump_r < self.ROWS and 0 <= jump_c < self.COLS and self.board[jump_r][jump_c] == 0:
-                            moves.append(((jump_r, jump_c), (r, c)))
-                            jump_r += dr
-                            jump_c += dc
-                        break
-                    else:
-                        break
-                    r += dr
-                    c += dc
+        for _, dest, captured in self.state.moves_from(square(row, col)):
+            if captured < 0:
+                moves.append(row_col(dest))
             else:
-                if 0 <= r < self.ROWS and 0 <= c < self.COLS:
-                    if self.board[r][c] == 0:
-                        moves.append((r, c))
-                    elif self.board[r][c] != piece:
-                        jump_r = r + dr
-                        jump_c = c + dc
-                        if 0 <= jump_r < self.ROWS and 0 <= jump_c < self.COLS:
-                            if self.board[jump_r][jump_c] == 0:
-                                moves.append(((jump_r, jump_c), (r, c)))
+                moves.append((row_col(dest), row_col(captured)))
         return moves
 
-    def ask_math_question(self, num1, num2):
-        if self.operation == '+':
-            question = f"{num1} + {num2} = ?"
-            answer = num1 + num2
-        elif self.operation == '-':
-            question = f"{num1} - {num2} = ?"
-            answer = num1 - num2
-        elif self.operation == '*':
-            question = f"{num1} * {num2} = ?"
-            answer = num1 * num2
-        elif self.operation == '/':
-            if num2 == 0:
-                num2 = 1
-            question = f"{num1} / {num2} = ?"
-            answer = num1 // num2
-        else:
-            question = f"{num1} + {num2} = ?"
-            answer = num1 + num2
-        return self.popup_question(question, answer)
-
-    def popup_question(self, question, answer):
-        input_text = ''
-        clock = pygame.time.Clock()
-        start_time = time.time()
-        while True:
-            clock.tick(60)
-            self.screen.fill(self.GRAY)
-            qsurf = self.FONT.render(question, True, self.BLACK)
-            self.screen.blit(qsurf, qsurf.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 3)))
-            insurf = self.FONT.render(input_text, True, self.BLACK)
-            self.screen.blit(insurf, insurf.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2)))
-            remaining = max(0, int(self.question_timer - (time.time() - start_time)))
-            timer_surf = self.SMALL_FONT.render(f"Time left: {remaining}", True, self.RED if remaining <= 3 else self.BLACK)
-            self.screen.blit(timer_surf, timer_surf.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 40)))
-            prompt = self.SMALL_FONT.render("Type answer and press Enter", True, self.BLACK)
-            self.screen.blit(prompt, prompt.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 65)))
-            pygame.display.flip()
-            if remaining == 0:
-                return False
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_BACKSPACE:
-                        input_text = input_text[:-1]
-                    elif event.key == pygame.K_RETURN:
-                        try:
-                            if int(input_text) == answer:
-                                self.correct_sound.play()
-                                return True
-                            else:
-                                self.wrong_sound.play()
-                                return False
-                        except:
-                            input_text = ''
-                    elif event.unicode.isdigit() or (event.unicode == '-' and len(input_text) == 0):
-                        input_text += event.unicode
-
-    def move_piece(self, start, end):
-        self.move_sound.play()
-        sr, sc = start
+    def to_move(self, start, end):
         if isinstance(end, tuple) and len(end) == 2 and isinstance(end[0], int):
-            er, ec = end
-            captured = None
-        else:
-            (er, ec), (cr, cc) = end
-            captured = (cr, cc)
-        piece = self.board[sr][sc]
-        num_piece = self.numbers[sr][sc]
-        is_king = self.kings[sr][sc]
-        self.board[sr][sc] = 0
-        self.numbers[sr][sc] = 0
-        self.kings[sr][sc] = False
-        self.board[er][ec] = piece
-        self.numbers[er][ec] = num_piece
-        self.kings[er][ec] = is_king
-
-        # King promotion
-        if not is_king:
-            if piece == 2 and er == 0:
-                self.kings[er][ec] = True
-            elif piece == 1 and er == self.ROWS - 1:
-                self.kings[er][ec] = True
-
-        if captured:
-            captured_piece = self.board[cr][cc]
-            captured_num = self.numbers[cr][cc]
-            if piece == self.player_color:
-                correct = self.ask_math_question(num_piece, captured_num)
-                if correct:
-                    self.board[cr][cc] = 0
-                    self.numbers[cr][cc] = 0
-                    self.kings[cr][cc] = False
-                    self.player_score += self.calculate_score(num_piece, captured_num)
-                    if captured_piece == 1:
-                        self.red_pieces -= 1
-                    else:
-                        self.blue_pieces -= 1
-                else:
-                    self.player_score -= num_piece
-                    self.board[sr][sc] = piece
-                    self.numbers[sr][sc] = num_piece
-                    self.kings[sr][sc] = is_king
-                    self.board[er][ec] = 0
-                    self.numbers[er][ec] = 0
-                    self.kings[er][ec] = False
-            else:  # AI move: always succeeds, just add to AI score
-                self.board[cr][cc] = 0
-                self.numbers[cr][cc] = 0
-                self.kings[cr][cc] = False
-                self.ai_score += self.calculate_score(num_piece, captured_num)
-                if captured_piece == 1:
-                    self.red_pieces -= 1
-                else:
-                    self.blue_pieces -= 1
+            return (square(*start), square(*end), -1)
+        return (square(*start), square(*end[0]), square(*end[1]))
+
+    def capture_question(self, move):
+        # Player captures must answer a question first; AI captures always succeed
+        if move[2] >= 0 and self.position.color_at(move[0]) == self.player_color:
+            numbers = self.position.numbers
+            return make_question(self.operation, numbers[move[0]], numbers[move[2]])
+        return None
+
+    def move_piece(self, start, end, correct=True):
+        play_sound("move")
+        return self.apply_move(self.to_move(start, end), correct)
+
+    def apply_move(self, move, correct=True):
+        if self.record is not None:
+            self.record.add(self.state, move, correct)
+        result = self.state.apply_move(move, correct)
+        # Squares are row * 8 + col; jumped is -1 for a plain move
+        log_event("move", mode="sci_dama", color=result.color, src=move[0], dst=move[1], jumped=move[2],
+                  captured=result.captured, points=result.points, promoted=result.promoted, failed=result.failed)
+        return result
 
     def calculate_score(self, num1, num2):
-        if self.operation == '+':
-            return num1 + num2
-        elif self.operation == '-':
-            return num1 - num2
-        elif self.operation == '*':
-            return num1 * num2
-        elif self.operation == '/':
-            return num1 // (num2 if num2 != 0 else 1)
-        else:
-            return num1 + num2
-
-    def ai_move(self):
-        pieces = []
-        for r in range(self.ROWS):
-            for c in range(self.COLS):
-                if self.board[r][c] == self.ai_color:
-                    pieces.append((r, c))
-        if self.difficulty == "Easy":
-            random.shuffle(pieces)
-            for piece in pieces:
-                moves = self.get_valid_moves(*piece)
-                if moves:
-                    move = random.choice(moves)
-                    self.move_piece(piece, move)
-                    return True
-        elif self.difficulty == "Medium":
-            for piece in pieces:
-                moves = self.get_valid_moves(*piece)
-                jumps = [m for m in moves if isinstance(m, tuple) and isinstance(m[0], tuple)]
-                if jumps:
-                    self.move_piece(piece, random.choice(jumps))
-                    return True
-            for piece in pieces:
-                moves = self.get_valid_moves(*piece)
-                if moves:
-                    self.move_piece(piece, random.choice(moves))
-                    return True
-        else:  # Hard
-            best_score = -float('inf')
-            best_move = None
-            for piece in pieces:
-                moves = self.get_valid_moves(*piece)
-                for m in moves:
-                    if isinstance(m, tuple) and isinstance(m[0], tuple):
-                        (er, ec), (cr, cc) = m
-                        score = self.calculate_score(self.numbers[piece[0]][piece[1]], self.numbers[cr][cc])
-                        if score > best_score:
-                            best_score = score
-                            best_move = (piece, m)
-            if best_move:
-                self.move_piece(best_move[0], best_move[1])
-                return True
-            for piece in pieces:
-                moves = self.get_valid_moves(*piece)
-                if moves:
-                    self.move_piece(piece, random.choice(moves))
-                    return True
-        return False
+        return calculate_score(self.operation, num1, num2)
+
+    def play_ai_move(self, move):
+        if move is None:
+            return False
+        src, dst, cap = move
+        end = row_col(dst) if cap < 0 else (row_col(dst), row_col(cap))
+        self.move_piece(row_col(src), end)
+        return True
+
+    def get_ai_executor(self):
+        if self.ai_executor is None:
+            self.ai_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sci-dama-ai")
+        return self.ai_executor
+
+    def update_ai(self):
+        # The AI thinks on a worker thread, on a copy of the state, while the
+        # frame loop keeps running; its move is played once it is ready and
+        # the pause after the player's move has passed
+        if self.ai_future is None:
+            # The one worker runs the search as soon as pondering has stopped
+            self.stop_ponder()
+            self.ai_due = latency.now() + self.ai_move_delay
+            self.ai_future = self.get_ai_executor().submit(self.ai_player, self.state.copy())
+            return False
+        if not self.ai_future.done() or latency.now() < self.ai_due:
+            return False
+        future, self.ai_future = self.ai_future, None
+        self.play_ai_move(future.result())
+        return True
+
+    def update_ponder(self):
+        # On the player's turn the AI works ahead on its answers to the
+        # player's likely moves, until the player's move is played
+        ponder = getattr(self.ai_player, "ponder", None)
+        if not self.ai_ponder or ponder is None or self.ponder_stop is not None:
+            return
+        self.ponder_stop = threading.Event()
+        self.get_ai_executor().submit(ponder, self.state.copy(), self.ponder_stop)
+
+    def stop_ponder(self):
+        if self.ponder_stop is not None:
+            self.ponder_stop.set()
+            self.ponder_stop = None
+
+    def stop_ai(self):
+        self.stop_ponder()
+        if self.ai_future is not None:
+            self.ai_future.cancel()
+            self.ai_future = None
+        if self.ai_executor is not None:
+            self.ai_executor.shutdown(wait=False)
+            self.ai_executor = None
 
     def has_any_moves(self, color):
-        for r in range(self.ROWS):
-            for c in range(self.COLS):
-                if self.board[r][c] == color and self.get_valid_moves(r, c):
-                    return True
-        return False
+        return self.state.has_moves(color)
+
+    def draw_panel(self):
+        self.draw_scores()
+        if self.back_button:
+            self.back_button.draw(self.screen)
+
+    def save_score(self, winner):
+        score_store.record("sci_dama", self.difficulty, self.player_score,
+                           variant=self.operation, won=winner == self.player_color)
+        score_store.flush()
+        log_event("game_end", mode="sci_dama", difficulty=self.difficulty, score=self.player_score,
+                  opponent_score=self.ai_score, won=winner == self.player_color)
+        self.save_record()
+
+    def save_record(self):
+        # Finished or abandoned, the game is kept as a record
+        if self.record is not None:
+            records.save(self.record.finish(self.state))
+            self.record = None
+
+    def draw_frame(self):
+        # Only the squares and panel text that changed are redrawn; returns
+        # the dirty rects
+        panel_key = (self.player_score, self.ai_score, self.operation, self.turn, self.difficulty)
+        return self.renderer.render(panel_key, self.draw_panel)
 
     def run(self):
-        running = True
-        self.select_difficulty_menu()
-        self.select_operation_menu()
-        self.board, self.numbers, self.kings = self.create_board()
-        self.selected = None
-        self.valid_moves = []
-        self.red_pieces = 12
-        self.blue_pieces = 12
-        self.player_score = 0
-        self.ai_score = 0
-        self.turn = self.player_color  # Player always starts
-        back_button = Button(self.BOARD_WIDTH + 40, self.HEIGHT - 60, 120, 40, "Back", self.BLACK)
-        clock = pygame.time.Clock()
-        while running:
-            clock.tick(60)
-            self.screen.fill(self.BOARD_BLACK)
-            self.draw_board()
-            self.draw_pieces()
-            self.draw_scores()
-            back_button.draw(self.screen)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    break
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
-                    if back_button.is_clicked(pos):
-                        running = False
-                        break
-                    col = pos[0] // self.SQUARE_SIZE
-                    row = pos[1] // self.SQUARE_SIZE
-                    if 0 <= row < self.ROWS and 0 <= col < self.COLS and self.turn == self.player_color:
-                        if self.selected:
-                            valid_moves = self.get_valid_moves(self.selected[0], self.selected[1])
-                            valid_move_coords = [m[0] if isinstance(m, tuple) and isinstance(m[0], tuple) else m for m in valid_moves]
-                            if (row, col) in valid_move_coords:
-                                for m in valid_moves:
-                                    if isinstance(m, tuple) and isinstance(m[0], tuple):
-                                        if m[0] == (row, col):
-                                            move = m
-                                            break
-                                    else:
-                                        if m == (row, col):
-                                            move = m
-                                            break
-                                self.move_piece(self.selected, move)
-                                self.selected = None
-                                self.valid_moves = []
-                                self.turn = self.ai_color
-                            else:
-                                if self.board[row][col] == self.player_color:
-                                    self.selected = (row, col)
-                                    self.valid_moves = self.get_valid_moves(row, col)
-                                else:
-                                    self.selected = None
-                                    self.valid_moves = []
-                        else:
-                            if self.board[row][col] == self.player_color:
-                                self.selected = (row, col)
-                                self.valid_moves = self.get_valid_moves(row, col)
-            if self.turn == self.ai_color and running:
-                pygame.time.delay(500)
-                self.ai_move()
-                self.selected = None
-                self.valid_moves = []
-                self.turn = self.player_color
-            # Win condition: no pieces or no moves
-            if self.red_pieces == 0 or not self.has_any_moves(self.ai_color):
-                winner = "Player (Blue) Wins!" if self.player_score >= self.ai_score else "AI (Red) Wins!"
-                self.show_winner(winner)
-                running = False
-            elif self.blue_pieces == 0 or not self.has_any_moves(self.player_color):
-                winner = "AI (Red) Wins!" if self.ai_score >= self.player_score else "Player (Blue) Wins!"
-                self.show_winner(winner)
-                running = False
-            pygame.display.flip()
-
-    def show_winner(self, message):
-        self.screen.fill(self.BLACK)
-        text = self.FONT.render(message, True, self.WHITE)
-        score = self.FONT.render(f"Player: {self.player_score} | AI: {self.ai_score}", True, self.WHITE)
-        rect = text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 - 30))
-        score_rect = score.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 30))
-        self.screen.blit(text, rect)
-        self.screen.blit(score, score_rect)
-        pygame.display.flip()
-        pygame.time.wait(4000)
+        # Play Sci-Dama on its own, outside the main menu
+        manager = SceneManager(self.screen)
+        manager.push(self.scene())
+        manager.run()
+
+
+class DamaDifficultyScene(MenuScene):
+    name = "dama_difficulty_menu"
+
+    def __init__(self, game):
+        super().__init__()
+        self.game = game
+        g = game
+        self.easy_btn = Button((g.WIDTH // 2) - 210, g.HEIGHT // 2, 120, 50, "Easy", g.GREEN)
+        self.medium_btn = Button((g.WIDTH // 2) - 70, g.HEIGHT // 2, 120, 50, "Medium", g.BLUE)
+        self.hard_btn = Button((g.WIDTH // 2) + 70, g.HEIGHT // 2, 120, 50, "Hard", g.RED)
+        self.expert_btn = Button((g.WIDTH // 2) + 210, g.HEIGHT // 2, 120, 50, "Expert", g.BLACK)
+        self.buttons = [self.easy_btn, self.medium_btn, self.hard_btn, self.expert_btn]
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            return
+        g = self.game
+        if self.easy_btn.is_clicked(event.pos):
+            g.difficulty = "Easy"
+            g.question_timer = 15
+        elif self.medium_btn.is_clicked(event.pos):
+            g.difficulty = "Medium"
+            g.question_timer = 12
+        elif self.hard_btn.is_clicked(event.pos):
+            g.difficulty = "Hard"
+            g.question_timer = 10
+        elif self.expert_btn.is_clicked(event.pos):
+            # Hard's numbers against the Monte Carlo AI
+            g.difficulty = "Expert"
+            g.question_timer = 10
+        else:
+            return
+        self.manager.replace(DamaOperationScene(g))
+
+    def draw(self, surface):
+        g = self.game
+        menu_background = assets.get(MENU_BACKGROUND, MENU_SIZE)
+        if menu_background:
+            surface.blit(menu_background, (0, 0))
+        else:
+            surface.fill(g.GRAY)
+        self.loading = menu_background is None
+
+        title = render_text(g.FONT, "Select Difficulty", True, g.BLACK)
+        surface.blit(title, title.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 15)))
+        self.easy_btn.draw(surface)
+        self.medium_btn.draw(surface)
+        self.hard_btn.draw(surface)
+        self.expert_btn.draw(surface)
+
+
+class DamaOperationScene(MenuScene):
+    name = "dama_operation_menu"
+
+    def __init__(self, game):
+        super().__init__()
+        self.game = game
+        g = game
+        self.add_btn = Button((g.WIDTH // 2) - 210, g.HEIGHT // 2, 100, 50, "Add", g.GREEN)
+        self.sub_btn = Button((g.WIDTH // 2) - 70, g.HEIGHT // 2, 100, 50, "Subtract", g.BLUE)
+        self.mul_btn = Button((g.WIDTH // 2) + 70, g.HEIGHT // 2, 100, 50, "Multiply", g.RED)
+        self.div_btn = Button((g.WIDTH // 2) + 210, g.HEIGHT // 2, 100, 50, "Divide", g.GRAY)
+        self.back_button = Button((g.WIDTH // 2) - 60, g.HEIGHT // 2 + 80, 120, 40, "Back", g.BLACK)
+        self.buttons = [self.add_btn, self.sub_btn, self.mul_btn, self.div_btn, self.back_button]
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            return
+        g = self.game
+        if self.add_btn.is_clicked(event.pos):
+            g.operation = '+'
+        elif self.sub_btn.is_clicked(event.pos):
+            g.operation = '-'
+        elif self.mul_btn.is_clicked(event.pos):
+            g.operation = '*'
+        elif self.div_btn.is_clicked(event.pos):
+            g.operation = '/'
+        elif self.back_button.is_clicked(event.pos):
+            self.manager.replace(DamaDifficultyScene(g))
+            return
+        else:
+            return
+        g.start()
+        self.manager.replace(DamaBoardScene(g))
+
+    def draw(self, surface):
+        g = self.game
+        menu_background = assets.get(MENU_BACKGROUND, MENU_SIZE)
+        if menu_background:
+            surface.blit(menu_background, (0, 0))
+        else:
+            surface.fill(g.GRAY)
+        self.loading = menu_background is None
+
+        title = render_text(g.FONT, "Choose Arithmetic Operation", True, g.BLACK)
+        surface.blit(title, title.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 15)))
+        self.add_btn.draw(surface)
+        self.sub_btn.draw(surface)
+        self.mul_btn.draw(surface)
+        self.div_btn.draw(surface)
+        self.back_button.draw(surface)
+
+
+class DamaBoardScene(Scene):
+    name = "sci_dama"
+
+    def __init__(self, game):
+        super().__init__()
+        self.game = game
+
+    def enter(self):
+        self.game.renderer.invalidate()
+
+    def resume(self):
+        # Back from the question popup, which covered the whole window
+        self.game.renderer.invalidate()
+
+    def invalidate(self):
+        self.game.renderer.invalidate()
+
+    def exit(self):
+        self.game.stop_ai()
+        self.game.save_record()
+        latency.print_report_if_enabled()
+
+    def handle_event(self, event):
+        g = self.game
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            g.renderer.invalidate()
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            return
+        pos = event.pos
+        if g.back_button.is_clicked(pos):
+            self.manager.pop()
+            return
+        col = pos[0] // g.SQUARE_SIZE
+        row = pos[1] // g.SQUARE_SIZE
+        if not (0 <= row < g.ROWS and 0 <= col < g.COLS and g.turn == g.player_color):
+            return
+        if g.selected:
+            valid_moves = g.valid_moves
+            valid_move_coords = [m[0] if isinstance(m, tuple) and isinstance(m[0], tuple) else m for m in valid_moves]
+            if (row, col) in valid_move_coords:
+                end = valid_moves[valid_move_coords.index((row, col))]
+                self.play(g.selected, end)
+                g.selected = None
+                g.valid_moves = []
+                return
+        if g.position.piece_at(row, col) == g.player_color:
+            g.selected = (row, col)
+            g.valid_moves = g.get_valid_moves(row, col)
+        elif g.selected:
+            g.selected = None
+            g.valid_moves = []
+
+    def play(self, start, end):
+        g = self.game
+        move = g.to_move(start, end)
+        question = g.capture_question(move)
+        if question is None:
+            g.move_piece(start, end)
+            return
+        play_sound("move")
+        self.manager.push(DamaQuestionScene(g, *question, on_answer=lambda correct: g.apply_move(move, correct)))
+
+    def update(self):
+        g = self.game
+        if g.turn == g.ai_color and g.update_ai():
+            g.selected = None
+            g.valid_moves = []
+        # Win condition: no pieces or no moves
+        winner = g.state.winner()
+        if winner is not None:
+            g.save_score(winner)
+            message = "Player (Blue) Wins!" if winner == g.player_color else "AI (Red) Wins!"
+            self.manager.replace(DamaWinnerScene(g, message))
+        elif g.turn == g.player_color:
+            g.update_ponder()
+
+    def draw(self, surface):
+        return self.game.draw_frame()
+
+
+class DamaQuestionScene(Scene):
+    name = "dama_question"
+    records_latency = True
+
+    def __init__(self, game, question, answer, on_answer):
+        super().__init__()
+        self.game = game
+        self.question = question
+        self.answer = answer
+        self.on_answer = on_answer
+        self.input_text = ''
+
+    def enter(self):
+        latency.recorder.reset_poll()
+        self.start_time = latency.now()
+        log_event("question", mode="sci_dama", level=self.game.difficulty, question=self.question, answer=self.answer)
+
+    def remaining_time(self):
+        return self.game.question_timer - (latency.now() - self.start_time)
+
+    def finish(self, correct):
+        self.manager.pop()
+        self.on_answer(correct)
+
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
+        recorder = latency.recorder
+        event_time = latency.now()
+        if event.key == pygame.K_BACKSPACE:
+            self.input_text = self.input_text[:-1]
+            recorder.key(event_time)
+        elif event.key == pygame.K_RETURN:
+            recorder.submit(event_time)
+            try:
+                user_answer = int(self.input_text)
+            except ValueError:
+                self.input_text = ''
+                return
+            recorder.answered(event_time - self.start_time)
+            correct = user_answer == self.answer
+            log_event("answer", mode="sci_dama", question=self.question, given=user_answer, correct=correct,
+                      elapsed_ms=round((event_time - self.start_time) * 1000, 1))
+            play_sound("correct" if correct else "wrong")
+            self.finish(correct)
+        elif event.unicode.isdigit() or (event.unicode == '-' and len(self.input_text) == 0):
+            self.input_text += event.unicode
+            recorder.key(event_time)
+
+    def update(self):
+        # Time out when the clock actually runs out, not a second early
+        if self.remaining_time() <= 0:
+            log_event("timeout", mode="sci_dama", question=self.question, answer=self.answer)
+            self.finish(False)
+
+    def draw(self, surface):
+        g = self.game
+        surface.fill(g.GRAY)
+        qsurf = render_text(g.FONT, self.question, True, g.BLACK)
+        surface.blit(qsurf, qsurf.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 3)))
+        insurf = render_text(g.FONT, self.input_text, True, g.BLACK)
+        surface.blit(insurf, insurf.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 2)))
+        remaining = max(0, math.ceil(self.remaining_time()))
+        timer_surf = render_text(g.SMALL_FONT, f"Time left: {remaining}", True, g.RED if remaining <= 3 else g.BLACK)
+        surface.blit(timer_surf, timer_surf.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 2 + 40)))
+        prompt = render_text(g.SMALL_FONT, "Type answer and press Enter", True, g.BLACK)
+        surface.blit(prompt, prompt.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 2 + 65)))
+
+
+class DamaReplayScene(Scene):
+    # Plays a records.DamaRecord back on the board. Space pauses, +/- change
+    # the speed, Esc or Back leaves.
+    name = "dama_replay"
+
+    def __init__(self, game, record, speed=2.0):
+        super().__init__()
+        self.game = game
+        self.record = record
+        self.speed = speed  # Moves per second
+        self.paused = False
+        self.next_time = 0.0
+        self.steps = None
+
+    def enter(self):
+        g = self.game
+        g.difficulty = self.record.difficulty
+        g.operation = self.record.operation
+        g.state = records.initial_state(self.record)
+        g.selected = None
+        g.valid_moves = []
+        g.back_button = Button(g.BOARD_WIDTH + 40, g.HEIGHT - 60, 120, 40, "Back", g.BLACK)
+        g.renderer.invalidate()
+        self.steps = records.replay_dama(self.record, g.state)
+        self.next_time = latency.now() + 1 / self.speed
+
+    def invalidate(self):
+        self.game.renderer.invalidate()
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.game.renderer.invalidate()
+        elif event.type == pygame.MOUSEBUTTONDOWN and self.game.back_button.is_clicked(event.pos):
+            self.manager.pop()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.manager.pop()
+            elif event.key == pygame.K_SPACE:
+                self.paused = not self.paused
+            elif event.unicode in ('+', '='):
+                self.speed *= 2
+            elif event.unicode == '-':
+                self.speed /= 2
+
+    def update(self):
+        now = latency.now()
+        if self.paused or self.steps is None or now < self.next_time:
+            return
+        self.next_time = now + 1 / self.speed
+        if next(self.steps, None) is None:
+            self.steps = None
+        else:
+            play_sound("move")
+
+    def draw(self, surface):
+        return self.game.draw_frame()
+
+
+class DamaWinnerScene(Scene):
+    # Shown for a few seconds, or until a click or key press
+    name = "dama_winner"
+
+    def __init__(self, game, message, duration=4.0):
+        super().__init__()
+        self.game = game
+        self.message = message
+        self.duration = duration
+
+    def enter(self):
+        self.end_time = latency.now() + self.duration
+
+    def handle_event(self, event):
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+            self.manager.pop()
+
+    def update(self):
+        if latency.now() >= self.end_time:
+            self.manager.pop()
+
+    def draw(self, surface):
+        g = self.game
+        surface.fill(g.BLACK)
+        text = render_text(g.FONT, self.message, True, g.WHITE)
+        score = render_text(g.FONT, f"Player: {g.player_score} | AI: {g.ai_score}", True, g.WHITE)
+        surface.blit(text, text.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 2 - 30)))
+        surface.blit(score, score.get_rect(center=(g.WIDTH // 2, g.HEIGHT // 2 + 30)))
 
 class Button:
     def __init__(self, x, y, w, h, text, color, text_color=(255, 255, 255)):
@@ -575,11 +619,14 @@ class Button:
         self.text = text
         self.color = color
         self.text_color = text_color
-        self.FONT = pygame.font.SysFont("Arial", 22)
+        self.FONT = get_font("Arial", 22)
+        self.hovered = False
 
     def draw(self, surface):
         pygame.draw.rect(surface, self.color, self.rect, border_radius=8)
-        txt = self.FONT.render(self.text, True, self.text_color)
+        if self.hovered:
+            pygame.draw.rect(surface, (255, 255, 255), self.rect, 3, border_radius=8)
+        txt = render_text(self.FONT, self.text, True, self.text_color)
         txt_rect = txt.get_rect(center=self.rect.center)
         surface.blit(txt, txt_rect)
 
@@ -591,5 +638,6 @@ if __name__ == "__main__":
     screen_width, screen_height = 800, 600
     screen = pygame.display.set_mode((screen_width, screen_height))
     pygame.display.set_caption("Sci-Dama")
+    prewarm()
     game = SciDamaGame(screen, screen_width, screen_height)
     game.run()
@@ -0,0 +1,174 @@
+"""Score store for Math Rush and Sci-Dama.
+
+Every finished game is one row in a SQLite database (WAL mode, so
+readers never block the writer and a crash can't leave a half-written
+file): who played, which game and difficulty, the score and when.
+record() only queues a row; flush() writes everything queued in one
+transaction, and is called at the end of each game and at exit.
+
+The player is the login name (getpass), or MATH_RUSH_PLAYER if set. The
+old highscore_<difficulty>.txt files are imported once, under the player
+name "legacy", and left in place.
+"""
+import atexit
+import getpass
+import glob
+import os
+import sqlite3
+import time
+
+DB_PATH = os.environ.get("MATH_RUSH_SCORES", "scores.db")
+LEGACY_PLAYER = "legacy"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    variant TEXT NOT NULL DEFAULT '',
+    score INTEGER NOT NULL,
+    won INTEGER,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_leaderboard ON scores (mode, difficulty, player, score);
+CREATE INDEX IF NOT EXISTS scores_top ON scores (mode, difficulty, score DESC, played_at);
+CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at REAL NOT NULL);
+"""
+
+
+def current_player():
+    name = os.environ.get("MATH_RUSH_PLAYER")
+    if name:
+        return name
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError, ImportError):  # No login name on this system
+        return "player"
+
+
+class ScoreStore:
+    def __init__(self, path=DB_PATH, player=None):
+        self.path = path
+        self.player = player or current_player()
+        self.conn = None
+        self.pending = []
+
+    def connect(self):
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL only risks the last transactions on power loss,
+            # never a corrupt database
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.conn = conn
+            self.migrate_legacy()
+        return self.conn
+
+    def migrate_legacy(self, pattern="highscore_*.txt"):
+        conn = self.conn
+        rows = []
+        names = []
+        for filename in sorted(glob.glob(pattern)):
+            name = "legacy:" + os.path.basename(filename)
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                continue
+            difficulty = os.path.basename(filename)[len("highscore_"):-len(".txt")].capitalize()
+            try:
+                with open(filename) as f:
+                    text = f.read().strip()
+                played_at = os.path.getmtime(filename)
+            except OSError as e:
+                print(f"Skipping high score file {filename}:", e)
+                continue
+            # Unreadable contents counted as 0 before, so there is nothing to import
+            score = int(text) if text.lstrip('-').isdigit() else 0
+            names.append(name)
+            if score > 0:
+                rows.append((LEGACY_PLAYER, "math_rush", difficulty, "", score, None, played_at))
+        if not names:
+            return 0
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT INTO scores (player, mode, difficulty, variant, score, won, played_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                             [(name, now) for name in names])
+        return len(rows)
+
+    # --- Writing ---
+    def record(self, mode, difficulty, score, variant='', won=None, player=None):
+        self.pending.append((player or self.player, mode, difficulty, variant, score,
+                             None if won is None else int(won), time.time()))
+
+    def flush(self):
+        # All queued rows land in one transaction, or none of them do
+        if not self.pending:
+            return 0
+        rows = self.pending
+        try:
+            conn = self.connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO scores (player, mode, difficulty, variant, score, won, played_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print("Error saving scores:", e)
+            return 0
+        self.pending = []
+        return len(rows)
+
+    def close(self):
+        self.flush()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # --- Queries ---
+    def _pending_best(self, mode, difficulty, player):
+        return max((row[4] for row in self.pending
+                    if row[1] == mode and row[2] == difficulty and (player is None or row[0] == player)),
+                   default=0)
+
+    def high_score(self, mode, difficulty, player=None):
+        # Best score for the mode and difficulty, of one player or of everyone
+        best = self._pending_best(mode, difficulty, player)
+        try:
+            conn = self.connect()
+            if player is None:
+                row = conn.execute("SELECT MAX(score) FROM scores WHERE mode = ? AND difficulty = ?",
+                                   (mode, difficulty)).fetchone()
+            else:
+                row = conn.execute("SELECT MAX(score) FROM scores WHERE mode = ? AND difficulty = ? AND player = ?",
+                                   (mode, difficulty, player)).fetchone()
+        except sqlite3.Error as e:
+            print("Error reading scores:", e)
+            return best
+        return max(best, row[0] or 0)
+
+    def leaderboard(self, mode, difficulty, limit=10):
+        # [(player, best score, games played)], best first
+        try:
+            return self.connect().execute(
+                "SELECT player, MAX(score) AS best, COUNT(*) FROM scores "
+                "WHERE mode = ? AND difficulty = ? GROUP BY player "
+                "ORDER BY best DESC, player LIMIT ?", (mode, difficulty, limit)).fetchall()
+        except sqlite3.Error as e:
+            print("Error reading scores:", e)
+            return []
+
+    def top(self, mode, difficulty, limit=10):
+        # [(player, score, played_at)] for the best single games
+        try:
+            return self.connect().execute(
+                "SELECT player, score, played_at FROM scores WHERE mode = ? AND difficulty = ? "
+                "ORDER BY score DESC, played_at LIMIT ?", (mode, difficulty, limit)).fetchall()
+        except sqlite3.Error as e:
+            print("Error reading scores:", e)
+            return []
+
+
+score_store = ScoreStore()
+atexit.register(score_store.close)
@@ -0,0 +1,561 @@
+"""Sci-Dama match server.
+
+One asyncio process hosts any number of boards at once, player against
+player or player against an AI. The server keeps the GameState of every
+board: a client only says which piece it moves where, the server checks
+that against the piece's legal moves, asks the capture question itself
+and judges the answer. The searching AIs (Hard and Expert) think on a
+process pool, so the event loop never waits on a search; Easy and Medium
+pick a move in microseconds, far less than a trip to a worker costs, and
+play inline.
+
+Every message is a frame: a type byte and a payload length byte, then
+the payload, packed with the structs below. A move is four bytes.
+
+    client -> server
+      JOIN      opponent (0 for another player, else 1 + AI_PLAYERS index),
+                difficulty, operation, match code (players are paired with
+                someone who joined with the same code, difficulty and
+                operation; 0 for anyone)
+      MOVE      src, dst (squares are row * 8 + col)
+      ANSWER    the answer to the open capture question
+      RESIGN
+
+    server -> client
+      WAITING   queued until an opponent joins
+      START     game id, your colour, difficulty, operation, side to move,
+                red and blue bitboards, then the piece numbers in square order
+      QUESTION  seconds to answer, then the question text; no answer in
+                time counts as a wrong one
+      MOVED     colour, src, dst, captured square or -1, flags, scores
+      END       winner (0 for none), reason, scores
+      ERROR     what was wrong with the last message
+
+Serve on localhost, or load test a fresh server with simulated players:
+
+    python server.py serve --port 8765
+    python server.py loadtest --games 1000 --opponents human,Easy
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import struct
+import subprocess
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import records
+from ai import make_player
+from bitboard import RED, BLUE, Position, iter_bits, opponent
+from rules import GameState, NUMBER_RANGES, OPERATIONS
+
+DEFAULT_PORT = 8765
+DIFFICULTIES = tuple(NUMBER_RANGES)
+AI_PLAYERS = ("Easy", "Medium", "Hard", "Expert")
+INLINE_AI = ("Easy", "Medium")
+# Seconds to answer a capture question, as in the local game
+QUESTION_TIME = {"Easy": 15, "Medium": 12, "Hard": 10}
+
+# message type, payload length
+FRAME = struct.Struct("<BB")
+
+JOIN, MOVE, ANSWER, RESIGN = 1, 2, 3, 4
+JOIN_MSG = struct.Struct("<BBBI")
+MOVE_MSG = struct.Struct("<BB")
+ANSWER_MSG = struct.Struct("<i")
+
+WAITING, START, QUESTION, MOVED, END, ERROR = 0x81, 0x82, 0x83, 0x84, 0x85, 0x86
+START_MSG = struct.Struct("<IBBBBQQ")
+QUESTION_MSG = struct.Struct("<B")
+MOVED_MSG = struct.Struct("<BBBbBii")
+END_MSG = struct.Struct("<BBii")
+ERROR_MSG = struct.Struct("<B")
+
+# MOVED flags
+PROMOTED, FAILED = 1, 2
+# END reasons
+FINISHED, RESIGNED, DISCONNECTED, PLY_LIMIT = 0, 1, 2, 3
+# ERROR codes
+BAD_MESSAGE, ALREADY_PLAYING, NOT_PLAYING, NOT_YOUR_TURN, ILLEGAL_MOVE, NO_QUESTION = 1, 2, 3, 4, 5, 6
+
+
+def frame(kind, payload=b""):
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader):
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(length) if length else b""
+
+
+class ProtocolError(Exception):
+    # args[0] is the ERROR code sent back to the client
+    pass
+
+
+# --- AI workers ---
+_players = {}
+
+
+def ai_move(job):
+    # Runs in a worker process; the state travels as plain values. One
+    # player per strategy and operation serves every game in the process.
+    name, operation, time_limit, seed, difficulty, red, blue, kings, numbers, turn, scores = job
+    player = _players.get((name, operation))
+    if player is None:
+        player = _players[name, operation] = make_player(name, operation, random.Random(seed),
+                                                         time_limit=time_limit, workers=1)
+    state = GameState(Position(red, blue, kings, array("B", numbers)), operation, difficulty, turn)
+    state.scores = {RED: scores[0], BLUE: scores[1]}
+    return player(state)
+
+
+# --- Server ---
+class Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.match = None
+        self.color = None
+        self.waiting = None  # pairing key while queued
+
+    def send(self, kind, payload=b""):
+        if not self.writer.is_closing():
+            self.writer.write(frame(kind, payload))
+
+
+class Match:
+    def __init__(self, server, game_id, seed, state, players, ai=None):
+        self.server = server
+        self.id = game_id
+        self.seed = seed
+        self.state = state
+        self.players = players  # colour -> Client, or None for the AI's side
+        self.ai = ai
+        self.ai_player = make_player(ai, state.operation, random.Random(seed)) if ai in INLINE_AI else None
+        self.question = None    # (move, answer, timer) while a capture question is open
+        self.over = False
+        self.record = records.DamaRecorder(seed, state) if server.records_dir else None
+
+    def broadcast(self, kind, payload):
+        for client in self.players.values():
+            if client is not None:
+                client.send(kind, payload)
+
+    def next_turn(self):
+        state = self.state
+        winner = state.winner()
+        if winner is not None:
+            self.end(winner, FINISHED)
+        elif self.server.max_plies and state.ply >= self.server.max_plies:
+            red, blue = state.scores[RED], state.scores[BLUE]
+            self.end(RED if red > blue else BLUE if blue > red else None, PLY_LIMIT)
+        elif self.players[state.turn] is None:
+            self.server.play_ai(self)
+
+    def move(self, client, src, dst):
+        state = self.state
+        if client.color != state.turn or self.question is not None:
+            raise ProtocolError(NOT_YOUR_TURN)
+        if src >= 64 or state.position.color_at(src) != client.color:
+            raise ProtocolError(ILLEGAL_MOVE)
+        for move in state.moves_from(src):
+            if move[1] == dst:
+                break
+        else:
+            raise ProtocolError(ILLEGAL_MOVE)
+        if move[2] < 0:
+            self.play(move, True)
+            return
+        question, answer = state.question_for(move)
+        limit = self.server.question_time or QUESTION_TIME.get(state.difficulty, 10)
+        timer = asyncio.get_running_loop().call_later(limit, self.question_timeout)
+        self.question = (move, answer, timer)
+        client.send(QUESTION, QUESTION_MSG.pack(limit) + question.encode("utf-8"))
+
+    def answer(self, client, given):
+        if self.question is None or client.color != self.state.turn:
+            raise ProtocolError(NO_QUESTION)
+        move, answer, timer = self.question
+        timer.cancel()
+        self.question = None
+        self.play(move, given == answer)
+
+    def question_timeout(self):
+        move = self.question[0]
+        self.question = None
+        self.play(move, False)
+
+    def play(self, move, correct):
+        state = self.state
+        if self.record is not None:
+            self.record.add(state, move, correct)
+        result = state.apply_move(move, correct)
+        flags = (PROMOTED if result.promoted else 0) | (FAILED if result.failed else 0)
+        self.broadcast(MOVED, MOVED_MSG.pack(result.color, move[0], move[1], move[2], flags,
+                                             state.scores[RED], state.scores[BLUE]))
+        self.server.stats["moves"] += 1
+        self.next_turn()
+
+    def end(self, winner, reason):
+        if self.over:
+            return
+        self.over = True
+        if self.question is not None:
+            self.question[2].cancel()
+            self.question = None
+        state = self.state
+        self.broadcast(END, END_MSG.pack(winner or 0, reason, state.scores[RED], state.scores[BLUE]))
+        for client in self.players.values():
+            if client is not None:
+                client.match = client.color = None
+        self.server.finish(self)
+
+
+class MatchServer:
+    def __init__(self, workers=None, ai_time=0.25, question_time=None, max_plies=1000,
+                 records_dir=records.RECORDS_DIR, seed=None):
+        self.pool = ProcessPoolExecutor(max(1, workers or os.cpu_count() or 1))
+        self.ai_time = ai_time
+        self.question_time = question_time
+        self.max_plies = max_plies
+        self.records_dir = records_dir
+        self.rng = random.Random(seed)
+        self.waiting = {}   # (difficulty, operation, code) -> Client
+        self.matches = {}
+        self.tasks = set()
+        self.next_id = 1
+        self.stats = Counter()
+
+    async def handle(self, reader, writer):
+        client = Client(writer)
+        self.stats["connections"] += 1
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                try:
+                    self.dispatch(client, kind, payload)
+                except ProtocolError as e:
+                    self.stats["errors"] += 1
+                    client.send(ERROR, ERROR_MSG.pack(e.args[0]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # The server is shutting down; nothing is waiting on this task
+            pass
+        finally:
+            self.leave(client)
+            writer.close()
+
+    def dispatch(self, client, kind, payload):
+        try:
+            if kind == JOIN:
+                self.join(client, *JOIN_MSG.unpack(payload))
+                return
+            if kind not in (MOVE, ANSWER, RESIGN):
+                raise ProtocolError(BAD_MESSAGE)
+            match = client.match
+            if match is None:
+                raise ProtocolError(NOT_PLAYING)
+            if kind == MOVE:
+                match.move(client, *MOVE_MSG.unpack(payload))
+            elif kind == ANSWER:
+                match.answer(client, *ANSWER_MSG.unpack(payload))
+            else:
+                match.end(opponent(client.color), RESIGNED)
+        except struct.error:
+            raise ProtocolError(BAD_MESSAGE) from None
+
+    def join(self, client, ai, difficulty, operation, code):
+        if client.match is not None or client.waiting is not None:
+            raise ProtocolError(ALREADY_PLAYING)
+        if ai > len(AI_PLAYERS) or difficulty >= len(DIFFICULTIES) or operation >= len(OPERATIONS):
+            raise ProtocolError(BAD_MESSAGE)
+        difficulty, operation = DIFFICULTIES[difficulty], OPERATIONS[operation]
+        if ai:
+            # The player takes Blue, the side at the bottom of the local board
+            self.start(difficulty, operation, {BLUE: client, RED: None}, AI_PLAYERS[ai - 1])
+            return
+        key = (difficulty, operation, code)
+        other = self.waiting.pop(key, None)
+        if other is None:
+            self.waiting[key] = client
+            client.waiting = key
+            client.send(WAITING)
+            return
+        other.waiting = None
+        if self.rng.random() < 0.5:
+            client, other = other, client
+        self.start(difficulty, operation, {BLUE: client, RED: other})
+
+    def leave(self, client):
+        if client.waiting is not None:
+            if self.waiting.get(client.waiting) is client:
+                del self.waiting[client.waiting]
+            client.waiting = None
+        if client.match is not None:
+            client.match.end(opponent(client.color), DISCONNECTED)
+
+    def start(self, difficulty, operation, players, ai=None):
+        seed = self.rng.getrandbits(63)
+        state = GameState.new(difficulty, operation, random.Random(seed))
+        match = Match(self, self.next_id, seed, state, players, ai)
+        self.next_id += 1
+        self.matches[match.id] = match
+        self.stats["games"] += 1
+        pos = state.position
+        numbers = bytes(pos.numbers[sq] for sq in iter_bits(pos.occupied))
+        for color, client in players.items():
+            if client is not None:
+                client.match, client.color = match, color
+                client.send(START, START_MSG.pack(match.id, color, DIFFICULTIES.index(difficulty),
+                                                  OPERATIONS.index(operation), state.turn,
+                                                  pos.red, pos.blue) + numbers)
+        match.next_turn()
+
+    def finish(self, match):
+        del self.matches[match.id]
+        self.stats["finished"] += 1
+        if match.record is not None:
+            record = match.record.finish(match.state)
+            saving = asyncio.get_running_loop().run_in_executor(None, records.save, record, self.records_dir)
+            saving.add_done_callback(self.record_saved)
+
+    def record_saved(self, future):
+        # save() reports I/O errors itself; anything else would vanish
+        # with the unawaited future
+        if not future.cancelled() and future.exception() is not None:
+            print("Could not save game record:", repr(future.exception()))
+
+    def play_ai(self, match):
+        if match.ai_player is not None:
+            self.stats["ai_moves"] += 1
+            match.play(match.ai_player(match.state), True)
+            return
+        # Keep a reference, or the task could be collected mid-search
+        task = asyncio.get_running_loop().create_task(self.ai_turn(match))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def ai_turn(self, match):
+        state = match.state
+        pos = state.position
+        ply = state.ply
+        job = (match.ai, state.operation, self.ai_time, match.seed, state.difficulty,
+               pos.red, pos.blue, pos.kings, bytes(pos.numbers), state.turn,
+               (state.scores[RED], state.scores[BLUE]))
+        try:
+            move = await asyncio.get_running_loop().run_in_executor(self.pool, ai_move, job)
+        except Exception as e:
+            print("AI move failed:", e)
+            move = None
+        if match.over or state.ply != ply:
+            return
+        moves = state.legal_moves()
+        if move not in moves:
+            move = self.rng.choice(moves)
+        self.stats["ai_moves"] += 1
+        # AI captures always succeed, as in the local game
+        match.play(move, True)
+
+    async def report(self, interval):
+        last, last_time = 0, time.perf_counter()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            moves = self.stats["moves"]
+            print(f"{len(self.matches)} games live, {self.stats['finished']} finished, "
+                  f"{(moves - last) / (now - last_time):.0f} moves/s", flush=True)
+            last, last_time = moves, now
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(args):
+    match_server = MatchServer(args.workers, args.ai_time, args.question_time, args.max_plies,
+                               args.records, args.seed)
+    server = await asyncio.start_server(match_server.handle, args.host, args.port, backlog=4096)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Serving on {host}:{port}", flush=True)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+    except (AttributeError, NotImplementedError):
+        pass  # Windows; Ctrl+C still works
+    reporter = loop.create_task(match_server.report(args.report)) if args.report else None
+    try:
+        await stop.wait()
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        server.close()
+        match_server.close()
+        print(f"{match_server.stats['games']} games, {match_server.stats['moves']} moves, "
+              f"{match_server.stats['errors']} bad messages", flush=True)
+
+
+# --- Load test ---
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def simulated_player(host, port, ai, difficulty, operation, code, rng, think, wrong_rate,
+                           stats, finished, latencies):
+    # Plays random legal moves, keeps its own copy of the game from the
+    # server's messages and checks the scores against the server's
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(frame(JOIN, JOIN_MSG.pack(ai, difficulty, operation, code)))
+    state = color = move = None
+    sent = 0.0
+
+    async def act():
+        nonlocal move, sent
+        if think:
+            await asyncio.sleep(think * 2 * rng.random())
+        move = rng.choice(state.legal_moves())
+        sent = time.perf_counter()
+        writer.write(frame(MOVE, MOVE_MSG.pack(move[0], move[1])))
+
+    try:
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind == START:
+                game_id, color, _, _, turn, red, blue = START_MSG.unpack_from(payload)
+                pos = Position()
+                for sq, number in zip(iter_bits(red | blue), payload[START_MSG.size:]):
+                    pos.place(sq, RED if red >> sq & 1 else BLUE, number)
+                state = GameState(pos, OPERATIONS[operation], DIFFICULTIES[difficulty], turn)
+                stats["live"] += 1
+                stats["peak"] = max(stats["peak"], stats["live"])
+                if state.turn == color:
+                    await act()
+            elif kind == QUESTION:
+                latencies.append(time.perf_counter() - sent)
+                answer = state.question_for(move)[1]
+                if rng.random() < wrong_rate:
+                    answer += 1
+                sent = time.perf_counter()
+                writer.write(frame(ANSWER, ANSWER_MSG.pack(answer)))
+            elif kind == MOVED:
+                mover, src, dst, cap, flags, red_score, blue_score = MOVED_MSG.unpack(payload)
+                if mover == color:
+                    latencies.append(time.perf_counter() - sent)
+                state.apply_move((src, dst, cap), not flags & FAILED)
+                if (state.scores[RED], state.scores[BLUE]) != (red_score, blue_score):
+                    stats["desyncs"] += 1
+                stats["moves"] += 1
+                if state.turn == color and state.winner() is None:
+                    await act()
+            elif kind == END:
+                stats["live"] -= 1
+                finished.add(game_id)
+                break
+            elif kind == ERROR:
+                stats["errors"] += 1
+    finally:
+        writer.close()
+
+
+async def load_test(args, host, port):
+    rng = random.Random(args.seed)
+    opponents = [name.strip() for name in args.opponents.split(",") if name.strip()]
+    stats = Counter()
+    finished = set()
+    latencies = []
+    players = []
+    for game in range(args.games):
+        name = opponents[game % len(opponents)]
+        ai = 0 if name == "human" else AI_PLAYERS.index(name) + 1
+        difficulty = game % len(DIFFICULTIES)
+        operation = game // len(DIFFICULTIES) % len(OPERATIONS)
+        for _ in range(1 if ai else 2):
+            players.append((game, (ai, difficulty, operation, game + 1, random.Random(rng.getrandbits(32)))))
+
+    async def run(delay, player):
+        await asyncio.sleep(delay)
+        try:
+            await simulated_player(host, port, *player, args.think, args.wrong_rate, stats, finished, latencies)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            stats["failed"] += 1
+            if stats["failed"] == 1:
+                print("Player failed:", e)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(args.ramp * game / args.games, player) for game, player in players))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{len(finished)} games with {len(players)} players in {elapsed:.1f} s, "
+          f"peak {stats['peak']} players in a game at once")
+    print(f"{stats['moves']} moves seen by players ({stats['moves'] / elapsed:.0f}/s), "
+          f"{len(latencies)} replies to players' moves and answers")
+    print(f"reply latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {percentile(latencies, 1.0) * 1000:.1f} ms")
+    print(f"{stats['errors']} errors, {stats['desyncs']} score mismatches, {stats['failed']} failed connections")
+    return not (stats["errors"] or stats["desyncs"] or stats["failed"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sci-Dama match server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    server = commands.add_parser("serve", help="host games")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=DEFAULT_PORT)
+    server.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="AI worker processes")
+    server.add_argument("--ai-time", type=float, default=0.25, help="seconds per AI move")
+    server.add_argument("--question-time", type=int, default=None,
+                        help="seconds per capture question (default by difficulty)")
+    server.add_argument("--max-plies", type=int, default=1000,
+                        help="end a game on points after this many plies (0 for no limit)")
+    server.add_argument("--records", default=records.RECORDS_DIR,
+                        help="directory for game records (empty to keep none)")
+    server.add_argument("--report", type=float, default=0, help="print load every N seconds")
+    server.add_argument("--seed", type=int, default=None)
+    tester = commands.add_parser("loadtest", help="play simulated players against a local server")
+    tester.add_argument("--games", type=int, default=1000)
+    tester.add_argument("--opponents", default="human,Easy",
+                        help="comma-separated: human and/or AI strategies, cycled over the games")
+    tester.add_argument("--think", type=float, default=0.2, help="mean seconds a player thinks per move")
+    tester.add_argument("--ramp", type=float, default=2.0, help="seconds over which games start")
+    tester.add_argument("--wrong-rate", type=float, default=0.2, help="share of questions answered wrongly")
+    tester.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    tester.add_argument("--ai-time", type=float, default=0.05)
+    tester.add_argument("--port", type=int, default=None,
+                        help="use the server already on this port instead of starting one")
+    tester.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    for name in args.opponents.split(","):
+        if name.strip() not in ("human",) + AI_PLAYERS:
+            parser.error(f"unknown opponent: {name}")
+    process = None
+    port = args.port
+    if port is None:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--port", "0",
+                                    "--records", "", "--workers", str(args.workers),
+                                    "--ai-time", str(args.ai_time)],
+                                   stdout=subprocess.PIPE, text=True)
+        port = int(process.stdout.readline().rsplit(":", 1)[1])
+    try:
+        ok = asyncio.run(load_test(args, "127.0.0.1", port))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
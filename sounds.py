@@ -0,0 +1,86 @@
+"""Shared sound bank for Math Rush and Sci-Dama.
+
+Each clip is decoded to PCM once per process, however many screens or
+games use it, and played on a fixed pool of reserved mixer channels so
+overlapping effects never wait for each other. A missing file or audio
+device only disables that sound.
+"""
+import time
+
+import pygame
+
+CLIPS = {
+    "correct": ("correct.wav", 0.7),
+    "wrong": ("wrong.mp3", 0.7),
+    "move": ("move.mp3", 0.5),
+}
+
+
+class SoundBank:
+    def __init__(self, channels=8):
+        self.num_channels = channels
+        self.sounds = {}
+        self.channels = []
+        self.started = []
+        self.ready = False
+
+    def init(self):
+        if self.ready:
+            return True
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.pre_init(44100, -16, 2, 512)
+                pygame.mixer.init()
+            if pygame.mixer.get_num_channels() < self.num_channels:
+                pygame.mixer.set_num_channels(self.num_channels)
+            # Reserved channels are never picked by a plain Sound.play()
+            pygame.mixer.set_reserved(self.num_channels)
+            self.channels = [pygame.mixer.Channel(i) for i in range(self.num_channels)]
+            self.started = [0.0] * self.num_channels
+            self.ready = True
+        except pygame.error as e:
+            print("Could not initialise audio:", e)
+        return self.ready
+
+    def load(self, name, path, volume=1.0):
+        if name in self.sounds:
+            return self.sounds[name]
+        sound = None
+        if self.init():
+            try:
+                sound = pygame.mixer.Sound(path)
+                sound.set_volume(volume)
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Could not load {name} sound:", e)
+        self.sounds[name] = sound
+        return sound
+
+    def load_defaults(self):
+        for name, (path, volume) in CLIPS.items():
+            self.load(name, path, volume)
+
+    def get(self, name):
+        return self.sounds.get(name)
+
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return None
+        index = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                index = i
+                break
+        if index is None:
+            # All busy: cut off the effect that started longest ago
+            index = min(range(len(self.channels)), key=self.started.__getitem__)
+        self.channels[index].play(sound)
+        self.started[index] = time.perf_counter()
+        return self.channels[index]
+
+
+sound_bank = SoundBank()
+
+
+def play_sound(name):
+    return sound_bank.play(name)
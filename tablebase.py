@@ -0,0 +1,276 @@
+"""Endgame tablebase for Sci-Dama positions with one piece a side.
+
+With one piece each, the piece numbers never change, so the only thing
+they decide is who wins each of the four ways the game can end: Red
+captures, Blue captures, Red is blocked or Blue is blocked. That gives 16
+"labels", and every label is solved once for all placements of the two
+pieces (man or king on each of the 32 dark squares) and both sides to
+move, by retrograde analysis from the end positions.
+
+Each entry is one byte: 0 if neither side can force the game to end in
+its favour, otherwise the winner in the top bit (set for Blue) and the
+number of plies to the end plus one in the low 7 bits. The file is a
+small header followed by the entries in index order, so a probe is one
+index calculation and one byte read from the memory-mapped file.
+
+Build the file with:
+
+    python tablebase.py
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from bitboard import RED, BLUE, ROWS, COLS, PROMOTION_ROW, Position
+from rules import calculate_score
+
+TABLEBASE_PATH = os.environ.get("MATH_RUSH_TABLEBASE", os.path.join("data", "endgame_1v1.bin"))
+TABLEBASE_MAGIC = b"SDTB"
+TABLEBASE_VERSION = 1
+# magic, version, entry count
+TABLEBASE_HEADER = struct.Struct("<4sHxxI")
+
+DARK_SQUARES = [sq for sq in range(ROWS * COLS) if sum(divmod(sq, COLS)) % 2 == 1]
+DARK_INDEX = [-1] * (ROWS * COLS)
+for _i, _sq in enumerate(DARK_SQUARES):
+    DARK_INDEX[_sq] = _i
+del _i, _sq
+
+LABELS = 16
+SIDES = (RED, BLUE)
+ENTRIES = LABELS * 2 * len(DARK_SQUARES) * 2 * len(DARK_SQUARES) * 2
+MAX_PLIES = 126
+BLUE_WINS = 0x80
+
+# Label bits: set when Red wins that way of ending the game
+RED_CAPTURES, BLUE_CAPTURES, RED_BLOCKED, BLUE_BLOCKED = 1, 2, 4, 8
+
+
+def label(operation, red_number, blue_number, red_diff):
+    # `red_diff` is Red's score minus Blue's. Mirrors rules.result: Red is
+    # checked first and the side that can still move wins ties.
+    bits = 0
+    if red_diff + calculate_score(operation, red_number, blue_number) >= 0:
+        bits |= RED_CAPTURES
+    if red_diff - calculate_score(operation, blue_number, red_number) > 0:
+        bits |= BLUE_CAPTURES
+    if red_diff > 0:
+        bits |= RED_BLOCKED
+    if red_diff >= 0:
+        bits |= BLUE_BLOCKED
+    return bits
+
+
+def index(bits, side, red_sq, red_king, blue_sq, blue_king):
+    i = (bits * 2 + (side == BLUE)) * 32 + DARK_INDEX[red_sq]
+    i = (i * 2 + red_king) * 32 + DARK_INDEX[blue_sq]
+    return i * 2 + blue_king
+
+
+class Tablebase:
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    @classmethod
+    def open(cls, path=TABLEBASE_PATH):
+        # Returns None if there is no usable file
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) != TABLEBASE_HEADER.size + ENTRIES:
+            mm.close()
+            return None
+        magic, version, count = TABLEBASE_HEADER.unpack_from(mm)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION or count != ENTRIES:
+            mm.close()
+            return None
+        return cls(mm, TABLEBASE_HEADER.size)
+
+    def probe(self, pos, side, operation, red_diff):
+        """Return (winner, plies to the end) for a one-against-one position,
+        or None if the position is not covered or is a draw."""
+        if pos.red.bit_count() != 1 or pos.blue.bit_count() != 1:
+            return None
+        red_sq = pos.red.bit_length() - 1
+        blue_sq = pos.blue.bit_length() - 1
+        numbers = pos.numbers
+        bits = label(operation, numbers[red_sq], numbers[blue_sq], red_diff)
+        value = self.data[self.offset + index(bits, side, red_sq, pos.kings >> red_sq & 1,
+                                              blue_sq, pos.kings >> blue_sq & 1)]
+        if not value:
+            return None
+        return (BLUE if value & BLUE_WINS else RED), (value & 0x7F) - 1
+
+
+_loaded = {}
+
+
+def load(path=TABLEBASE_PATH):
+    # One shared mapping per file; None if it hasn't been built
+    if path not in _loaded:
+        _loaded[path] = Tablebase.open(path)
+    return _loaded[path]
+
+
+# --- Generation ---
+def _placements():
+    # Every legal (red_sq, red_king, blue_sq, blue_king); men never stand
+    # on their own promotion row
+    for red_sq in DARK_SQUARES:
+        for red_king in (0, 1):
+            if not red_king and red_sq // COLS == PROMOTION_ROW[RED]:
+                continue
+            for blue_sq in DARK_SQUARES:
+                if blue_sq == red_sq:
+                    continue
+                for blue_king in (0, 1):
+                    if not blue_king and blue_sq // COLS == PROMOTION_ROW[BLUE]:
+                        continue
+                    yield red_sq, red_king, blue_sq, blue_king
+
+
+def _position(red_sq, red_king, blue_sq, blue_king):
+    pos = Position()
+    pos.place(red_sq, RED, 1, bool(red_king))
+    pos.place(blue_sq, BLUE, 1, bool(blue_king))
+    return pos
+
+
+def build_graph():
+    """Return (nodes, blocked, moves) for the label-independent game graph.
+
+    nodes[i] is (side, red_sq, red_king, blue_sq, blue_king); blocked[i] is
+    RED_BLOCKED or BLUE_BLOCKED for a finished position, else 0; moves[i]
+    lists the successor nodes, with -RED_CAPTURES / -BLUE_CAPTURES for a
+    capture, which always ends the game.
+    """
+    nodes = []
+    lookup = {}
+    for placement in _placements():
+        for side in SIDES:
+            lookup[(side,) + placement] = len(nodes)
+            nodes.append((side,) + placement)
+    blocked = [0] * len(nodes)
+    moves = [[] for _ in nodes]
+    for i, (side, red_sq, red_king, blue_sq, blue_king) in enumerate(nodes):
+        pos = _position(red_sq, red_king, blue_sq, blue_king)
+        if not pos.movable(RED):
+            blocked[i] = RED_BLOCKED
+            continue
+        if not pos.movable(BLUE):
+            blocked[i] = BLUE_BLOCKED
+            continue
+        src = red_sq if side == RED else blue_sq
+        for dst, cap in pos.moves_from(src):
+            if cap >= 0:
+                # A lone piece can always move, so the capture ends the game
+                moves[i].append(-RED_CAPTURES if side == RED else -BLUE_CAPTURES)
+                continue
+            child = pos.copy()
+            child.move(src, dst)
+            red_sq2 = child.red.bit_length() - 1
+            blue_sq2 = child.blue.bit_length() - 1
+            moves[i].append(lookup[(BLUE if side == RED else RED, red_sq2, child.kings >> red_sq2 & 1,
+                                    blue_sq2, child.kings >> blue_sq2 & 1)])
+    return nodes, blocked, moves
+
+
+def solve(bits, nodes, blocked, moves, parents):
+    # Retrograde analysis by distance: positions decided in n plies are
+    # found from those decided in n - 1. Returns (winner, plies) lists,
+    # with winner None where neither side can force an end.
+    count = len(nodes)
+    winner = [None] * count
+    plies = [0] * count
+    remaining = [0] * count
+    layer = []
+    captures = []
+    for i in range(count):
+        if blocked[i]:
+            winner[i] = RED if bits & blocked[i] else BLUE
+            layer.append(i)
+            continue
+        side = nodes[i][0]
+        remaining[i] = len(moves[i])
+        for move in moves[i]:
+            if move >= 0:
+                continue
+            if (RED if bits & -move else BLUE) == side:
+                winner[i] = side
+                break
+            remaining[i] -= 1
+        else:
+            if remaining[i] == 0:
+                winner[i] = BLUE if side == RED else RED
+        if winner[i] is not None:
+            plies[i] = 1
+            captures.append(i)
+
+    # Captures end the game on the spot, so they join the positions
+    # decided in one ply
+    depth = 0
+    while layer or captures:
+        next_layer, captures = captures, []
+        for child in layer:
+            for parent in parents[child]:
+                if winner[parent] is not None:
+                    continue
+                remaining[parent] -= 1
+                if nodes[parent][0] == winner[child] or remaining[parent] == 0:
+                    winner[parent] = winner[child]
+                    plies[parent] = depth + 1
+                    next_layer.append(parent)
+        layer = next_layer
+        depth += 1
+    return winner, plies
+
+
+def build(path=TABLEBASE_PATH):
+    nodes, blocked, moves = build_graph()
+    parents = [[] for _ in nodes]
+    for i, successors in enumerate(moves):
+        for child in successors:
+            if child >= 0:
+                parents[child].append(i)
+    data = bytearray(ENTRIES)
+    stats = {"positions": len(nodes), "decided": 0, "max_plies": 0}
+    for bits in range(LABELS):
+        winner, plies = solve(bits, nodes, blocked, moves, parents)
+        for node, who, n in zip(nodes, winner, plies):
+            if who is None:
+                continue
+            if n > MAX_PLIES:
+                raise ValueError(f"{n} plies does not fit in a tablebase entry")
+            data[index(bits, *node)] = (BLUE_WINS if who == BLUE else 0) | (n + 1)
+            stats["decided"] += 1
+            stats["max_plies"] = max(stats["max_plies"], n)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, ENTRIES))
+        f.write(data)
+    os.replace(tmp, path)
+    _loaded.pop(path, None)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Sci-Dama one-against-one endgame tablebase")
+    parser.add_argument("--output", default=TABLEBASE_PATH)
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    stats = build(args.output)
+    print(f"{stats['decided']} of {stats['positions'] * LABELS} entries decided, "
+          f"longest win {stats['max_plies']} plies, written to {args.output} "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Bitboard move generation, checked against the list-of-lists generator
+it replaced."""
+import random
+
+from bitboard import RED, BLUE, ROWS, COLS, Position, iter_bits, row_col, square
+
+DARK = [square(r, c) for r in range(ROWS) for c in range(COLS) if (r + c) % 2 == 1]
+
+
+def list_moves(board, kings, row, col):
+    # The list-of-lists move generator the bitboard one replaced
+    moves = []
+    piece = board[row][col]
+    if kings[row][col]:
+        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    else:
+        direction = 1 if piece == RED else -1
+        directions = [(direction, -1), (direction, 1)]
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        if kings[row][col]:
+            while 0 <= r < ROWS and 0 <= c < COLS:
+                if board[r][c] == 0:
+                    moves.append(((r, c), None))
+                elif board[r][c] != piece:
+                    jump_r, jump_c = r + dr, c + dc
+                    while 0 <= jump_r < ROWS and 0 <= jump_c < COLS and board[jump_r][jump_c] == 0:
+                        moves.append(((jump_r, jump_c), (r, c)))
+                        jump_r += dr
+                        jump_c += dc
+                    break
+                else:
+                    break
+                r += dr
+                c += dc
+        elif 0 <= r < ROWS and 0 <= c < COLS:
+            if board[r][c] == 0:
+                moves.append(((r, c), None))
+            elif board[r][c] != piece:
+                jump_r, jump_c = r + dr, c + dc
+                if 0 <= jump_r < ROWS and 0 <= jump_c < COLS and board[jump_r][jump_c] == 0:
+                    moves.append(((jump_r, jump_c), (r, c)))
+    return moves
+
+
+def random_position(rng):
+    pos = Position()
+    for sq in rng.sample(DARK, rng.randint(2, 24)):
+        pos.place(sq, rng.choice((RED, BLUE)), rng.randint(1, 20), rng.random() < 0.3)
+    return pos
+
+
+def test_bitboard_moves_match_list_moves():
+    rng = random.Random(1)
+    for _ in range(500):
+        pos = random_position(rng)
+        board = [[pos.piece_at(r, c) for c in range(COLS)] for r in range(ROWS)]
+        kings = [[pos.is_king(r, c) for c in range(COLS)] for r in range(ROWS)]
+        for sq in iter_bits(pos.occupied):
+            row, col = row_col(sq)
+            got = [(row_col(dst), None if cap < 0 else row_col(cap)) for dst, cap in pos.moves_from(sq)]
+            assert sorted(got, key=str) == sorted(list_moves(board, kings, row, col), key=str)
+        for color in (RED, BLUE):
+            movable = sum(1 << sq for sq in iter_bits(pos.bits(color)) if pos.moves_from(sq))
+            assert pos.movable(color) == movable
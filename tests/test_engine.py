@@ -0,0 +1,35 @@
+"""The alpha-beta search stays within its time budget."""
+import random
+import time
+
+from bitboard import RED, BLUE, Position, iter_bits
+from engine import SearchEngine
+
+
+def legal_moves(pos, color):
+    return [(sq, dst, cap) for sq in iter_bits(pos.bits(color)) for dst, cap in pos.moves_from(sq)]
+
+
+def test_search_returns_a_legal_move_within_its_time_budget():
+    rng = random.Random(3)
+    for operation in "+-*/":
+        pos = Position.initial(4, 12, rng)
+        color = BLUE
+        # Some quiet moves, so the search does not start from the opening
+        for _ in range(6):
+            quiet = [m for m in legal_moves(pos, color) if m[2] < 0]
+            src, dst, _ = rng.choice(quiet)
+            pos.move(src, dst)
+            color = RED if color == BLUE else BLUE
+        engine = SearchEngine(operation, time_limit=0.1)
+        start = time.perf_counter()
+        move = engine.search(pos, color)
+        elapsed = time.perf_counter() - start
+        assert move in legal_moves(pos, color)
+        assert engine.depth_reached >= 1
+        # The clock is checked every 256 nodes, so allow a little over
+        assert elapsed < 0.1 + 0.15
+        # A budget passed to search() overrides the engine's own
+        start = time.perf_counter()
+        engine.search(pos, color, time_limit=0.02)
+        assert time.perf_counter() - start < 0.02 + 0.15
@@ -0,0 +1,43 @@
+"""EventLog: records must match the schema, and the file rotates."""
+import json
+
+import pytest
+
+from event_log import EventLog
+
+
+def test_events_are_checked_against_the_schema():
+    log = EventLog(path="")
+    log.log("timeout", mode="math_rush", question="1 + 1 = ?", answer=2)
+    with pytest.raises(ValueError):
+        log.log("timeout", mode="math_rush", question="1 + 1 = ?")
+    with pytest.raises(ValueError):
+        log.log("timeout", mode="math_rush", question="1 + 1 = ?", answer=2, extra=1)
+    with pytest.raises(ValueError):
+        log.log("no_such_event", mode="math_rush")
+    # An empty path turns logging off: nothing is queued or written
+    assert log.thread is None
+
+
+def test_log_rotates_and_keeps_backups(tmp_path):
+    path = tmp_path / "logs" / "events.jsonl"
+    log = EventLog(path=str(path), max_bytes=400, backups=2)
+    for i in range(60):
+        log.log("answer", mode="math_rush", question=f"{i} + 1 = ?", given=i + 1, correct=True, elapsed_ms=1.5)
+    log.close()
+    assert path.exists()
+    assert (tmp_path / "logs" / "events.jsonl.1").exists()
+    assert (tmp_path / "logs" / "events.jsonl.2").exists()
+    assert not (tmp_path / "logs" / "events.jsonl.3").exists()
+    records = []
+    for name in ("events.jsonl.2", "events.jsonl.1", "events.jsonl"):
+        for line in (tmp_path / "logs" / name).read_text().splitlines():
+            records.append(json.loads(line))
+    for record in records:
+        assert record["v"] == 1 and record["event"] == "answer"
+        assert set(record) == {"v", "ts", "session", "player", "seq", "event",
+                               "mode", "question", "given", "correct", "elapsed_ms"}
+    seqs = [record["seq"] for record in records]
+    assert seqs == sorted(seqs) and seqs[-1] == 60
+    # Only the newest files are kept
+    assert len(records) < 60
@@ -0,0 +1,88 @@
+"""Game records: encode, decode and replay."""
+import random
+
+import pytest
+
+import records
+from bitboard import RED, BLUE
+from rules import GameState
+
+
+def test_dama_record_round_trip_and_replay():
+    for seed in range(12):
+        data = records.play_game((seed, ("Easy", "Medium", "Hard")[seed % 3], "+-*/"[seed % 4],
+                                  ("Medium", "Easy"), 0.3, 300))
+        record = records.dama_from_bytes(data)
+        assert records.dama_to_bytes(record) == data
+        assert records.check(record) is None
+        for state, _ in records.replay_dama(record):
+            pass
+        assert (state.scores[RED], state.scores[BLUE]) == record.scores
+
+
+def test_recorder_matches_the_game_it_recorded():
+    rng = random.Random(4)
+    state = GameState.new("Medium", "*", rng)
+    recorder = records.DamaRecorder(99, state)
+    failed = 0
+    while state.winner() is None and state.ply < 150:
+        move = rng.choice(state.legal_moves())
+        correct = move[2] < 0 or rng.random() < 0.5
+        failed += not correct
+        recorder.add(state, move, correct)
+        state.apply_move(move, correct)
+    record = recorder.finish(state)
+    assert failed and len(record.moves) == state.ply + failed
+    replayed = records.initial_state(record)
+    for _ in records.replay_dama(record, replayed):
+        pass
+    assert replayed.scores == state.scores
+    assert replayed.position.red == state.position.red
+    assert replayed.position.blue == state.position.blue
+    assert replayed.position.kings == state.position.kings
+
+
+def test_changed_record_fails_its_check():
+    record = records.dama_from_bytes(records.play_game((1, "Medium", "+", ("Easy", "Easy"), 0.0, 300)))
+    assert records.check(record._replace(scores=(record.scores[0] + 1, record.scores[1]))) is not None
+    assert records.check(record._replace(moves=record.moves[:-1] + b"\x3f")) is not None
+    with pytest.raises(ValueError):
+        records.dama_from_bytes(records.dama_to_bytes(record)[:-1])
+
+
+def rush_record():
+    recorder = records.RushRecorder(1234, "Medium", 10)
+    recorder.add(1, "3 + 4 = ?", 7, 7, 1.2, True)
+    recorder.add(1, "9 - 2 = ?", 7, 7, 0.5, True)
+    recorder.add(1, "5 + 5 = ?", 10, 10, 2.0, True)
+    recorder.add(2, "12 * 3 = ?", 36, 35, 3.0, False)
+    recorder.add(1, "8 + 1 = ?", 9, None, 10, False)
+    return recorder.finish(3)
+
+
+def test_rush_record_round_trip_and_check(tmp_path):
+    record = rush_record()
+    data = records.rush_to_bytes(record)
+    assert records.rush_from_bytes(data) == record
+    assert records.check(record) is None
+    assert [level for _, level, _, _ in records.replay_rush(record)] == [1, 1, 2, 1, 1]
+    assert records.check(record._replace(score=4)) is not None
+    path = records.save(record, str(tmp_path))
+    assert records.load(path) == record
+    assert records.save(record, "") is None
+
+
+def test_rush_answers_at_the_int32_boundary(tmp_path):
+    recorder = records.RushRecorder(5, "Easy", 10)
+    recorder.add(1, "1 + 1 = ?", 2, records.INT32_MAX, 1.0, False)
+    recorder.add(1, "2 + 2 = ?", 4, records.INT32_MIN, 1.0, False)
+    recorder.add(1, "3 + 3 = ?", 6, 12345678901, 1.0, False)
+    recorder.add(1, "4 + 4 = ?", 8, -12345678901, 1.0, False)
+    record = recorder.finish(0)
+    assert [r.given for r in record.rounds] == [records.INT32_MAX, records.INT32_MIN] * 2
+    assert records.rush_from_bytes(records.rush_to_bytes(record)) == record
+    assert records.check(record) is None
+    # A record built without the recorder is refused, not raised
+    wide = record._replace(rounds=[record.rounds[0]._replace(given=12345678901)])
+    assert records.save(wide, str(tmp_path)) is None
+    assert not list(tmp_path.iterdir())
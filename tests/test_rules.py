@@ -0,0 +1,19 @@
+"""The incremental MoveCache, checked against a full rescan."""
+import random
+
+from bitboard import RED, BLUE
+from rules import GameState, MoveCache, OPERATIONS
+
+
+def test_move_cache_matches_full_rescan():
+    rng = random.Random(2)
+    for game in range(60):
+        state = GameState.new(("Easy", "Medium", "Hard")[game % 3], OPERATIONS[game % 4], rng)
+        while state.winner() is None and state.ply < 200:
+            move = rng.choice(state.legal_moves())
+            state.apply_move(move, rng.random() < 0.8)
+            fresh = MoveCache(state.position)
+            assert state.cache.moves == fresh.moves
+            assert state.cache.movable_bits == fresh.movable_bits
+            for color in (RED, BLUE):
+                assert state.cache.movable(color) == state.position.movable(color)
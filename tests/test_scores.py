@@ -0,0 +1,56 @@
+"""ScoreStore: rows are queued until flush() and written in one batch."""
+import sqlite3
+
+import pytest
+
+from scores import ScoreStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # No legacy highscore_*.txt files to import
+    monkeypatch.chdir(tmp_path)
+    store = ScoreStore(str(tmp_path / "scores.db"), player="ana")
+    yield store
+    store.close()
+
+
+def stored_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_record_queues_until_flush(store):
+    store.connect()
+    store.record("math_rush", "Easy", 7)
+    store.record("math_rush", "Easy", 9)
+    assert stored_rows(store.path) == 0
+    # Queued rows already count for the high score
+    assert store.high_score("math_rush", "Easy") == 9
+    assert store.flush() == 2
+    assert stored_rows(store.path) == 2
+    assert store.flush() == 0
+
+
+def test_leaderboard_and_top(store):
+    games = [("ana", 5), ("ben", 12), ("ana", 15), ("cy", 12), ("ben", 3)]
+    for player, score in games:
+        store.record("math_rush", "Hard", score, player=player)
+    store.record("sci_dama", "Hard", 99, won=True, player="ben")
+    store.flush()
+    assert store.leaderboard("math_rush", "Hard") == [("ana", 15, 2), ("ben", 12, 2), ("cy", 12, 1)]
+    assert [(p, s) for p, s, _ in store.top("math_rush", "Hard", limit=3)] == [("ana", 15), ("ben", 12), ("cy", 12)]
+    assert store.high_score("math_rush", "Hard", player="ben") == 12
+    assert store.high_score("sci_dama", "Hard") == 99
+    assert store.leaderboard("math_rush", "Easy") == []
+
+
+def test_legacy_files_are_imported_once(tmp_path, store):
+    (tmp_path / "highscore_medium.txt").write_text("42")
+    store.connect()
+    assert store.high_score("math_rush", "Medium", player="legacy") == 42
+    assert store.migrate_legacy() == 0
+    assert stored_rows(store.path) == 1
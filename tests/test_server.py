@@ -0,0 +1,183 @@
+"""The match server's protocol, played over a local socket."""
+import asyncio
+import random
+
+import server
+from bitboard import RED, BLUE, Position, iter_bits
+from rules import GameState, OPERATIONS
+from server import (JOIN, MOVE, ANSWER, RESIGN, WAITING, START, QUESTION, MOVED, END, ERROR,
+                    JOIN_MSG, MOVE_MSG, ANSWER_MSG, START_MSG, MOVED_MSG, END_MSG, ERROR_MSG,
+                    FAILED, FINISHED, RESIGNED, DISCONNECTED, BAD_MESSAGE, ALREADY_PLAYING,
+                    NOT_PLAYING, NOT_YOUR_TURN, ILLEGAL_MOVE, NO_QUESTION, frame, read_frame)
+
+
+def run(test, records_dir=""):
+    async def main():
+        match_server = server.MatchServer(workers=1, ai_time=0.02, question_time=1, records_dir=records_dir,
+                                          seed=1)
+        listener = await asyncio.start_server(match_server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            await asyncio.wait_for(test(match_server, lambda: asyncio.open_connection("127.0.0.1", port)), 60)
+        finally:
+            listener.close()
+            match_server.close()
+    asyncio.run(main())
+
+
+async def expect(reader, kind):
+    got, payload = await asyncio.wait_for(read_frame(reader), 10)
+    assert got == kind, (hex(got), hex(kind), payload)
+    return payload
+
+
+async def expect_error(reader, code):
+    assert ERROR_MSG.unpack(await expect(reader, ERROR)) == (code,)
+
+
+def start_state(payload):
+    # The client's copy of the game from a START message
+    _, color, difficulty, operation, turn, red, blue = START_MSG.unpack_from(payload)
+    pos = Position()
+    for sq, number in zip(iter_bits(red | blue), payload[START_MSG.size:]):
+        pos.place(sq, RED if red >> sq & 1 else BLUE, number)
+    return color, GameState(pos, OPERATIONS[operation], server.DIFFICULTIES[difficulty], turn)
+
+
+def test_bad_messages_get_errors():
+    async def test(match_server, connect):
+        reader, writer = await connect()
+        writer.write(frame(MOVE, MOVE_MSG.pack(40, 33)))
+        await expect_error(reader, NOT_PLAYING)
+        writer.write(frame(0x7F))
+        await expect_error(reader, BAD_MESSAGE)
+        writer.write(frame(JOIN, b"\x00"))
+        await expect_error(reader, BAD_MESSAGE)
+        writer.write(frame(JOIN, JOIN_MSG.pack(0, 9, 0, 0)))
+        await expect_error(reader, BAD_MESSAGE)
+        writer.write(frame(JOIN, JOIN_MSG.pack(0, 0, 0, 5)))
+        await expect(reader, WAITING)
+        writer.write(frame(JOIN, JOIN_MSG.pack(0, 0, 0, 5)))
+        await expect_error(reader, ALREADY_PLAYING)
+        writer.close()
+        await asyncio.sleep(0.05)
+        assert match_server.waiting == {}
+    run(test)
+
+
+def test_players_are_paired_and_moves_are_checked():
+    async def test(match_server, connect):
+        first = await connect()
+        first[1].write(frame(JOIN, JOIN_MSG.pack(0, 1, 2, 77)))
+        await expect(first[0], WAITING)
+        # A different match code does not pair
+        other = await connect()
+        other[1].write(frame(JOIN, JOIN_MSG.pack(0, 1, 2, 78)))
+        await expect(other[0], WAITING)
+        second = await connect()
+        second[1].write(frame(JOIN, JOIN_MSG.pack(0, 1, 2, 77)))
+        color_a, state = start_state(await expect(first[0], START))
+        color_b, _ = start_state(await expect(second[0], START))
+        assert {color_a, color_b} == {RED, BLUE}
+        mover, waiter = (first, second) if color_a == state.turn else (second, first)
+
+        waiter[1].write(frame(MOVE, MOVE_MSG.pack(40, 33)))
+        await expect_error(waiter[0], NOT_YOUR_TURN)
+        move = state.legal_moves()[0]
+        mover[1].write(frame(MOVE, MOVE_MSG.pack(move[0], move[0])))
+        await expect_error(mover[0], ILLEGAL_MOVE)
+        enemy = next(iter_bits(state.position.bits(RED if state.turn == BLUE else BLUE)))
+        mover[1].write(frame(MOVE, MOVE_MSG.pack(enemy, move[1])))
+        await expect_error(mover[0], ILLEGAL_MOVE)
+        mover[1].write(frame(ANSWER, ANSWER_MSG.pack(1)))
+        await expect_error(mover[0], NO_QUESTION)
+
+        mover[1].write(frame(MOVE, MOVE_MSG.pack(move[0], move[1])))
+        moved = MOVED_MSG.unpack(await expect(mover[0], MOVED))
+        assert moved == MOVED_MSG.unpack(await expect(waiter[0], MOVED))
+        assert moved[:4] == (state.turn,) + move
+        # Leaving mid-game hands the win to the opponent
+        mover[1].close()
+        winner, reason, _, _ = END_MSG.unpack(await expect(waiter[0], END))
+        assert (winner, reason) == (RED if state.turn == BLUE else BLUE, DISCONNECTED)
+        waiter[1].close()
+        other[1].close()
+        await asyncio.sleep(0.05)
+        assert match_server.matches == {} and match_server.waiting == {}
+    run(test)
+
+
+async def play_against_ai(connect, ai, rng, plies=None, wrong_first=False):
+    # Plays captures first, answers questions (the first one wrongly, if
+    # asked) and checks every score against its own copy of the game.
+    # Resigns after `plies` plies; returns the END message and the
+    # number of questions asked.
+    reader, writer = await connect()
+    writer.write(frame(JOIN, JOIN_MSG.pack(server.AI_PLAYERS.index(ai) + 1, 1, 2, 0)))
+    color, state = start_state(await expect(reader, START))
+    assert color == BLUE
+    questions = 0
+    while True:
+        if plies is not None and state.ply >= plies and state.turn == color:
+            writer.write(frame(RESIGN))
+            result = END_MSG.unpack(await expect(reader, END))
+            break
+        if state.turn == color and state.winner() is None:
+            moves = state.legal_moves()
+            captures = [m for m in moves if m[2] >= 0]
+            move = captures[0] if captures else rng.choice(moves)
+            writer.write(frame(MOVE, MOVE_MSG.pack(move[0], move[1])))
+        kind, payload = await asyncio.wait_for(read_frame(reader), 10)
+        if kind == QUESTION:
+            questions += 1
+            answer = state.question_for(move)[1]
+            if wrong_first and questions == 1:
+                answer += 1
+            writer.write(frame(ANSWER, ANSWER_MSG.pack(answer)))
+            mover, src, dst, cap, flags, red, blue = MOVED_MSG.unpack(await expect(reader, MOVED))
+        elif kind == MOVED:
+            mover, src, dst, cap, flags, red, blue = MOVED_MSG.unpack(payload)
+        else:
+            assert kind == END
+            result = END_MSG.unpack(payload)
+            break
+        if wrong_first and questions == 1 and mover == color and cap >= 0:
+            assert flags & FAILED
+        state.apply_move((src, dst, cap), not flags & FAILED)
+        assert (state.scores[RED], state.scores[BLUE]) == (red, blue)
+    writer.close()
+    return state, result, questions
+
+
+def test_capture_questions_are_asked_and_judged_by_the_server():
+    async def test(match_server, connect):
+        state, (winner, reason, red, blue), questions = await play_against_ai(
+            connect, "Medium", random.Random(2), wrong_first=True)
+        assert questions >= 2
+        assert reason == FINISHED and winner == state.winner()
+        assert (red, blue) == (state.scores[RED], state.scores[BLUE])
+    run(test)
+
+
+def test_searching_ai_plays_on_the_worker_pool():
+    async def test(match_server, connect):
+        _, (winner, reason, _, _), _ = await play_against_ai(connect, "Hard", random.Random(3), plies=6)
+        assert (winner, reason) == (RED, RESIGNED)
+        assert match_server.stats["ai_moves"] == 3
+    run(test)
+
+
+def test_failed_record_saves_are_reported(tmp_path, monkeypatch, capsys):
+    def save(record, directory):
+        raise RuntimeError("disk on fire")
+    monkeypatch.setattr(server.records, "save", save)
+
+    async def test(match_server, connect):
+        _, (winner, reason, _, _), _ = await play_against_ai(connect, "Easy", random.Random(4), plies=0)
+        assert (winner, reason) == (RED, RESIGNED)
+        for _ in range(100):
+            if "disk on fire" in capsys.readouterr().out:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("save failure was not reported")
+    run(test, records_dir=str(tmp_path))
@@ -0,0 +1,83 @@
+"""The endgame tablebase against a brute-force search of the same positions."""
+import functools
+import random
+
+import pytest
+
+import tablebase
+from bitboard import RED, BLUE, Position, opponent
+from rules import calculate_score, result
+
+# Longer than the longest win in the table (16 plies)
+DEPTH = 20
+
+
+def brute_force(operation, red_number, blue_number):
+    # Returns solve(placement, side, red_diff) -> (winner, plies) or None,
+    # searching every line up to DEPTH plies
+    def place(red_sq, red_king, blue_sq, blue_king):
+        pos = Position()
+        pos.place(red_sq, RED, red_number, bool(red_king))
+        pos.place(blue_sq, BLUE, blue_number, bool(blue_king))
+        return pos
+
+    @functools.lru_cache(None)
+    def solve(red_sq, red_king, blue_sq, blue_king, side, red_diff, depth):
+        pos = place(red_sq, red_king, blue_sq, blue_king)
+        winner = result(pos, red_diff, 0)
+        if winner is not None:
+            return winner, 0
+        if depth == 0:
+            return None
+        src = red_sq if side == RED else blue_sq
+        outcomes = []
+        for dst, cap in pos.moves_from(src):
+            child = pos.copy()
+            diff = red_diff
+            if cap >= 0:
+                points = calculate_score(operation, pos.numbers[src], pos.numbers[cap])
+                diff += points if side == RED else -points
+                child.remove(cap)
+            child.move(src, dst)
+            if cap >= 0:
+                outcomes.append((result(child, diff, 0), 1))
+                continue
+            red2, blue2 = child.red.bit_length() - 1, child.blue.bit_length() - 1
+            sub = solve(red2, child.kings >> red2 & 1, blue2, child.kings >> blue2 & 1,
+                        opponent(side), diff, depth - 1)
+            outcomes.append(None if sub is None else (sub[0], sub[1] + 1))
+        wins = [o for o in outcomes if o is not None and o[0] == side]
+        if wins:
+            return min(wins, key=lambda o: o[1])
+        if all(o is not None for o in outcomes):
+            return max(outcomes, key=lambda o: o[1])
+        return None
+
+    return place, solve
+
+
+def test_tablebase_matches_brute_force():
+    table = tablebase.Tablebase.open()
+    if table is None:
+        pytest.skip("the tablebase has not been built (python tablebase.py)")
+    rng = random.Random(5)
+    checked = 0
+    for _ in range(4):
+        operation = rng.choice("+-*/")
+        red_number, blue_number = rng.randint(1, 20), rng.randint(1, 20)
+        red_diff = rng.randint(-30, 30)
+        place, solve = brute_force(operation, red_number, blue_number)
+        for _ in range(100):
+            red_sq, blue_sq = rng.sample(tablebase.DARK_SQUARES, 2)
+            red_king, blue_king = rng.randint(0, 1), rng.randint(0, 1)
+            if not red_king and red_sq // 8 == 7 or not blue_king and blue_sq // 8 == 0:
+                continue
+            pos = place(red_sq, red_king, blue_sq, blue_king)
+            if result(pos, red_diff, 0) is not None:
+                continue
+            side = rng.choice((RED, BLUE))
+            expected = solve(red_sq, red_king, blue_sq, blue_king, side, red_diff, DEPTH)
+            assert table.probe(pos, side, operation, red_diff) == expected, (
+                operation, red_number, blue_number, red_diff, red_sq, red_king, blue_sq, blue_king, side)
+            checked += 1
+    assert checked > 200
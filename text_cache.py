@@ -0,0 +1,51 @@
+"""Bounded LRU cache of rendered text surfaces.
+
+Rendering text is the most expensive thing the menus and quiz loop do each
+frame, and almost every frame renders the same strings again. render_text()
+is a drop-in for font.render(text, antialias, color) that hands back the
+surface rendered last time for the same font, string, antialias flag and
+colour. The returned surface is shared, so callers must only blit it.
+"""
+from collections import OrderedDict
+
+
+class TextCache:
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.surfaces),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+text_cache = TextCache()
+
+
+def render_text(font, text, antialias, color):
+    return text_cache.render(font, text, antialias, color)
@@ -0,0 +1,137 @@
+"""Self-play tournament between the Sci-Dama AI strategies.
+
+Plays every pairing of the chosen strategies, both ways round, on a
+process pool and reports win rates, average points per operation and
+throughput. Example:
+
+    python tournament.py --players Easy,Medium,Hard --games 50 --time-limit 0.05
+"""
+import argparse
+import os
+import random
+import time
+from collections import defaultdict
+from itertools import permutations
+from multiprocessing import Pool
+
+from ai import STRATEGIES, make_player
+from bitboard import RED, BLUE
+from rules import GameState, OPERATIONS, NUMBER_RANGES
+
+
+def play_game(job):
+    # Runs in a worker process; `job` is a plain tuple so it pickles cheaply
+    red_name, blue_name, difficulty, operation, seed, max_plies, options = job
+    rng = random.Random(seed)
+    state = GameState.new(difficulty, operation, rng, turn=BLUE)
+    players = {
+        RED: make_player(red_name, operation, rng, **options),
+        BLUE: make_player(blue_name, operation, rng, **options),
+    }
+    winner = state.winner()
+    while winner is None and state.ply < max_plies:
+        move = players[state.turn](state)
+        if move is None:
+            break
+        state.apply_move(move)
+        winner = state.winner()
+    return {
+        "red": red_name,
+        "blue": blue_name,
+        "operation": operation,
+        "winner": winner,  # None for a game stopped at max_plies
+        "scores": (state.scores[RED], state.scores[BLUE]),
+        "plies": state.ply,
+    }
+
+
+def make_jobs(players, games, difficulty, operations, seed, max_plies, options):
+    jobs = []
+    index = 0
+    for red_name, blue_name in permutations(players, 2):
+        for _ in range(games):
+            operation = operations[index % len(operations)]
+            jobs.append((red_name, blue_name, difficulty, operation, seed + index, max_plies, options))
+            index += 1
+    return jobs
+
+
+def summarize(results):
+    stats = defaultdict(lambda: {"games": 0, "wins": 0, "losses": 0, "draws": 0})
+    points = defaultdict(lambda: defaultdict(list))
+    for res in results:
+        for color, name in ((RED, res["red"]), (BLUE, res["blue"])):
+            entry = stats[name]
+            entry["games"] += 1
+            if res["winner"] is None:
+                entry["draws"] += 1
+            elif res["winner"] == color:
+                entry["wins"] += 1
+            else:
+                entry["losses"] += 1
+            points[name][res["operation"]].append(res["scores"][color - 1])
+    return stats, points
+
+
+def print_report(stats, points, operations, elapsed, total_games, total_plies):
+    print(f"{'Player':<10}{'Games':>7}{'Win %':>8}{'Loss %':>8}{'Draw %':>8}"
+          + "".join(f"{'avg ' + op:>9}" for op in operations))
+    for name in sorted(stats):
+        entry = stats[name]
+        games = entry["games"]
+        row = (f"{name:<10}{games:>7}"
+               f"{100 * entry['wins'] / games:>8.1f}"
+               f"{100 * entry['losses'] / games:>8.1f}"
+               f"{100 * entry['draws'] / games:>8.1f}")
+        for op in operations:
+            scores = points[name].get(op)
+            row += f"{sum(scores) / len(scores):>9.1f}" if scores else f"{'-':>9}"
+        print(row)
+    print(f"\n{total_games} games, {total_plies} plies in {elapsed:.2f} s "
+          f"({total_games / elapsed:.1f} games/s, {total_plies / elapsed:.0f} plies/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sci-Dama AI self-play tournament")
+    parser.add_argument("--players", default="Easy,Medium,Hard",
+                        help="comma-separated strategies, from: " + ", ".join(STRATEGIES))
+    parser.add_argument("--games", type=int, default=20,
+                        help="games per ordered pairing (each pair plays both colours)")
+    parser.add_argument("--difficulty", default="Easy", choices=list(NUMBER_RANGES),
+                        help="difficulty used for the piece numbers")
+    parser.add_argument("--operations", default="".join(OPERATIONS),
+                        help="operations to rotate through, e.g. '+*'")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--time-limit", type=float, default=0.05,
+                        help="seconds per move for search-based strategies")
+    parser.add_argument("--max-plies", type=int, default=300,
+                        help="stop a game as a draw after this many plies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    players = [name.strip() for name in args.players.split(",") if name.strip()]
+    for name in players:
+        if name not in STRATEGIES:
+            parser.error(f"unknown player {name!r}")
+    if len(players) < 2:
+        parser.error("need at least two players")
+    operations = [op for op in args.operations if op in OPERATIONS]
+    if not operations:
+        parser.error("no valid operations given")
+
+    options = {"time_limit": args.time_limit}
+    jobs = make_jobs(players, args.games, args.difficulty, operations,
+                     args.seed, args.max_plies, options)
+    start = time.perf_counter()
+    with Pool(args.workers) as pool:
+        chunksize = max(1, len(jobs) // (args.workers * 8))
+        results = list(pool.imap_unordered(play_game, jobs, chunksize))
+    elapsed = time.perf_counter() - start
+
+    stats, points = summarize(results)
+    print_report(stats, points, operations, elapsed, len(results),
+                 sum(res["plies"] for res in results))
+
+
+if __name__ == "__main__":
+    main()